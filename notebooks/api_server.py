@@ -0,0 +1,99 @@
+"""
+api_server.py
+=============
+HTTP front end for the async engine (engine.py). One process, one event
+loop, every officer session.
+
+  POST /v1/answer   {"question", "session_id", "history"} -> text/event-stream,
+                    one SSE message per engine event ("event:" = event type)
+  WS   /v1/ws       send the same JSON, receive one JSON event per message;
+                    the socket stays open for the next question
+  GET  /metrics     Prometheus text for the engine's stages (tracing.py)
+  GET  /healthz     LLM scheduler queues, database replica health
+
+Run:
+    uvicorn api_server:app --app-dir notebooks --port 8600
+    # then set ENGINE_URL = "http://localhost:8600" in app.py
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from engine import PipelineEngine
+from pipeline import PROJECT_DIR, get_scheduler, get_router
+from tracing import Tracer
+
+ENGINE_PORT = 8600
+TRACE_LOG = PROJECT_DIR / "logs" / "engine_traces.jsonl"
+
+
+class Question(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+    history: list = []
+
+
+engine: PipelineEngine = None
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    global engine
+    engine = PipelineEngine(tracer=Tracer(TRACE_LOG))
+    warm = asyncio.create_task(engine.warm_models())
+    yield
+    warm.cancel()
+    await engine.close()
+
+
+app = FastAPI(title="FIA IBMS NL2SQL engine", lifespan=lifespan)
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@app.post("/v1/answer")
+async def answer(q: Question):
+    async def events():
+        async for event in engine.answer(q.question, q.history, q.session_id):
+            yield sse(event)
+
+    # X-Accel-Buffering: keep reverse proxies from holding back the token stream
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/v1/ws")
+async def answer_ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            q = Question(**await websocket.receive_json())
+            async for event in engine.answer(q.question, q.history, q.session_id):
+                await websocket.send_text(json.dumps(event, default=str))
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(engine.tracer.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+async def healthz():
+    databases = get_router().status()
+    return {"ok": any(db["healthy"] for db in databases), "llm_queues": get_scheduler().snapshot(),
+            "databases": databases}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=ENGINE_PORT)
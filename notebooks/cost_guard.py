@@ -0,0 +1,150 @@
+"""
+cost_guard.py
+=============
+Pre-execution checks for generated SQL on Oracle.
+
+  make_sargable(sql)   rewrites date filters that defeat indexes, e.g.
+                       EXTRACT(YEAR FROM d) = 2025  ->  d >= 2025-01-01 AND d < 2026-01-01
+                       (also YEAR+MONTH pairs, BETWEEN, <, <=, >, >= and TO_CHAR(d, 'YYYY'))
+  explain_plan(conn)   EXPLAIN PLAN + PLAN_TABLE -> PlanEstimate (cost, cardinality, operations);
+                       explain_plan_async() for the async engine
+  check_plan(plan)     "run", "limit" (over budget: run with FIRST_ROWS and skip the exact
+                       COUNT(*)) or "reject" (cartesian join / far over budget)
+"""
+
+import re
+import uuid
+
+_COL = r"(?P<col>(?:\w+\.)?\w+)"
+
+
+def _date(year: int, month: int = 1) -> str:
+    if month > 12:
+        year, month = year + 1, month - 12
+    return f"TO_DATE('{year:04d}-{month:02d}-01','YYYY-MM-DD')"
+
+
+def _year_range(col, op, year):
+    """col compared with a year, as a range over the raw column."""
+    if op == "=":
+        return f"({col} >= {_date(year)} AND {col} < {_date(year + 1)})"
+    if op in (">=", "<"):
+        return f"{col} {op} {_date(year)}"
+    if op == ">":
+        return f"{col} >= {_date(year + 1)}"
+    return f"{col} < {_date(year + 1)}"   # <=
+
+
+_YEAR_MONTH_RE = re.compile(
+    r"EXTRACT\(\s*YEAR\s+FROM\s+" + _COL + r"\s*\)\s*=\s*(?P<year>\d{4})\s+AND\s+"
+    r"EXTRACT\(\s*MONTH\s+FROM\s+(?P=col)\s*\)\s*=\s*(?P<month>\d{1,2})\b",
+    re.IGNORECASE,
+)
+_YEAR_BETWEEN_RE = re.compile(
+    r"EXTRACT\(\s*YEAR\s+FROM\s+" + _COL + r"\s*\)\s+BETWEEN\s+(?P<lo>\d{4})\s+AND\s+(?P<hi>\d{4})\b",
+    re.IGNORECASE,
+)
+_YEAR_CMP_RE = re.compile(
+    r"EXTRACT\(\s*YEAR\s+FROM\s+" + _COL + r"\s*\)\s*(?P<op>>=|<=|=|<|>)\s*(?P<year>\d{4})\b",
+    re.IGNORECASE,
+)
+_TO_CHAR_YEAR_RE = re.compile(
+    r"TO_CHAR\(\s*" + _COL + r"\s*,\s*'YYYY'\s*\)\s*=\s*'(?P<year>\d{4})'",
+    re.IGNORECASE,
+)
+
+
+def make_sargable(sql: str) -> tuple:
+    """Returns (rewritten_sql, [descriptions of the rewrites applied])."""
+    rewrites = []
+
+    def year_month(m):
+        col, year, month = m.group("col"), int(m.group("year")), int(m.group("month"))
+        if not 1 <= month <= 12:
+            return m.group()
+        rewrites.append(f"YEAR/MONTH({col}) -> date range")
+        return f"({col} >= {_date(year, month)} AND {col} < {_date(year, month + 1)})"
+
+    def year_between(m):
+        col = m.group("col")
+        rewrites.append(f"YEAR({col}) BETWEEN -> date range")
+        return f"({col} >= {_date(int(m.group('lo')))} AND {col} < {_date(int(m.group('hi')) + 1)})"
+
+    def year_cmp(m):
+        col = m.group("col")
+        rewrites.append(f"YEAR({col}) {m.group('op')} -> date range")
+        return _year_range(col, m.group("op"), int(m.group("year")))
+
+    def to_char_year(m):
+        col = m.group("col")
+        rewrites.append(f"TO_CHAR({col}, 'YYYY') -> date range")
+        return _year_range(col, "=", int(m.group("year")))
+
+    sql = _YEAR_MONTH_RE.sub(year_month, sql)
+    sql = _YEAR_BETWEEN_RE.sub(year_between, sql)
+    sql = _YEAR_CMP_RE.sub(year_cmp, sql)
+    sql = _TO_CHAR_YEAR_RE.sub(to_char_year, sql)
+    return sql, rewrites
+
+
+class PlanEstimate:
+    def __init__(self, cost, cardinality, operations):
+        self.cost = cost                # optimizer cost of the whole statement
+        self.cardinality = cardinality  # estimated rows returned
+        self.operations = operations    # [(operation, options, object_name)]
+
+    @property
+    def cartesian(self) -> bool:
+        return any(op == "MERGE JOIN" and opts == "CARTESIAN" for op, opts, _ in self.operations)
+
+    def full_scans(self) -> list:
+        return [obj for op, opts, obj in self.operations if op == "TABLE ACCESS" and opts == "FULL"]
+
+
+PLAN_ROWS_SQL = ("SELECT id, operation, options, object_name, cost, cardinality "
+                 "FROM plan_table WHERE statement_id = :sid ORDER BY id")
+
+
+def _plan_estimate(rows) -> PlanEstimate:
+    root = rows[0] if rows else (0, None, None, None, 0, 0)
+    operations = [(op, opts, obj) for _, op, opts, obj, _, _ in rows]
+    return PlanEstimate(root[4] or 0, root[5] or 0, operations)
+
+
+def explain_plan(dbapi_conn, sql: str) -> PlanEstimate:
+    statement_id = uuid.uuid4().hex[:16]
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}")
+        cursor.execute(PLAN_ROWS_SQL, sid=statement_id)
+        rows = cursor.fetchall()
+        cursor.execute("DELETE FROM plan_table WHERE statement_id = :sid", sid=statement_id)
+    finally:
+        cursor.close()
+    return _plan_estimate(rows)
+
+
+async def explain_plan_async(async_conn, sql: str) -> PlanEstimate:
+    """explain_plan() on a python-oracledb AsyncConnection."""
+    statement_id = uuid.uuid4().hex[:16]
+    cursor = async_conn.cursor()
+    try:
+        await cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}")
+        await cursor.execute(PLAN_ROWS_SQL, sid=statement_id)
+        rows = await cursor.fetchall()
+        await cursor.execute("DELETE FROM plan_table WHERE statement_id = :sid", sid=statement_id)
+    finally:
+        cursor.close()
+    return _plan_estimate(rows)
+
+
+def check_plan(plan: PlanEstimate, budget: float, limit: float) -> tuple:
+    """Returns (action, reason) with action in run / limit / reject."""
+    if plan.cartesian and plan.cost > budget:
+        return "reject", f"Cartesian join (estimated cost {plan.cost:,}) — add a join condition"
+    if plan.cost > limit:
+        scans = ", ".join(sorted(set(filter(None, plan.full_scans())))) or "no index used"
+        return "reject", f"Estimated cost {plan.cost:,} exceeds limit {limit:,.0f} (full scans: {scans})"
+    if plan.cost > budget:
+        return "limit", f"Estimated cost {plan.cost:,} over budget {budget:,.0f}"
+    return "run", "OK"
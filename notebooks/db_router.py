@@ -0,0 +1,303 @@
+"""
+db_router.py
+============
+Routes the chatbot's read-only queries across one or more databases
+(the primary and/or read replicas), configured in Config/databases.json:
+
+    {
+      "health_sql": "SELECT 1 FROM DUAL",
+      "retry_seconds": 30,
+      "session_sql": ["ALTER SESSION SET RESULT_CACHE_MODE = FORCE"],
+      "replicas": [
+        {"name": "primary", "host": "localhost:1521", "service": "FREEPDB1"},
+        {"name": "replica1", "host": "10.0.0.12:1521", "service": "IBMSRO",
+         "pool_size": 8, "max_overflow": 4, "stmtcachesize": 150,
+         "session_sql": ["ALTER SESSION SET OPTIMIZER_MODE = FIRST_ROWS_100"]}
+      ]
+    }
+
+A replica gives either host + service (Oracle; user/password default to
+the pipeline's) or a SQLAlchemy "url", so SQLite/DuckDB files can stand
+in for Oracle when testing the routing (scripts/benchmark_db_router.py).
+
+  - least-loaded: a query goes to the healthy replica with the lowest
+    in-flight / pool-capacity ratio, ties broken by recent latency
+  - health: a connection-level failure marks the replica down; a
+    background thread probes it with health_sql every retry_seconds
+    and brings it back once the probe succeeds
+  - failover: run() retries a connection-level failure on the next
+    replica. SQL errors, call timeouts and cost-guard rejections are
+    not retried. Retrying is safe because only SELECTs get here.
+  - session_sql (global, then per replica) runs once per new session;
+    the shipped file has none (RESULT_CACHE_MODE = FORCE above is opt-in)
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+DEFAULT_HEALTH_SQL = "SELECT 1 FROM DUAL"
+DEFAULT_RETRY_SECONDS = 30.0
+LATENCY_ALPHA = 0.2     # weight of the newest sample in the latency EWMA
+
+# The session, listener or instance is gone, not the SQL: worth another replica
+CONNECTION_ERRORS = (
+    "DPY-1001", "DPY-4011", "DPY-6000", "DPY-6005",
+    "ORA-01033", "ORA-01034", "ORA-01089", "ORA-03113", "ORA-03114", "ORA-03135",
+    "ORA-12170", "ORA-12514", "ORA-12528", "ORA-12537", "ORA-12541",
+    "unable to open database file",     # SQLite stand-ins
+)
+TIMEOUT_ERRORS = ("DPY-4024", "ORA-03156")   # call timeout: the query is too slow anywhere
+
+
+class NoReplicaAvailable(Exception):
+    pass
+
+
+def is_connection_error(e: Exception) -> bool:
+    message = str(e)
+    if any(code in message for code in TIMEOUT_ERRORS):
+        return False
+    return bool(getattr(e, "connection_invalidated", False)) or any(code in message for code in CONNECTION_ERRORS)
+
+
+class Replica:
+    """One database: its lazily created SQLAlchemy engine plus routing state."""
+
+    def __init__(self, name: str, url: str, dsn: str = None, user: str = None, password: str = None,
+                 pool_size: int = 4, max_overflow: int = 2, pool_timeout: float = 15,
+                 session_sql=(), stmtcachesize: int = None):
+        self.name = name
+        self.url = url
+        self.dsn = dsn              # python-oracledb DSN (async pools); None for non-Oracle stand-ins
+        self.user = user
+        self.password = password
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.session_sql = list(session_sql)
+        self.stmtcachesize = stmtcachesize  # python-oracledb statement cache per session (None: driver default)
+        self.in_flight = 0
+        self.healthy = True
+        self.served = 0
+        self.errors = 0
+        self.failovers = 0
+        self.latency = None         # EWMA seconds
+        self.last_error = None
+        self.down_since = None
+        self._engine = None
+        self._engine_lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / max(1, self.capacity)
+
+    def engine(self):
+        with self._engine_lock:
+            if self._engine is None:
+                connect_args = {"stmtcachesize": self.stmtcachesize} if self.dsn and self.stmtcachesize else {}
+                self._engine = create_engine(
+                    self.url,
+                    pool_pre_ping=True,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    connect_args=connect_args,
+                )
+                if self.session_sql:
+                    event.listen(self._engine, "connect", self.init_session)
+            return self._engine
+
+    def init_session(self, dbapi_conn, connection_record=None):
+        """Run session_sql on a new DBAPI connection; a failing statement is recorded, not fatal."""
+        cursor = dbapi_conn.cursor()
+        try:
+            for statement in self.session_sql:
+                try:
+                    cursor.execute(statement)
+                except Exception as e:
+                    self.last_error = f"session_sql: {str(e)[:200]}"
+        finally:
+            cursor.close()
+
+    def dispose(self):
+        with self._engine_lock:
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+
+
+class ReplicaRouter:
+    """Thread-safe least-loaded routing with health checks and failover."""
+
+    def __init__(self, replicas: list, health_sql: str = DEFAULT_HEALTH_SQL,
+                 retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        if not replicas:
+            raise ValueError("ReplicaRouter needs at least one replica")
+        self.replicas = list(replicas)
+        self.health_sql = health_sql
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._checker = None
+
+    # ---------- selection ----------
+    def pick(self, exclude=()) -> Replica:
+        """Least-loaded healthy replica not in exclude; down replicas only when no healthy one is left."""
+        with self._lock:
+            candidates = [r for r in self.replicas if r not in exclude]
+            if not candidates:
+                raise NoReplicaAvailable(f"No database replica available ({len(self.replicas)} tried)")
+            healthy = [r for r in candidates if r.healthy]
+            if healthy:
+                return min(healthy, key=lambda r: (r.load, r.latency or 0.0))
+            return min(candidates, key=lambda r: r.down_since or 0.0)   # longest down: most likely back
+
+    def begin(self, replica: Replica):
+        with self._lock:
+            replica.in_flight += 1
+
+    def end(self, replica: Replica, seconds: float = None, error: Exception = None):
+        """Release a begin(); error marks the replica down if it is a connection-level failure."""
+        with self._lock:
+            replica.in_flight -= 1
+            if error is None:
+                replica.served += 1
+                if seconds is not None:
+                    replica.latency = seconds if replica.latency is None else (
+                        LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * replica.latency)
+                if not replica.healthy:
+                    self._mark_up(replica)
+                return
+            replica.errors += 1
+            replica.last_error = str(error)[:200]
+        if is_connection_error(error):
+            self.mark_down(replica, error)
+
+    def failover(self, replica: Replica):
+        """Count a query that failed on replica and is retried on another."""
+        with self._lock:
+            replica.failovers += 1
+
+    # ---------- execution ----------
+    def run(self, fn):
+        """fn(conn, replica) on the least-loaded replica with failover; returns fn's result.
+
+        conn is a SQLAlchemy Connection. The last replica's error is raised
+        when every replica failed at the connection level.
+        """
+        tried = []
+        while True:
+            replica = self.pick(exclude=tried)
+            self.begin(replica)
+            seconds = None
+            try:
+                with replica.engine().connect() as conn:
+                    t0 = time.perf_counter()    # the replica's latency, not the pool wait
+                    result = fn(conn, replica)
+                    seconds = time.perf_counter() - t0
+            except Exception as e:
+                self.end(replica, error=e)
+                tried.append(replica)
+                if not (is_connection_error(e) or isinstance(e, PoolTimeout)) or len(tried) == len(self.replicas):
+                    raise
+                self.failover(replica)
+                continue
+            self.end(replica, seconds)
+            return result
+
+    # ---------- health ----------
+    def mark_down(self, replica: Replica, error: Exception = None):
+        with self._lock:
+            if replica.healthy:
+                replica.healthy = False
+                replica.down_since = time.time()
+            if error is not None:
+                replica.last_error = str(error)[:200]
+            if self._checker is None or not self._checker.is_alive():
+                self._checker = threading.Thread(target=self._recheck_loop, name="db-health", daemon=True)
+                self._checker.start()
+        replica.dispose()   # drop pooled sessions to the failed instance
+
+    def _mark_up(self, replica: Replica):
+        replica.healthy = True
+        replica.down_since = None
+
+    def check(self, replica: Replica) -> bool:
+        """Run health_sql on the replica; updates its health."""
+        try:
+            with replica.engine().connect() as conn:
+                conn.execute(text(self.health_sql)).fetchall()
+        except Exception as e:
+            self.mark_down(replica, e)
+            return False
+        with self._lock:
+            self._mark_up(replica)
+        return True
+
+    def check_all(self) -> dict:
+        return {r.name: self.check(r) for r in self.replicas}
+
+    def _recheck_loop(self):
+        while True:
+            time.sleep(self.retry_seconds)
+            # Under the lock: a mark_down() racing with the exit either is seen here or starts a new checker
+            with self._lock:
+                down = [r for r in self.replicas if not r.healthy]
+                if not down:
+                    self._checker = None
+                    return
+            for replica in down:
+                self.check(replica)
+
+    def status(self) -> list:
+        """One dict per replica for the sidebar and /healthz."""
+        with self._lock:
+            return [{"name": r.name, "healthy": r.healthy, "in_flight": r.in_flight, "capacity": r.capacity,
+                     "served": r.served, "errors": r.errors, "failovers": r.failovers,
+                     "latency_ms": round(1000 * r.latency, 1) if r.latency is not None else None,
+                     "last_error": r.last_error} for r in self.replicas]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.dispose()
+
+
+# ---------- configuration ----------
+def oracle_url(user: str, password: str, host: str, service: str) -> str:
+    return f"oracle+oracledb://{user}:{password}@{host}/?service_name={service}"
+
+
+def replica_from_config(entry: dict, defaults: dict, session_sql=(), pool_timeout: float = 15) -> Replica:
+    """Replica from a databases.json entry; missing fields come from defaults (the pipeline's ORACLE_*)."""
+    spec = {**defaults, **entry}
+    url, dsn = spec.get("url"), None
+    if not url:
+        url = oracle_url(spec["user"], spec["password"], spec["host"], spec["service"])
+        dsn = f"{spec['host']}/{spec['service']}"
+    return Replica(
+        spec.get("name") or spec.get("host") or url,
+        url, dsn=dsn, user=spec.get("user"), password=spec.get("password"),
+        pool_size=spec.get("pool_size", 4), max_overflow=spec.get("max_overflow", 2),
+        pool_timeout=spec.get("pool_timeout", pool_timeout),
+        session_sql=list(session_sql) + list(entry.get("session_sql", ())),
+        stmtcachesize=spec.get("stmtcachesize"),
+    )
+
+
+def load_router(path: Path, defaults: dict, pool_timeout: float = 15) -> ReplicaRouter:
+    """Router for the databases in path; without the file, a single replica built from defaults."""
+    path = Path(path)
+    config = json.loads(path.read_text()) if path.exists() else {}
+    session_sql = config.get("session_sql", ())
+    entries = config.get("replicas") or [{}]
+    replicas = [replica_from_config(entry, defaults, session_sql, pool_timeout) for entry in entries]
+    return ReplicaRouter(replicas, health_sql=config.get("health_sql", DEFAULT_HEALTH_SQL),
+                         retry_seconds=config.get("retry_seconds", DEFAULT_RETRY_SECONDS))
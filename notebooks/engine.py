@@ -0,0 +1,524 @@
+"""
+engine.py
+=========
+Async pipeline engine: the stages of pipeline.py (classify -> generate
+-> validate -> repair -> execute -> narrate) as coroutines, so a single
+event loop serves many officer sessions instead of one blocking script
+thread each.
+
+  - LLM calls use ollama.AsyncClient and are admitted by the shared
+    LLMScheduler without holding a thread (acquire_async)
+  - Oracle queries use one python-oracledb async connection pool per
+    database of pipeline.get_router() (least-loaded routing, failover)
+  - answer() is an async generator of JSON-ready events; api_server.py
+    streams them over SSE / WebSocket and app.py renders them when
+    ENGINE_URL is set
+
+Prompts, validation, cost guard, repair rules, summaries and caches are
+the ones pipeline.py uses; only the I/O differs.
+
+Events (dicts with an "event" key):
+    status      stage, message
+    queue       position, waiting          (waiting for an LLM slot)
+    classified  query_type, source
+    sql         sql, source, seconds
+    repair      attempt, error
+    result      columns, data (first PREVIEW_ROWS rows), total_rows, estimated, seconds, ...
+    delta       text                       (narration / chat tokens, think blocks removed;
+                                           a single templated delta for 1x1 results and lookups)
+    done        mode, answer, timings, total   (mode "lookup" adds sections, errors)
+    error       kind, message
+"""
+
+import asyncio
+import json
+import time
+
+import ollama
+import oracledb
+
+from db_router import NoReplicaAvailable, is_connection_error
+from entity_lookup import Dossier, section_queries
+from sql_binds import bind_literals, is_bind_error
+from cost_guard import make_sargable, explain_plan_async, check_plan
+from query_cache import SQLCache, ResultCache
+from result_summary import templated_answer
+from sql_repair import is_repairable
+from stream_filter import ThinkStreamFilter
+from tracing import Tracer
+from pipeline import (
+    SQL_MODEL, CHAT_MODEL, QWEN3_OPTIONS, CLASSIFIER_OPTIONS, SQL_OPTIONS, LLM_KEEP_ALIVE,
+    ORACLE_POOL_TIMEOUT, ORACLE_CALL_TIMEOUT_MS, ORACLE_ARRAYSIZE, MAX_RESULT_ROWS,
+    BIND_LITERALS, COST_GUARD, PLAN_COST_BUDGET, PLAN_COST_LIMIT, REPAIR_ATTEMPTS, REPAIR_DEADLINE,
+    get_scheduler, get_router, get_repairer, record_stats, pre_classify, classifier_messages, parse_classification,
+    match_template, detect_lookup, LOOKUP_SECTION_ROWS, LOOKUP_PARALLEL, cache_literals, cache_version,
+    sql_messages, extract_sql, analyze_sql, repair_messages, narration_messages, general_chat_messages,
+    static_prefixes, WARM_OPTIONS,
+    capped_sql, is_duplicate_column_error, execution_error, rows_to_dataframe, learn_example,
+)
+
+PREVIEW_ROWS = 50   # rows sent to clients in the "result" event
+
+
+def frame_preview(df, n: int = PREVIEW_ROWS) -> dict:
+    """JSON-ready {"columns", "data"} for the first n rows."""
+    split = json.loads(df.head(n).to_json(orient="split", index=False, date_format="iso",
+                                          default_handler=str))
+    return {"columns": split["columns"], "data": split["data"]}
+
+
+class PipelineEngine:
+    """One per process; answer() may run concurrently for any number of sessions."""
+
+    def __init__(self, tracer: Tracer = None, sql_cache: SQLCache = None,
+                 result_cache: ResultCache = None, speculative: bool = True):
+        self.client = ollama.AsyncClient()
+        self.tracer = tracer or Tracer()
+        self.sql_cache = sql_cache or SQLCache(literals_fn=cache_literals, version_fn=cache_version)
+        self.result_cache = result_cache or ResultCache(version_fn=cache_version)
+        self.speculative = speculative   # generate SQL while the LLM classifier runs
+        self._pools = {}            # replica name -> async pool
+        self._sessions = set()      # (replica, sid, serial#) that ran the replica's session_sql
+        self._lookup_slots = asyncio.Semaphore(LOOKUP_PARALLEL)    # shared by all lookups
+
+    # ------------------------------------------------------------
+    # Resources
+    # ------------------------------------------------------------
+    def pool(self, replica):
+        if replica.name not in self._pools:
+            self._pools[replica.name] = oracledb.create_pool_async(
+                user=replica.user, password=replica.password, dsn=replica.dsn,
+                min=1, max=replica.capacity, increment=1, stmtcachesize=replica.stmtcachesize,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT, wait_timeout=ORACLE_POOL_TIMEOUT * 1000,
+            )
+        return self._pools[replica.name]
+
+    async def _init_session(self, replica, conn):
+        key = (replica.name, conn.session_id, conn.serial_num)
+        if not replica.session_sql or key in self._sessions:
+            return
+        with conn.cursor() as cursor:
+            for statement in replica.session_sql:
+                try:
+                    await cursor.execute(statement)
+                except Exception as e:
+                    replica.last_error = f"session_sql: {str(e)[:200]}"
+        self._sessions.add(key)
+
+    async def _drop_pool(self, replica):
+        pool = self._pools.pop(replica.name, None)
+        if pool is not None:
+            try:
+                await pool.close(force=True)
+            except Exception:
+                pass
+
+    async def close(self):
+        for name in list(self._pools):
+            await self._pools.pop(name).close(force=True)
+
+    async def warm_models(self):
+        """Load SQL_MODEL and CHAT_MODEL and prefill their static system prompts."""
+        for model in (SQL_MODEL, CHAT_MODEL):
+            try:
+                await self.client.chat(model=model, messages=[], keep_alive=LLM_KEEP_ALIVE)
+            except Exception:
+                pass
+        for model, system in dict.fromkeys(static_prefixes()):
+            try:
+                await self.client.chat(model=model, messages=[{"role": "system", "content": system}],
+                                       options=WARM_OPTIONS, keep_alive=LLM_KEEP_ALIVE)
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------
+    # LLM calls (session = (session_id, on_wait))
+    # ------------------------------------------------------------
+    async def _chat(self, model, messages, options, session, stats=None) -> str:
+        session_id, on_wait = session
+        scheduler = get_scheduler()
+        waited = await scheduler.acquire_async(model, session_id, on_wait)
+        try:
+            response = await self.client.chat(model=model, messages=messages, options=options,
+                                              keep_alive=LLM_KEEP_ALIVE)
+        finally:
+            scheduler.release(model, session_id)
+        if stats is not None:
+            stats["queue_wait"] = waited
+        record_stats(stats, response)
+        return response["message"]["content"]
+
+    async def _stream(self, model, messages, options, session, emit, stats=None) -> tuple:
+        """Stream visible text as "delta" events. Returns (final_text, latency, ttft)."""
+        session_id, on_wait = session
+        scheduler = get_scheduler()
+        waited = await scheduler.acquire_async(model, session_id, on_wait)
+        t0 = time.time()
+        ttft = None
+        stream_filter = ThinkStreamFilter()
+        try:
+            stream = await self.client.chat(model=model, messages=messages, options=options, stream=True,
+                                            keep_alive=LLM_KEEP_ALIVE)
+            async for chunk in stream:
+                token = chunk.get("message", {}).get("content", "")
+                new_text = stream_filter.feed(token) if token else ""
+                if new_text:
+                    if ttft is None:
+                        ttft = time.time() - t0
+                    emit("delta", text=new_text)
+                if chunk.get("done"):
+                    record_stats(stats, chunk)
+        finally:
+            scheduler.release(model, session_id)
+        if stats is not None:
+            stats["queue_wait"] = waited
+        latency = time.time() - t0
+        return stream_filter.finish(), latency, ttft if ttft is not None else latency
+
+    # ------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------
+    async def classify(self, question: str, history: list, session, stats: dict = None) -> str:
+        try:
+            reply = await self._chat(CHAT_MODEL, classifier_messages(question, history), CLASSIFIER_OPTIONS,
+                                     session, stats)
+            return parse_classification(reply)
+        except Exception:
+            return "DATABASE"
+
+    async def generate_sql(self, question: str, session, stats: dict = None) -> tuple:
+        """Returns (sql, latency)."""
+        t0 = time.time()
+        messages = await asyncio.to_thread(sql_messages, question)   # may embed the question
+        raw = await self._chat(SQL_MODEL, messages, SQL_OPTIONS, session, stats)
+        return extract_sql(raw), time.time() - t0
+
+    async def repair_sql(self, question: str, sql: str, error: str, session, stats: dict = None) -> tuple:
+        """One repair round. Returns (new_sql, source) with source rule / cache / llm."""
+        async def llm_fix(bad_sql, err):
+            return extract_sql(await self._chat(SQL_MODEL, repair_messages(question, bad_sql, err), SQL_OPTIONS,
+                                                session, stats))
+        return await get_repairer().fix_async(sql, error, llm_fix)
+
+    async def execute_sql(self, sql: str, max_rows: int = MAX_RESULT_ROWS, cost_guard: bool = COST_GUARD) -> tuple:
+        """pipeline.execute_sql on the async pool: (ok, df, message, exec_time)."""
+        analysis = analyze_sql(sql)
+        if not analysis.ok:
+            return False, None, f"Validation failed: {analysis.reason}", 0.0
+        rewrites, plan, action = [], None, "run"
+        if cost_guard:
+            sql, rewrites = make_sargable(sql)
+        router = get_router()
+        tried = [r for r in router.replicas if not r.dsn]   # SQLAlchemy-only stand-ins have no async pool
+        t0 = time.time()
+        while True:
+            try:
+                replica = router.pick(exclude=tried)
+            except NoReplicaAvailable as e:
+                return False, None, execution_error(e), 0.0
+            router.begin(replica)
+            try:
+                async with self.pool(replica).acquire() as conn:
+                    started = time.perf_counter()
+                    await self._init_session(replica, conn)
+                    conn.call_timeout = ORACLE_CALL_TIMEOUT_MS
+                    if cost_guard:
+                        plan = await explain_plan_async(conn, sql)
+                        action, guard_msg = check_plan(plan, PLAN_COST_BUDGET, PLAN_COST_LIMIT)
+                        if action == "reject":
+                            router.end(replica, time.perf_counter() - started)
+                            return False, None, f"Rejected by cost guard: {guard_msg}", time.time() - t0
+                    cursor = conn.cursor()
+                    cursor.arraysize = ORACLE_ARRAYSIZE
+                    cursor.prefetchrows = ORACLE_ARRAYSIZE + 1
+                    shape, binds = bind_literals(sql) if BIND_LITERALS else (sql, {})
+                    try:
+                        await cursor.execute(capped_sql(shape, max_rows, action), binds or None)
+                    except Exception as e:
+                        if not binds or not is_bind_error(e):
+                            raise
+                        shape, binds = sql, {}
+                        await cursor.execute(capped_sql(sql, max_rows, action))
+                    df = rows_to_dataframe(cursor.description, await cursor.fetchall())
+                    total_rows = len(df)
+                    if total_rows > max_rows:
+                        df = df.head(max_rows)
+                        if action == "limit":
+                            total_rows = max(plan.cardinality, max_rows + 1)
+                            df.attrs["total_rows_estimated"] = True
+                        else:
+                            try:
+                                await cursor.execute(f"SELECT COUNT(*) FROM ({shape})", binds or None)
+                                total_rows = (await cursor.fetchone())[0]
+                            except Exception as e:
+                                if not is_duplicate_column_error(e):
+                                    raise
+                                plan = plan or await explain_plan_async(conn, sql)
+                                total_rows = max(plan.cardinality, max_rows + 1)
+                                df.attrs["total_rows_estimated"] = True
+            except Exception as e:
+                router.end(replica, error=e)
+                tried.append(replica)
+                if is_connection_error(e):
+                    await self._drop_pool(replica)
+                    if len(tried) < len(router.replicas):
+                        router.failover(replica)
+                        continue
+                return False, None, execution_error(e), 0.0
+            router.end(replica, time.perf_counter() - started)
+            break
+        exec_time = time.time() - t0
+        df.attrs["total_rows"] = total_rows
+        df.attrs["database"] = replica.name
+        df.attrs["executed_sql"] = sql
+        df.attrs["rewrites"] = rewrites
+        if plan is not None:
+            df.attrs["plan_cost"] = plan.cost
+            df.attrs["estimated_rows"] = plan.cardinality
+        msg = f"{total_rows} rows" if total_rows == len(df) else f"{len(df)} of {total_rows} rows"
+        return True, df, msg, exec_time
+
+    async def query(self, sql: str, binds: dict = None):
+        """Fixed, trusted SQL (no validation or cost guard) on the async pool, with failover -> DataFrame."""
+        router = get_router()
+        tried = [r for r in router.replicas if not r.dsn]
+        while True:
+            replica = router.pick(exclude=tried)
+            router.begin(replica)
+            try:
+                async with self.pool(replica).acquire() as conn:
+                    started = time.perf_counter()
+                    await self._init_session(replica, conn)
+                    conn.call_timeout = ORACLE_CALL_TIMEOUT_MS
+                    cursor = conn.cursor()
+                    cursor.arraysize = ORACLE_ARRAYSIZE
+                    await cursor.execute(sql, binds or None)
+                    df = rows_to_dataframe(cursor.description, await cursor.fetchall())
+            except Exception as e:
+                router.end(replica, error=e)
+                tried.append(replica)
+                if is_connection_error(e):
+                    await self._drop_pool(replica)
+                    if len(tried) < len(router.replicas):
+                        router.failover(replica)
+                        continue
+                raise
+            router.end(replica, time.perf_counter() - started)
+            return df
+
+    async def lookup(self, identifier) -> Dossier:
+        """entity_lookup dossier; at most LOOKUP_PARALLEL sections (across all lookups) in flight."""
+        t0 = time.perf_counter()
+        queries = section_queries(identifier, LOOKUP_SECTION_ROWS)
+
+        async def section(sql, binds):
+            async with self._lookup_slots:
+                return await self.query(sql, binds)
+
+        results = await asyncio.gather(*(section(sql, binds) for _, sql, binds in queries), return_exceptions=True)
+        frames, errors = {}, {}
+        for (name, _, _), result in zip(queries, results):
+            if isinstance(result, Exception):
+                errors[name] = str(result)[:200]
+            else:
+                frames[name] = result
+        return Dossier(identifier, frames, errors, time.perf_counter() - t0)
+
+    # ------------------------------------------------------------
+    # One question
+    # ------------------------------------------------------------
+    async def answer(self, question: str, history=(), session_id: str = None):
+        """Async generator of events for one question; closing it cancels the remaining work."""
+        queue = asyncio.Queue()
+
+        def emit(event, **fields):
+            queue.put_nowait({"event": event, **fields})
+
+        task = asyncio.create_task(self._run(question, list(history), session_id, emit))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _run(self, question, history, session_id, emit):
+        trace = self.tracer.start_trace(session_id, question)
+        session = (session_id, lambda position, waiting: emit("queue", position=position, waiting=waiting))
+        try:
+            await self._answer(question, history, session, trace, emit)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            emit("error", kind="internal", message=f"{type(e).__name__}: {str(e)[:200]}")
+        finally:
+            trace.finish()
+
+    async def _answer(self, question, history, session, trace, emit):
+        request_start = time.time()
+        identifier = detect_lookup(question)
+        if identifier:
+            # Pasted passport / CNIC / traveler id: fixed parallel lookups, no LLM
+            trace.set(query_type="LOOKUP")
+            emit("classified", query_type="LOOKUP", source="pattern")
+            emit("status", stage="lookup", message=f"Looking up {identifier.label}...")
+            with trace.span("lookup", kind=identifier.kind) as span:
+                dossier = await self.lookup(identifier)
+                span.set(rows=dossier.row_counts(), errors=len(dossier.errors))
+            answer = dossier.markdown()
+            emit("delta", text=answer)
+            emit("done", mode="lookup", answer=answer, timings={"lookup": dossier.seconds},
+                 total=time.time() - request_start, sections=dossier.row_counts(), errors=dossier.errors)
+            return
+        emit("status", stage="classify", message="Analyzing your question...")
+
+        # Obvious cases skip the LLM classifier; a cached question was already DATABASE
+        sql_task, gen_stats = None, {}
+        try:
+            with trace.span("classify") as span:
+                query_type, source = pre_classify(question), "heuristic"
+                cached_sql, sql_hit, template = None, None, None
+                if query_type != "GENERAL":
+                    template = match_template(question)
+                    if template:
+                        query_type, source = "DATABASE", "template"
+                    else:
+                        cached_sql, sql_hit = await asyncio.to_thread(self.sql_cache.get, question)
+                        if cached_sql:
+                            query_type, source = "DATABASE", "cache"
+                if query_type is None:
+                    if self.speculative:
+                        sql_task = asyncio.create_task(self.generate_sql(question, session, gen_stats))
+                    classify_stats = {}
+                    query_type = await self.classify(question, history, session, classify_stats)
+                    source = "LLM"
+                    span.set(**classify_stats)
+                    if query_type == "GENERAL" and sql_task is not None:
+                        sql_task.cancel()
+                span.set(result=query_type, source=source)
+            timings = {"classify": time.time() - request_start}
+            trace.set(query_type=query_type)
+            emit("classified", query_type=query_type, source=source)
+
+            if query_type == "GENERAL":
+                emit("status", stage="narrate", message="Responding...")
+                with trace.span("narrate", mode="general") as span:
+                    chat_stats = {}
+                    text, latency, ttft = await self._stream(CHAT_MODEL, general_chat_messages(question, history),
+                                                             QWEN3_OPTIONS, session, emit, chat_stats)
+                    span.set(ttft=ttft, **chat_stats)
+                timings.update(narrate=latency, first_token=time.time() - request_start - latency + ttft)
+                emit("done", mode="general", answer=text, timings=timings, total=time.time() - request_start)
+                return
+
+            # Step 1: SQL (template, cached, speculative or generated now)
+            if template:
+                sql, gen_time, sql_source = template.sql, 0.0, f"template ({template.intent})"
+                trace.record("sql_gen", 0.0, template=template.intent, subject=template.subject)
+            elif cached_sql:
+                sql, gen_time, sql_source = cached_sql, 0.0, f"cache ({sql_hit})"
+                trace.record("sql_gen", 0.0, cache_hit=True, cache_tier="sql", match=sql_hit)
+            else:
+                emit("status", stage="sql_gen", message="Generating SQL...")
+                if sql_task is not None:
+                    with trace.span("sql_gen_wait"):
+                        sql, gen_time = await sql_task
+                    trace.record("sql_gen", gen_time, speculative=True, **gen_stats)
+                else:
+                    with trace.span("sql_gen") as span:
+                        sql, gen_time = await self.generate_sql(question, session, gen_stats)
+                        span.set(**gen_stats)
+                sql_source = "llm"
+            timings["sql_gen"] = gen_time
+            emit("sql", sql=sql, source=sql_source, seconds=gen_time)
+        finally:
+            if sql_task is not None and not sql_task.done():
+                sql_task.cancel()
+
+        # Steps 2-3: validate + execute; failed SQL goes through the repair loop
+        repair_steps, repair_start = [], None
+        while True:
+            with trace.span("validate") as span:
+                analysis = analyze_sql(sql)
+                span.set(valid=analysis.ok, reason=None if analysis.ok else analysis.reason,
+                         tables=list(analysis.tables))
+            error = None if analysis.ok else f"Validation failed: {analysis.reason}"
+
+            if error is None:
+                emit("status", stage="execute", message="Querying database...")
+                with trace.span("execute") as span:
+                    df = self.result_cache.get(sql)
+                    result_hit = df is not None
+                    span.set(cache_hit=result_hit, cache_tier="result", sql=sql)
+                    if result_hit:
+                        exec_time = 0.0
+                    else:
+                        ok, df, exec_msg, exec_time = await self.execute_sql(sql)
+                        if ok:
+                            self.result_cache.put(sql, df, exec_time)
+                        else:
+                            span.status = "error"
+                            span.set(error=exec_msg)
+                            error = exec_msg
+                    if error is None:
+                        span.set(rows=len(df), total_rows=df.attrs.get("total_rows", len(df)),
+                                 plan_cost=df.attrs.get("plan_cost"), sql=df.attrs.get("executed_sql"))
+            if error is None:
+                break
+
+            repair_start = repair_start or time.time()
+            if (len(repair_steps) >= REPAIR_ATTEMPTS or not is_repairable(error)
+                    or time.time() - repair_start > REPAIR_DEADLINE):
+                if repair_steps:
+                    get_repairer().record(False, time.time() - repair_start)
+                emit("error", kind="blocked" if not analysis.ok else "execution", message=error,
+                     sql=sql, repair_attempts=len(repair_steps))
+                return
+
+            emit("repair", attempt=len(repair_steps) + 1, error=error[:200])
+            with trace.span("repair", attempt=len(repair_steps) + 1) as span:
+                repair_stats = {}
+                new_sql, repair_source = await self.repair_sql(question, sql, error, session, repair_stats)
+                span.set(source=repair_source, failure=error[:200], **repair_stats)
+            repair_steps.append((error, sql, new_sql, repair_source))
+            sql = new_sql
+            emit("sql", sql=sql, source=f"repair ({repair_source})", seconds=time.time() - repair_start)
+
+        if repair_steps:
+            timings["repair"] = time.time() - repair_start
+            last_error, bad_sql, fixed_sql, _ = repair_steps[-1]
+            get_repairer().learn(last_error, bad_sql, fixed_sql)
+            get_repairer().record(True, timings["repair"])
+        if not (cached_sql or template) or repair_steps:
+            await asyncio.to_thread(self.sql_cache.put, question, sql, gen_time)
+            await asyncio.to_thread(learn_example, question, sql, df)
+
+        timings["execute"] = exec_time
+        emit("result", **frame_preview(df), total_rows=df.attrs.get("total_rows", len(df)),
+             estimated=bool(df.attrs.get("total_rows_estimated")), seconds=exec_time, cache_hit=result_hit,
+             plan_cost=df.attrs.get("plan_cost"), rewrites=df.attrs.get("rewrites", []),
+             tables=list(analysis.tables))
+
+        # Step 4: narrate (single values are templated, no CHAT_MODEL call)
+        templated = templated_answer(question, df)
+        if templated:
+            trace.record("narrate", 0.0, mode="template")
+            emit("delta", text=templated)
+            timings.update(narrate=0.0, first_token=time.time() - request_start)
+            emit("done", mode="database", answer=templated, sql=sql, timings=timings,
+                 total=time.time() - request_start, narration="template")
+            return
+        emit("status", stage="narrate", message="Generating briefing...")
+        nar_start = time.time() - request_start
+        with trace.span("narrate", mode="database") as span:
+            nar_stats = {}
+            narration, nar_time, ttft = await self._stream(CHAT_MODEL, narration_messages(question, df), QWEN3_OPTIONS,
+                                                           session, emit, nar_stats)
+            span.set(ttft=ttft, **nar_stats)
+        timings.update(narrate=nar_time, first_token=nar_start + ttft)
+        emit("done", mode="database", answer=narration, sql=sql, timings=timings,
+             total=time.time() - request_start)
@@ -0,0 +1,20 @@
+"""
+engine_client.py
+================
+Blocking client for api_server.py, used by app.py when ENGINE_URL is set.
+"""
+
+import json
+
+import httpx
+
+
+def stream_answer(base_url: str, question: str, session_id: str = None, history=(), timeout: float = 300.0):
+    """Yield engine event dicts from POST /v1/answer as they arrive (SSE)."""
+    payload = {"question": question, "session_id": session_id, "history": list(history)}
+    with httpx.stream("POST", f"{base_url.rstrip('/')}/v1/answer", json=payload,
+                      timeout=httpx.Timeout(timeout, connect=5.0)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("data: "):
+                yield json.loads(line[len("data: "):])
@@ -0,0 +1,232 @@
+"""
+entity_lookup.py
+================
+Lookup mode for pasted identifiers: "AFG56759493", "check CNIC
+35202-1234567-1", "traveler id 4711". No classifier, no SQL_MODEL:
+the identifier is recognized by pattern and a fixed set of indexed
+queries runs in parallel, one pooled connection each (at most
+pipeline.LOOKUP_PARALLEL at a time, across all lookups):
+
+    profile     travelers + nationality + risk profile
+    documents   document_registry
+    watchlist   by traveler_id, and by passport_number (name-only alerts
+                carry no traveler_id)
+    ecl         ecl_entries
+    offloading  offloading_records + port + destination
+    travel      travel_records + entry/exit ports (latest first)
+
+Every section selects its travelers with the same subquery on the
+identifier, so there is no second round-trip after resolving it. The
+indexes these need (watchlist.passport_number,
+document_registry.document_number, ecl_entries.traveler_id) are in
+scripts/oracle_schema.sql.
+
+A message is a lookup only when nothing but lookup words surround the
+identifier ("details", "profile", "who is" ...); "how many trips did
+AFG56759493 make in 2025" stays an NL2SQL question.
+"""
+
+import re
+import time
+
+SECTION_ROWS = 20
+
+PASSPORT_RE = re.compile(r"\b([A-Z]{2,3}\d{7,8})\b", re.IGNORECASE)    # ISO3 + 8 digits; PK: 2 letters + 7
+CNIC_RE = re.compile(r"\b(\d{5})-?(\d{7})-?(\d)\b")                     # 35202-1234567-1 (CNIC / NICOP)
+TRAVELER_ID_RE = re.compile(r"\b(?:traveler|traveller|passenger)\s*(?:id)?\s*(?:#|no\.?|number)?\s*:?\s*(\d{1,10})\b",
+                            re.IGNORECASE)
+
+# Words that may surround the identifier in a lookup request
+LOOKUP_WORDS = {
+    "check", "lookup", "look", "up", "search", "find", "who", "is", "whos", "show", "me", "get", "give", "pull",
+    "open", "run", "verify", "details", "detail", "profile", "dossier", "record", "records", "history", "info",
+    "information", "background", "everything", "all", "data", "about", "on", "for", "of", "the", "a", "please", "travel",
+    "passport", "cnic", "nicop", "id", "card", "number", "no", "traveler", "traveller", "passenger", "this",
+}
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+class Identifier:
+    def __init__(self, kind: str, value: str, alternatives=()):
+        self.kind = kind                        # "passport", "cnic" or "traveler_id"
+        self.value = value
+        self.alternatives = list(alternatives)  # other spellings stored in the database
+
+    @property
+    def label(self) -> str:
+        return {"passport": "Passport", "cnic": "CNIC", "traveler_id": "Traveler ID"}[self.kind] + f" {self.value}"
+
+    def __repr__(self):
+        return f"Identifier({self.kind}, {self.value})"
+
+
+def detect_identifier(message: str):
+    """Identifier when the message is a lookup request, else None."""
+    for kind, pattern in (("cnic", CNIC_RE), ("traveler_id", TRAVELER_ID_RE), ("passport", PASSPORT_RE)):
+        matches = list(pattern.finditer(message))
+        if len(matches) != 1:
+            continue
+        m = matches[0]
+        rest = message[:m.start()] + " " + message[m.end():]
+        if not set(_WORD_RE.findall(rest.lower())) <= LOOKUP_WORDS or re.search(r"\d", rest):
+            return None
+        if kind == "cnic":
+            dashed, plain = "-".join(m.groups()), "".join(m.groups())
+            return Identifier("cnic", dashed, [plain])
+        if kind == "traveler_id":
+            return Identifier("traveler_id", m.group(1))
+        return Identifier("passport", m.group(1).upper())
+    return None
+
+
+# ============================================================
+# Sections
+# ============================================================
+SECTIONS = [
+    ("profile", "Traveler", """SELECT t.traveler_id, t.first_name, t.last_name, t.passport_number, t.date_of_birth,
+       t.gender, nc.country_name AS nationality, t.occupation, rp.risk_tier, rp.risk_score
+FROM travelers t
+JOIN countries nc ON nc.country_id = t.nationality_id
+LEFT JOIN risk_profiles rp ON rp.traveler_id = t.traveler_id
+WHERE t.traveler_id IN ({travelers})"""),
+    ("documents", "Documents", """SELECT d.document_type, d.document_number, ic.country_name AS issuing_country,
+       d.issue_date, d.expiry_date, d.status
+FROM document_registry d
+JOIN countries ic ON ic.country_id = d.issuing_country_id
+WHERE d.traveler_id IN ({travelers})
+ORDER BY d.issue_date DESC"""),
+    ("watchlist", "Watchlist", """SELECT wl.alert_id, wl.alert_type, wl.severity, wl.issued_by, wl.issued_date,
+       wl.expiry_date, wl.is_active
+FROM watchlist wl
+WHERE wl.traveler_id IN ({travelers})
+UNION
+SELECT wl.alert_id, wl.alert_type, wl.severity, wl.issued_by, wl.issued_date, wl.expiry_date, wl.is_active
+FROM watchlist wl
+WHERE wl.passport_number IN ({passports})
+ORDER BY is_active DESC, issued_date DESC"""),
+    ("ecl", "Exit Control List", """SELECT e.reason, e.issuing_authority, e.issued_date, e.expiry_date, e.status,
+       e.case_reference
+FROM ecl_entries e
+WHERE e.traveler_id IN ({travelers})
+ORDER BY e.issued_date DESC"""),
+    ("offloading", "Off-loadings", """SELECT ol.offload_date, poe.port_name, ol.airline, ol.flight_number, ol.reason,
+       dc.country_name AS destination
+FROM offloading_records ol
+JOIN ports_of_entry poe ON poe.port_id = ol.port_id
+LEFT JOIN countries dc ON dc.country_id = ol.destination_country_id
+WHERE ol.traveler_id IN ({travelers})
+ORDER BY ol.offload_date DESC"""),
+    ("travel", "Travel history", """SELECT tr.travel_direction, tr.entry_date, ep.port_name AS entry_port, tr.exit_date,
+       xp.port_name AS exit_port, tr.carrier, tr.flight_number, tr.travel_purpose, tr.overstay_flag,
+       tr.flagged_suspicious
+FROM travel_records tr
+LEFT JOIN ports_of_entry ep ON ep.port_id = tr.entry_port_id
+LEFT JOIN ports_of_entry xp ON xp.port_id = tr.exit_port_id
+WHERE tr.traveler_id IN ({travelers})
+ORDER BY COALESCE(tr.entry_date, tr.exit_date) DESC"""),
+]
+
+
+def _subqueries(identifier: Identifier) -> tuple:
+    """(travelers, passports) subqueries for the identifier, and their binds."""
+    if identifier.kind == "traveler_id":
+        travelers, binds = ":id", {"id": int(identifier.value)}
+    elif identifier.kind == "passport":
+        travelers = ("SELECT tp.traveler_id FROM travelers tp WHERE tp.passport_number = :id "
+                     "UNION SELECT dp.traveler_id FROM document_registry dp WHERE dp.document_number = :id")
+        binds = {"id": identifier.value}
+    else:
+        travelers = "SELECT dp.traveler_id FROM document_registry dp WHERE dp.document_number IN (:id, :alt)"
+        binds = {"id": identifier.value, "alt": identifier.alternatives[0]}
+    if identifier.kind == "passport":
+        passports = ":id"
+    else:
+        passports = f"SELECT pp.passport_number FROM travelers pp WHERE pp.traveler_id IN ({travelers})"
+    return travelers, passports, binds
+
+
+def section_queries(identifier: Identifier, rows: int = SECTION_ROWS) -> list:
+    """[(name, sql, binds)] for every dossier section."""
+    travelers, passports, binds = _subqueries(identifier)
+    return [(name, sql.format(travelers=travelers, passports=passports) + f"\nFETCH FIRST {rows} ROWS ONLY", binds)
+            for name, _, sql in SECTIONS]
+
+
+class Dossier:
+    def __init__(self, identifier: Identifier, frames: dict, errors: dict, seconds: float):
+        self.identifier = identifier
+        self.frames = frames        # section -> DataFrame
+        self.errors = errors        # section -> error message
+        self.seconds = seconds
+
+    @property
+    def found(self) -> bool:
+        return any(len(df) for df in self.frames.values())
+
+    def row_counts(self) -> dict:
+        return {name: len(df) for name, df in self.frames.items()}
+
+    def markdown(self, max_rows: int = 10) -> str:
+        """The dossier as one markdown answer: headline, alerts, then one table per non-empty section."""
+        if not self.found:
+            missing = "" if not self.errors else f" ({len(self.errors)} lookup(s) failed)"
+            return f"No traveler, document or watchlist entry matches **{self.identifier.label}**{missing}."
+        lines = [f"### 🪪 {self.identifier.label}"]
+        profile = self.frames.get("profile")
+        if profile is not None and len(profile):
+            for p in profile.head(3).to_dict("records"):
+                risk = f" · Risk: **{p['risk_tier']}** ({p['risk_score']})" if p.get("risk_tier") else ""
+                lines.append(f"**{p['first_name']} {p['last_name']}** · {p['nationality']} · "
+                             f"passport {p['passport_number']} · born {_cell(p['date_of_birth'])}{risk}")
+        flags = []
+        watch = self.frames.get("watchlist")
+        if watch is not None and len(watch):
+            active = int((watch["is_active"] == 1).sum())
+            flags.append(f"⚠️ {active} active watchlist alert(s)" if active else f"{len(watch)} inactive watchlist alert(s)")
+        ecl = self.frames.get("ecl")
+        if ecl is not None and (ecl["status"] == "Active").any():
+            flags.append("⛔ on the Exit Control List")
+        for name, noun in (("offloading", "off-loading(s)"), ("travel", "trip(s)")):
+            df = self.frames.get(name)
+            if df is not None and len(df):
+                flags.append(f"{len(df)}{'+' if len(df) >= SECTION_ROWS else ''} {noun}")
+        if flags:
+            lines.append(" · ".join(flags))
+        for name, title, _ in SECTIONS[1:]:
+            df = self.frames.get(name)
+            if df is not None and len(df):
+                lines += ["", f"**{title}** ({len(df)})", _markdown_table(df, max_rows)]
+        for name, error in self.errors.items():
+            lines.append(f"\n_{name} lookup failed: {error}_")
+        return "\n".join(lines)
+
+
+def _cell(value) -> str:
+    if value is None or value != value:     # None / NaN / NaT
+        return "—"
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d") if not getattr(value, "hour", 0) else value.strftime("%Y-%m-%d %H:%M")
+    return str(value).replace("|", "/")
+
+
+def _markdown_table(df, max_rows: int) -> str:
+    rows = [" | ".join(df.columns), " | ".join("---" for _ in df.columns)]
+    rows += [" | ".join(_cell(v) for v in row) for row in df.head(max_rows).itertuples(index=False, name=None)]
+    if len(df) > max_rows:
+        rows.append(f"… {len(df) - max_rows} more" + " |" * (len(df.columns) - 1))
+    return "\n".join(f"| {row} |" for row in rows)
+
+
+def run_dossier(identifier: Identifier, query, executor=None, rows: int = SECTION_ROWS) -> Dossier:
+    """Dossier with query(sql, binds) -> DataFrame per section; in parallel when executor is given."""
+    t0 = time.perf_counter()
+    queries = section_queries(identifier, rows)
+    submit = executor.submit if executor else None
+    pending = {name: (submit(query, sql, binds) if submit else None, sql, binds) for name, sql, binds in queries}
+    frames, errors = {}, {}
+    for name, (future, sql, binds) in pending.items():
+        try:
+            frames[name] = future.result() if future else query(sql, binds)
+        except Exception as e:
+            errors[name] = str(e)[:200]
+    return Dossier(identifier, frames, errors, time.perf_counter() - t0)
@@ -0,0 +1,202 @@
+"""
+few_shot.py
+===========
+Worked (question, SQL) examples for the SQL prompt, retrieved by
+similarity to the officer's question.
+
+The store is seeded from Config/nb03_test_results.json (pinned) and grows
+from questions whose SQL executed and returned rows (appended to a JSONL
+log, replayed on start). Learned examples beyond `capacity` are evicted
+least-recently-used; a new example for an already known question replaces
+the old SQL.
+
+Vectors are unit-normalized and searched brute force with one NumPy
+matrix product, well under a millisecond for a few thousand examples.
+The default embedding is a hashed bag of words and character trigrams
+(no model call); any embed_fn returning a vector can replace it.
+"""
+
+import json
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from query_cache import normalize_question
+
+EMBED_DIM = 1024
+DUPLICATE_SIMILARITY = 0.97   # a new example this close to a stored one replaces it
+MAX_EXAMPLE_SQL_CHARS = 1200  # longer SQL is not worth its prompt tokens
+
+
+def hashed_embedding(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    """Hashed counts of words and character trigrams (crc32, so stable across processes)."""
+    norm = normalize_question(text)
+    vec = np.zeros(dim, dtype=np.float32)
+    padded = f" {norm} "
+    features = norm.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        vec[zlib.crc32(feature.encode()) % dim] += 1.0
+    return vec
+
+
+class Example:
+    __slots__ = ("question", "sql", "tables", "pinned", "last_used", "hits")
+
+    def __init__(self, question, sql, tables=(), pinned=False):
+        self.question = question
+        self.sql = sql
+        self.tables = tuple(tables)
+        self.pinned = pinned
+        self.last_used = time.time()
+        self.hits = 0
+
+
+class ExampleStore:
+    """Thread-safe in-process vector index of solved questions."""
+
+    def __init__(self, embed_fn=hashed_embedding, capacity: int = 500, log_path: Path = None):
+        self.embed_fn = embed_fn
+        self.capacity = capacity
+        self.log_path = Path(log_path) if log_path else None
+        self._lock = threading.Lock()
+        self._examples = []
+        self._keys = {}         # normalized question -> index
+        self._matrix = None     # row i = unit vector of _examples[i]; grown by doubling
+        self.searches = 0
+        self.search_seconds = 0.0
+        self.evicted = 0
+        if self.log_path and self.log_path.exists():
+            self._replay_log()
+
+    def __len__(self):
+        return len(self._examples)
+
+    # ---------- building ----------
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def load_seed(self, path: Path, tables_fn=None) -> int:
+        """Pinned examples from a results file (list of {question, sql, exec_success})."""
+        added = 0
+        for item in json.loads(Path(path).read_text()):
+            if item.get("sql") and item.get("exec_success", True):
+                tables = tables_fn(item["sql"]) if tables_fn else ()
+                self._insert(Example(item["question"], item["sql"], tables, pinned=True))
+                added += 1
+        return added
+
+    def add(self, question: str, sql: str, tables=()) -> bool:
+        """Learn a (question, SQL) pair that executed successfully; False if skipped."""
+        if len(sql) > MAX_EXAMPLE_SQL_CHARS or not self._insert(Example(question, sql, tables)):
+            return False
+        if self.log_path:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, self.log_path.open("a") as f:
+                f.write(json.dumps({"question": question, "sql": sql, "tables": list(tables)}) + "\n")
+        return True
+
+    def _insert(self, example: Example) -> bool:
+        """Store the example (replacing a duplicate); False if a pinned duplicate kept its place."""
+        vec = self._embed(example.question)
+        key = normalize_question(example.question)
+        with self._lock:
+            n = len(self._examples)
+            i = self._keys.get(key)
+            if i is None and n:
+                scores = self._matrix[:n] @ vec
+                best = int(np.argmax(scores))
+                i = best if scores[best] >= DUPLICATE_SIMILARITY else None
+            if i is not None:
+                if self._examples[i].pinned and not example.pinned:
+                    return False    # never overwrite a seed with a learned answer
+                del self._keys[normalize_question(self._examples[i].question)]
+            else:
+                i = n
+                self._examples.append(None)
+                if self._matrix is None:
+                    self._matrix = np.zeros((64, len(vec)), dtype=np.float32)
+                elif i == len(self._matrix):
+                    self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+            self._examples[i] = example
+            self._matrix[i] = vec
+            self._keys[key] = i
+            self._evict()
+        return True
+
+    def _evict(self):
+        learned = [i for i, e in enumerate(self._examples) if not e.pinned]
+        if len(learned) <= self.capacity:
+            return
+        drop = set(sorted(learned, key=lambda i: self._examples[i].last_used)[:len(learned) - self.capacity])
+        keep = [i for i in range(len(self._examples)) if i not in drop]
+        self._examples = [self._examples[i] for i in keep]
+        self._matrix[:len(keep)] = self._matrix[keep]
+        self._keys = {normalize_question(e.question): i for i, e in enumerate(self._examples)}
+        self.evicted += len(drop)
+
+    def _replay_log(self):
+        """Re-learn the logged examples; compact the log when it holds far more than we keep."""
+        lines = self.log_path.read_text().splitlines()
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        for entry in entries:
+            self._insert(Example(entry["question"], entry["sql"], entry.get("tables", ())))
+        if len(lines) > 2 * self.capacity:
+            kept = [e for e in self._examples if not e.pinned]
+            self.log_path.write_text("".join(
+                json.dumps({"question": e.question, "sql": e.sql, "tables": list(e.tables)}) + "\n" for e in kept))
+
+    # ---------- retrieval ----------
+    def search(self, question: str, k: int = 3, allowed_tables=None, min_similarity: float = 0.0) -> list:
+        """Up to k (Example, similarity) pairs, best first.
+
+        With allowed_tables (the schema-linked tables of the prompt), examples
+        that use any other table are skipped so the prompt stays consistent.
+        """
+        t0 = time.perf_counter()
+        vec = self._embed(question)
+        with self._lock:
+            if not self._examples:
+                return []
+            scores = self._matrix[:len(self._examples)] @ vec
+            allowed = set(allowed_tables) if allowed_tables else None
+            results = []
+            for i in np.argsort(-scores):
+                if scores[i] < min_similarity or len(results) == k:
+                    break
+                example = self._examples[i]
+                if allowed is not None and not set(example.tables) <= allowed:
+                    continue
+                example.last_used = time.time()
+                example.hits += 1
+                results.append((example, float(scores[i])))
+            self.searches += 1
+            self.search_seconds += time.perf_counter() - t0
+        return results
+
+    def summary(self) -> str:
+        pinned = sum(1 for e in self._examples if e.pinned)
+        mean_ms = 1000 * self.search_seconds / self.searches if self.searches else 0.0
+        return (f"{len(self._examples)} examples ({pinned} seed), {self.evicted} evicted, "
+                f"{mean_ms:.2f} ms/search")
+
+
+def examples_section(results: list) -> str:
+    """Prompt block for search() results, inserted before the STRICT RULES."""
+    if not results:
+        return ""
+    lines = ["=== SIMILAR SOLVED QUESTIONS (follow the patterns, answer the new question) ==="]
+    for example, _ in results:
+        lines.append(f"Q: {example.question}")
+        lines.append(f"SQL: {' '.join(example.sql.split())}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,296 @@
+"""
+index_advisor.py
+================
+Index recommendations mined from the SQL the chatbot actually runs.
+
+load_workload() reads the execute spans of the trace log
+(logs/pipeline_traces.jsonl and its rotations): executed SQL, time spent
+in Oracle and how often it ran. profile_query() walks each statement's
+tokens and records, per base table:
+
+  - join keys         a.col = b.col in ON / WHERE
+  - equality filters  col = value, col IN (...), col IS NULL
+  - range filters     col < / <= / > / >= value, BETWEEN, LIKE 'prefix%'
+  - function filters  UPPER(col) = ..., TRUNC(col, 'MM') = ... (need a function-based index)
+
+recommend() weights every access pattern by the Oracle time of the
+queries that use it, folds single-column candidates into composites that
+start with them and drops anything an existing index already leads with.
+"""
+
+import json
+import re
+import zlib
+from pathlib import Path
+
+from sql_validator import tokenize
+
+# Functions that are worth a function-based index when they wrap a filtered column
+INDEXABLE_FUNCTIONS = {"UPPER", "LOWER", "TRUNC", "EXTRACT", "TO_CHAR"}
+RANGE_OPS = {"<", "<=", ">", ">="}
+CLAUSE_WORDS = {"SELECT", "FROM", "WHERE", "GROUP", "ORDER", "HAVING", "ON", "JOIN",
+                "FETCH", "UNION", "INTERSECT", "MINUS", "CONNECT", "START"}
+PREDICATE_CLAUSES = {"ON", "WHERE"}
+MAX_NAME_LENGTH = 60    # Oracle 12.2+ allows 128
+
+
+# ============================================================
+# Workload
+# ============================================================
+def load_workload(log_path: Path) -> dict:
+    """{sql: [seconds, count]} from the execute spans of log_path and its rotated backups."""
+    log_path = Path(log_path)
+    files = sorted(log_path.parent.glob(log_path.name + ".*"), reverse=True) + [log_path]
+    workload = {}
+    for path in files:
+        if not path.exists():
+            continue
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                for span in record.get("spans", []):
+                    attrs = span.get("attrs", {})
+                    if span.get("name") != "execute" or attrs.get("cache_hit") or not attrs.get("sql"):
+                        continue
+                    entry = workload.setdefault(attrs["sql"], [0.0, 0])
+                    entry[0] += span.get("duration") or 0.0
+                    entry[1] += 1
+    return workload
+
+
+# ============================================================
+# Per-query access patterns
+# ============================================================
+class QueryProfile:
+    def __init__(self):
+        self.joins = set()       # {(table, column)}
+        self.eq = []             # [(table, column)] in order of appearance
+        self.ranges = []         # [(table, column)]
+        self.functions = set()   # {(table, expression)}
+
+    def tables(self) -> set:
+        return {t for t, _ in self.joins | self.functions} | {t for t, _ in self.eq + self.ranges}
+
+
+def _close_paren(tokens, i):
+    """Index of the ')' matching the '(' at i."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == ("op", "("):
+            depth += 1
+        elif tokens[j] == ("op", ")"):
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+
+def profile_query(sql: str, validator):
+    """QueryProfile of sql, or None when it does not pass the validator."""
+    analysis = validator.analyze(sql)
+    if not analysis.ok:
+        return None
+    tables = validator.tables
+    tokens = tokenize(sql)
+    n = len(tokens)
+
+    def at(j):
+        return tokens[j] if j < n else (None, None)
+
+    def plain_column(i):
+        """(table, column, next index) for [alias.]column at i, resolved against the schema."""
+        kind, val = at(i)
+        if kind not in ("word", "qident"):
+            return None
+        if at(i + 1) == ("op", ".") and at(i + 2)[0] in ("word", "qident"):
+            if at(i + 3) == ("op", "("):
+                return None
+            table, col, j = analysis.aliases.get(val.lower()), at(i + 2)[1].lower(), i + 3
+        else:
+            if at(i + 1) == ("op", "("):
+                return None
+            col, j = val.lower(), i + 1
+            owners = [t for t in analysis.tables if col in tables[t]]
+            table = owners[0] if len(owners) == 1 else None
+        if table not in tables or col not in tables[table]:
+            return None
+        return table, col, j
+
+    def column_at(i):
+        """(table, column, function expression or None, next index)."""
+        kind, val = at(i)
+        if kind == "word" and val in INDEXABLE_FUNCTIONS and at(i + 1) == ("op", "("):
+            close = _close_paren(tokens, i + 1)
+            if val == "EXTRACT" and at(i + 3) == ("word", "FROM"):
+                inner = plain_column(i + 4)
+                if inner and inner[2] == close:
+                    return inner[0], inner[1], f"EXTRACT({at(i + 2)[1]} FROM {inner[1]})", close + 1
+                return None
+            inner = plain_column(i + 2)
+            if inner and (inner[2] == close or at(inner[2]) == ("op", ",")):
+                rest = "".join(", " if t == ("op", ",") else t[1] for t in tokens[inner[2]:close])
+                return inner[0], inner[1], f"{val}({inner[1]}{rest})", close + 1
+            return None
+        inner = plain_column(i)
+        return (inner[0], inner[1], None, inner[2]) if inner else None
+
+    profile = QueryProfile()
+    clause = None
+    i = 0
+    while i < n:
+        kind, val = tokens[i]
+        if kind == "word" and val in CLAUSE_WORDS:
+            clause = val
+            i += 1
+            continue
+        col = column_at(i) if clause in PREDICATE_CLAUSES else None
+        if col is None:
+            i += 1
+            continue
+        table, column, func, j = col
+        op = at(j)
+        kind_eq = None
+        if op == ("op", "=") or op in (("word", "IN"), ("word", "IS")):
+            rhs = column_at(j + 1) if op == ("op", "=") else None
+            if rhs and func is None and rhs[2] is None:
+                profile.joins.update({(table, column), (rhs[0], rhs[1])})
+                i = rhs[3]
+                continue
+            if op == ("word", "IS") and at(j + 1) == ("word", "NOT"):
+                kind_eq = None         # IS NOT NULL matches most rows
+            else:
+                kind_eq = "eq"
+        elif op[0] == "op" and op[1] in RANGE_OPS or op == ("word", "BETWEEN"):
+            kind_eq = "range"
+        elif op == ("word", "LIKE") and at(j + 1)[0] == "string" and not at(j + 1)[1][1:2] in ("%", "_"):
+            kind_eq = "range"          # LIKE 'abc%' is an index range scan
+        if kind_eq and func:
+            profile.functions.add((table, func))
+        elif kind_eq == "eq" and (table, column) not in profile.eq:
+            profile.eq.append((table, column))
+        elif kind_eq == "range" and (table, column) not in profile.ranges:
+            profile.ranges.append((table, column))
+        i = j
+    return profile
+
+
+# ============================================================
+# Existing indexes
+# ============================================================
+def existing_indexes_from_ddl(ddl: str) -> dict:
+    """{table: [(col, ...)]} from CREATE INDEX, PRIMARY KEY and UNIQUE clauses of a schema script."""
+    indexes = {}
+    for m in re.finditer(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+\w+\s+ON\s+(\w+)\s*\(([^)]*)\)", ddl, re.IGNORECASE):
+        indexes.setdefault(m.group(1).lower(), []).append(
+            tuple(c.strip().lower() for c in m.group(2).split(",")))
+    for block in re.split(r"CREATE\s+TABLE\s+", ddl, flags=re.IGNORECASE)[1:]:
+        table = block.split("(", 1)[0].strip().lower()
+        body = block.split(");", 1)[0]
+        for m in re.finditer(r"^\s*(\w+)\s+\w+(?:\([\d,\s]+\))?\s+PRIMARY\s+KEY", body, re.IGNORECASE | re.MULTILINE):
+            indexes.setdefault(table, []).append((m.group(1).lower(),))
+        for m in re.finditer(r"(?:PRIMARY\s+KEY|UNIQUE)\s*\(([^)]*)\)", body, re.IGNORECASE):
+            indexes.setdefault(table, []).append(tuple(c.strip().lower() for c in m.group(1).split(",")))
+    return indexes
+
+
+def existing_indexes_from_db(dbapi_conn) -> dict:
+    """{table: [(col or expression, ...)]} for the connected user's indexes."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("SELECT index_name, column_position, column_expression FROM user_ind_expressions")
+    expressions = {(name, pos): expr for name, pos, expr in cursor.fetchall()}
+    cursor.execute("SELECT table_name, index_name, column_name, column_position "
+                   "FROM user_ind_columns ORDER BY table_name, index_name, column_position")
+    columns = {}
+    for table, name, column, pos in cursor.fetchall():
+        expr = expressions.get((name, pos), column)
+        columns.setdefault((table.lower(), name), []).append(_normalize(expr))
+    cursor.close()
+    indexes = {}
+    for (table, _), cols in columns.items():
+        indexes.setdefault(table, []).append(tuple(cols))
+    return indexes
+
+
+def _normalize(expr: str) -> str:
+    """Comparable form of a column or index expression: lower case, no quotes or spaces."""
+    return re.sub(r'[\s"]', "", expr).lower()
+
+
+def is_covered(table: str, columns: tuple, existing: dict) -> bool:
+    """True when an existing index on table starts with `columns`."""
+    want = tuple(_normalize(c) for c in columns)
+    return any(idx[:len(want)] == want for idx in existing.get(table, ()))
+
+
+# ============================================================
+# Recommendations
+# ============================================================
+class IndexCandidate:
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns        # column names or function expressions, in index order
+        self.seconds = 0.0            # Oracle time of the queries that would use it
+        self.queries = 0
+        self.reasons = set()
+
+    @property
+    def name(self) -> str:
+        base = "idx_adv_" + "_".join(re.sub(r"\W+", "_", c).strip("_") for c in (self.table,) + self.columns)
+        if len(base) <= MAX_NAME_LENGTH:
+            return base.lower()
+        return f"{base[:MAX_NAME_LENGTH - 9]}_{zlib.crc32(base.encode()):08x}".lower()
+
+    @property
+    def ddl(self) -> str:
+        return f"CREATE INDEX {self.name} ON {self.table}({', '.join(self.columns)})"
+
+    def __repr__(self):
+        return f"IndexCandidate({self.table}{self.columns}, {self.seconds:.1f}s, {self.queries} queries)"
+
+
+def recommend(workload: dict, validator, existing: dict, max_columns: int = 3) -> list:
+    """IndexCandidates for workload {sql: [seconds, count]}, most valuable first."""
+    candidates = {}
+
+    def add(table, columns, reason, seconds, count):
+        key = (table, tuple(columns))
+        cand = candidates.get(key) or candidates.setdefault(key, IndexCandidate(table, tuple(columns)))
+        cand.seconds += seconds
+        cand.queries += count
+        cand.reasons.add(reason)
+
+    for sql, (seconds, count) in workload.items():
+        profile = profile_query(sql, validator)
+        if profile is None:
+            continue
+        for table in profile.tables():
+            eq = [c for t, c in profile.eq if t == table]
+            ranges = [c for t, c in profile.ranges if t == table]
+            # Equality columns first, then at most one range column
+            composite = (eq + ranges[:1])[:max_columns]
+            if composite:
+                reason = "filter " + " + ".join(composite) if len(composite) > 1 else (
+                    "equality filter" if eq else "range filter")
+                add(table, composite, reason, seconds, count)
+        for table, column in profile.joins:
+            add(table, [column], "join key", seconds, count)
+        for table, expr in profile.functions:
+            add(table, [expr], "function filter", seconds, count)
+
+    # A composite also serves queries that only use its leading column(s)
+    ordered = sorted(candidates.values(), key=lambda c: -len(c.columns))
+    kept = []
+    for cand in ordered:
+        wider = next((k for k in kept if k.table == cand.table and k.columns[:len(cand.columns)] == cand.columns), None)
+        if wider:
+            wider.seconds += cand.seconds
+            wider.queries += cand.queries
+            wider.reasons |= cand.reasons
+        else:
+            kept.append(cand)
+
+    kept = [c for c in kept if not is_covered(c.table, c.columns, existing)]
+    return sorted(kept, key=lambda c: (-c.seconds, -c.queries, c.name))
@@ -0,0 +1,547 @@
+"""
+intent_templates.py
+===================
+Deterministic fast path in front of generate_sql: the most common
+question shapes are answered from parameterized SQL templates, so they
+never wait for SQL_MODEL.
+
+    How many travelers are in the system?              count
+    How many watchlist alerts are currently active?    count + flag
+    Compare off-loadings across all airports           count by dimension
+    Top 5 airlines by off-loadings in March 2025       top-N + date filter
+    Monthly asylum claims in 2025                      count by month
+
+A Subject is a countable table (its nouns, date column, flags and
+dimensions); a Dimension is a column to group or filter by. Slots are
+filled without an LLM:
+
+  - values     a dimension's values (the value index's full lists,
+               Config/sample_values.json before its first refresh), matched as
+               whole words ("Islamabad airport" -> the distinctive part
+               of 'Islamabad International Airport'). A preposition
+               before a port or country value must fit the column's role:
+               "departures from Lahore" filters the exit port, "departures
+               to Dubai" (a destination) and "offloadings to Dubai" do not
+               match
+  - dates      a year, a month name, "this year" (2025, prompt rule 19)
+               -> a sargable date range on the subject's date column
+  - top N      "top 5"; "which ... most" without a number -> TOP_N
+
+A question matches only when every word is accounted for (subject,
+dimension, value, date, intent word or filler). Anything else (a
+negation, a name, a second condition, "list") returns None and the
+question goes to the LLM, so a template never answers a different
+question than the one asked.
+
+Every subject and subject x dimension shape is validated once when the
+router is built; a shape the validator rejects is dropped.
+"""
+
+import copy
+import re
+
+TOP_N = 10
+MAX_WORDS = 24
+
+# Words a question may contain without changing what is counted
+FILLER = {
+    "a", "an", "the", "of", "in", "on", "at", "for", "to", "from", "with", "during", "is", "are", "was", "were",
+    "be", "been", "there", "have", "has", "had", "do", "does", "did", "we", "our", "their", "what", "whats",
+    "which", "all", "so", "far", "currently", "current", "now", "overall", "system", "database", "ibms",
+    "show", "me", "give", "get", "tell", "display", "please", "numbers", "figures", "statistics", "stats",
+    "recorded", "registered", "logged", "filed", "issued", "reported",
+}
+COUNT_WORDS = {"how", "many", "number", "count", "counts", "total"}
+GROUP_WORDS = {"by", "per", "across", "each", "every", "compare", "comparison", "breakdown", "distribution",
+               "split", "wise"}
+TOP_WORDS = {"top", "most", "highest", "largest", "biggest", "busiest", "leading"}
+BOTTOM_WORDS = {"least", "lowest", "fewest", "smallest"}
+ALLOWED = FILLER | COUNT_WORDS | GROUP_WORDS | TOP_WORDS | BOTTOM_WORDS
+
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+          "november", "december")
+NUMBER_WORDS = {"three": 3, "five": 5, "ten": 10, "twenty": 20}
+
+# Prepositions that give a place value a role ("from Lahore", "to Dubai"); checked against
+# Dimension.prepositions when one directly precedes the value
+DIRECTION_WORDS = {"to", "from", "at", "in", "into", "towards", "via", "through"}
+AT_PORT = {"at", "in", "via", "through"}
+
+# Words of a port name that do not identify the port
+PORT_GENERIC = {"international", "airport", "port", "border", "crossing", "pass"}
+
+_SPELLING = [(re.compile(r"\boff[- ]?load"), "offload"), (re.compile(r"travell"), "travel")]
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> tuple:
+    """Lower-case word tokens; "off-loading" -> "offloading", "travellers" -> "travelers"."""
+    text = str(text).lower()
+    for pattern, replacement in _SPELLING:
+        text = pattern.sub(replacement, text)
+    return tuple(_WORD_RE.findall(text))
+
+
+def phrases(spec: str) -> tuple:
+    """ "airport|airports|port of entry" -> (("airport",), ("airports",), ("port", "of", "entry"))"""
+    return tuple(words(p) for p in spec.split("|"))
+
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class Dimension:
+    """A column to group or filter a subject by."""
+
+    def __init__(self, name, nouns, select, group=None, join=None, values=None, aliases=None, order=None,
+                 prepositions=None):
+        self.name = name
+        self.nouns = phrases(nouns) if nouns else ()
+        self.select = select            # select-list expression(s)
+        self.group = group or select    # GROUP BY expression(s)
+        self.join = join                # JOIN clause the expression needs
+        self.values = values            # (table, column) in sample_values whose values filter this dimension
+        self.aliases = aliases or {}    # extra phrase -> value ("female" -> 'F')
+        self.order = order              # ORDER BY for grouped counts (default: count descending)
+        self.prepositions = prepositions    # DIRECTION_WORDS allowed before a value (None: any)
+
+
+class Subject:
+    """A countable table: what officers call it, how to date and group it."""
+
+    def __init__(self, name, table, alias, nouns, label, date_column=None, where=(), flags=None,
+                 dimensions=(), implied=None):
+        self.name = name
+        self.table = table
+        self.alias = alias
+        self.nouns = phrases(nouns)
+        self.label = label                      # <label>_count, <label>_year, <label>_month
+        self.date_column = date_column
+        self.where = list(where)                # always applied
+        self.flags = {p: cond for spec, cond in (flags or {}).items() for p in phrases(spec)}
+        self.dimensions = list(dimensions)
+        self.implied = implied or {}            # noun phrase -> dimension name it implies
+        if date_column:
+            col = f"{alias}.{date_column}"
+            self.dimensions.append(Dimension(
+                "month", "month|months|monthly|month by month",
+                f"EXTRACT(YEAR FROM {col}) AS {label}_year, EXTRACT(MONTH FROM {col}) AS {label}_month",
+                group=f"EXTRACT(YEAR FROM {col}), EXTRACT(MONTH FROM {col})",
+                order=f"{label}_year, {label}_month",
+            ))
+
+    @property
+    def count_alias(self) -> str:
+        return f"{self.label}_count"
+
+    def dimension(self, name):
+        return next((d for d in self.dimensions if d.name == name), None)
+
+
+def port(alias, column, prepositions, name="port"):
+    return Dimension(name, "airport|airports|port|ports|port of entry|ports of entry|entry point|entry points",
+                     "poe.port_name", join=f"JOIN ports_of_entry poe ON poe.port_id = {alias}.{column}",
+                     values=("ports_of_entry", "port_name"), prepositions=prepositions)
+
+
+def country(alias, column, name, nouns, country_alias="c", prepositions=None):
+    return Dimension(name, nouns, f"{country_alias}.country_name",
+                     join=f"JOIN countries {country_alias} ON {country_alias}.country_id = {alias}.{column}",
+                     values=("countries", "country_name"), prepositions=prepositions)
+
+
+def destination(alias, column, nouns):
+    return country(alias, column, "destination", nouns, "dc", prepositions={"to", "into", "towards"})
+
+
+def column(alias, table, column, nouns, name=None, values=True, aliases=None):
+    return Dimension(name or column, nouns, f"{alias}.{column}", values=(table, column) if values else None,
+                     aliases=aliases)
+
+
+SUBJECTS = [
+    Subject(
+        "travelers", "travelers", "t", "travelers|traveler|passengers|people|persons|individuals", "traveler",
+        dimensions=[
+            column("t", "travelers", "gender", "gender|genders|sex",
+                   aliases={"male": "M", "males": "M", "men": "M", "female": "F", "females": "F", "women": "F"}),
+            country("t", "nationality_id", "nationality", "nationality|nationalities|country|countries", "nc",
+                    prepositions={"from"}),
+            column("t", "travelers", "education_level", "education|education level|education levels"),
+            column("t", "travelers", "marital_status", "marital status"),
+        ],
+    ),
+    Subject(
+        "offloading", "offloading_records", "ol",
+        "offloadings|offloading|offloads|offloading records|offloading cases|offloading incidents|"
+        "offloaded passengers|offloaded travelers|offloaded people|passengers offloaded|travelers offloaded",
+        "offload", date_column="offload_date",
+        dimensions=[
+            port("ol", "port_id", AT_PORT | {"from"}),     # where the passenger was stopped
+            Dimension("airline", "airline|airlines|carrier|carriers", "ol.airline",
+                      values=("travel_records", "carrier")),     # same carrier names as travel_records
+            column("ol", "offloading_records", "reason", "reason|reasons|offloading reason|offloading reasons"),
+            destination("ol", "destination_country_id",
+                        "destination|destinations|destination country|destination countries|country|countries"),
+        ],
+    ),
+    Subject(
+        "watchlist", "watchlist", "wl",
+        "watchlist|watch list|watchlist alerts|watchlist alert|watchlist entries|watchlist hits|alerts",
+        "alert", date_column="issued_date",
+        flags={"active|still active": "wl.is_active = 1", "inactive": "wl.is_active = 0"},
+        dimensions=[
+            column("wl", "watchlist", "alert_type", "alert type|alert types|type|types|category|categories"),
+            column("wl", "watchlist", "severity", "severity|severities|severity level|severity levels"),
+        ],
+    ),
+    Subject(
+        "asylum", "asylum_claims", "ac", "asylum claims|asylum claim|asylum cases|asylum applications|asylum seekers",
+        "claim", date_column="filing_date",
+        dimensions=[
+            column("ac", "asylum_claims", "status", "status|statuses|outcome|outcomes"),
+            column("ac", "asylum_claims", "claim_basis", "basis|claim basis|grounds"),
+            country("ac", "origin_country_id", "origin",
+                    "origin|origin country|origin countries|country of origin|country|countries|nationality", "oc",
+                    prepositions={"from"}),
+        ],
+    ),
+    Subject(
+        "removal", "removal_orders", "ro",
+        "removal orders|removal order|deportation orders|deportations|deportation cases|removals",
+        "removal", date_column="order_date",
+        dimensions=[
+            column("ro", "removal_orders", "status", "status|statuses"),
+            column("ro", "removal_orders", "reason", "reason|reasons"),
+            destination("ro", "destination_country_id",
+                        "destination|destinations|destination country|destination countries|country|countries"),
+        ],
+    ),
+    Subject(
+        "detention", "detention_records", "dr", "detentions|detainees|detention records|detention cases",
+        "detention", date_column="intake_date",
+        dimensions=[
+            column("dr", "detention_records", "status", "status|statuses"),
+            column("dr", "detention_records", "facility_name",
+                   "facility|facilities|detention facility|detention facilities|detention centers", values=False),
+        ],
+    ),
+    Subject(
+        "crossings", "illegal_crossings", "ic", "illegal crossings|illegal border crossings|illegal crossing",
+        "crossing", date_column="detected_date",
+        dimensions=[
+            column("ic", "illegal_crossings", "outcome", "outcome|outcomes"),
+            column("ic", "illegal_crossings", "detection_method",
+                   "detection method|detection methods|method|methods"),
+            column("ic", "illegal_crossings", "direction", "direction|directions"),
+            country("ic", "nationality_id", "nationality", "nationality|nationalities|country|countries", "nc",
+                    prepositions={"from"}),
+        ],
+    ),
+    Subject(
+        "trafficking", "trafficking_cases", "tc",
+        "trafficking cases|trafficking case|human trafficking cases|trafficking incidents",
+        "case", date_column="reported_date",
+        dimensions=[
+            column("tc", "trafficking_cases", "case_type", "case type|case types|type|types"),
+            column("tc", "trafficking_cases", "status", "status|statuses"),
+            country("tc", "origin_country_id", "origin", "origin|origin country|origin countries", "oc",
+                    prepositions={"from"}),
+            destination("tc", "destination_country_id",
+                        "destination|destinations|destination country|destination countries"),
+        ],
+    ),
+    Subject(
+        "ecl", "ecl_entries", "ecl", "ecl entries|ecl cases|exit control list entries|people on the ecl",
+        "ecl", date_column="issued_date",
+        dimensions=[
+            column("ecl", "ecl_entries", "reason", "reason|reasons"),
+            column("ecl", "ecl_entries", "status", "status|statuses"),
+        ],
+    ),
+    Subject(
+        "visas", "visa_applications", "va", "visa applications|visa application|visa requests",
+        "application", date_column="application_date",
+        dimensions=[
+            column("va", "visa_applications", "status", "status|statuses"),
+            Dimension("visa_type", "visa type|visa types|visa category|visa categories|type|types|category|categories",
+                      "vc.visa_name", join="JOIN visa_categories vc ON vc.visa_code = va.visa_code",
+                      values=("visa_categories", "visa_name")),
+        ],
+    ),
+    Subject(
+        "departures", "travel_records", "tr", "departures|outbound trips|outbound travelers", "departure",
+        date_column="exit_date", where=["tr.travel_direction = 'Outbound'"],
+        dimensions=[
+            port("tr", "exit_port_id", AT_PORT | {"from"}),
+            column("tr", "travel_records", "carrier", "airline|airlines|carrier|carriers"),
+            column("tr", "travel_records", "travel_purpose", "purpose|purposes|travel purpose|travel purposes"),
+        ],
+    ),
+    Subject(
+        "arrivals", "travel_records", "tr", "arrivals|inbound trips|inbound travelers", "arrival",
+        date_column="entry_date", where=["tr.travel_direction = 'Inbound'"],
+        dimensions=[
+            port("tr", "entry_port_id", AT_PORT | {"to", "into"}),
+            column("tr", "travel_records", "carrier", "airline|airlines|carrier|carriers"),
+            column("tr", "travel_records", "travel_purpose", "purpose|purposes|travel purpose|travel purposes"),
+        ],
+    ),
+    Subject(
+        "travel", "travel_records", "tr", "travel records|trips|journeys|frequent travelers|frequent flyers",
+        "travel", date_column="entry_date",
+        dimensions=[
+            column("tr", "travel_records", "carrier", "airline|airlines|carrier|carriers"),
+            column("tr", "travel_records", "travel_purpose", "purpose|purposes|travel purpose|travel purposes"),
+            column("tr", "travel_records", "travel_direction", "direction|directions|travel direction"),
+            Dimension("traveler", None, "t.first_name, t.last_name", group="t.traveler_id, t.first_name, t.last_name",
+                      join="JOIN travelers t ON t.traveler_id = tr.traveler_id"),
+        ],
+        implied={("frequent", "travelers"): "traveler", ("frequent", "flyers"): "traveler"},
+    ),
+    Subject(
+        "risk", "risk_profiles", "rp", "risk profiles|risk travelers|risk individuals", "profile",
+        dimensions=[column("rp", "risk_profiles", "risk_tier", "risk tier|risk tiers|tier|tiers|risk level|risk levels")],
+    ),
+]
+
+
+class TemplateMatch:
+    def __init__(self, intent: str, subject: str, sql: str, slots: dict):
+        self.intent = intent        # "count", "count_by" or "top_n"
+        self.subject = subject
+        self.sql = sql
+        self.slots = slots          # dimension, filters, year/month, n
+
+    def __repr__(self):
+        return f"TemplateMatch({self.intent}, {self.subject}, {self.slots})"
+
+
+# ============================================================
+# Matching
+# ============================================================
+def _find(tokens, used, phrase) -> int:
+    """Start of the first occurrence of phrase among unused tokens, -1 if none."""
+    n = len(phrase)
+    for i in range(len(tokens) - n + 1):
+        if tokens[i:i + n] == phrase and not any(used[i:i + n]):
+            return i
+    return -1
+
+
+def _take(tokens, used, table) -> list:
+    """Payloads of every (phrase, payload) found, longest phrases first; their tokens become used."""
+    return [payload for _, payload in _take_at(tokens, used, table)]
+
+
+def _take_at(tokens, used, table) -> list:
+    """(start, payload) of every (phrase, payload) found, in question order."""
+    found = []
+    present = set(tokens)
+    for phrase, payload in table:
+        if phrase[0] not in present:
+            continue
+        while True:
+            i = _find(tokens, used, phrase)
+            if i < 0:
+                break
+            used[i:i + len(phrase)] = [True] * len(phrase)
+            found.append((i, payload))
+    return sorted(found, key=lambda f: f[0])
+
+
+def _preposition(tokens, i):
+    """The DIRECTION_WORDS token right before tokens[i] ("to the Dubai airport" -> "to"), else None."""
+    j = i - 1
+    while j >= 0 and tokens[j] == "the":
+        j -= 1
+    return tokens[j] if j >= 0 and tokens[j] in DIRECTION_WORDS else None
+
+
+def _longest_first(pairs) -> list:
+    return sorted(pairs, key=lambda p: -len(p[0]))
+
+
+def _date_slots(tokens, used, current_year):
+    """(year, month) named in the question; False when it names more than one year or month."""
+    years, months = set(), set()
+    for i, token in enumerate(tokens):
+        if used[i]:
+            continue
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token.isdigit() and len(token) == 4 and 1990 <= int(token) <= 2099:
+            years.add(int(token))
+            used[i] = True
+        elif token in MONTHS:
+            months.add(MONTHS.index(token) + 1)
+            used[i] = True
+        elif token in ("this", "current", "last", "previous") and nxt == "year":
+            years.add(current_year if token in ("this", "current") else current_year - 1)
+            used[i] = used[i + 1] = True
+    if len(years) > 1 or len(months) > 1:
+        return False
+    year = next(iter(years), None)
+    month = next(iter(months), None)
+    if month and not year:
+        year = current_year
+    return year, month
+
+
+def _top_n(tokens, used):
+    """N of "top N" (None without a number)."""
+    for i, token in enumerate(tokens[:-1]):
+        if token == "top" and not used[i + 1]:
+            nxt = tokens[i + 1]
+            n = int(nxt) if nxt.isdigit() else NUMBER_WORDS.get(nxt)
+            if n:
+                used[i + 1] = True
+                return n
+    return None
+
+
+def _date_range(year, month) -> tuple:
+    if month:
+        end = (year + 1, 1) if month == 12 else (year, month + 1)
+        return f"{year}-{month:02d}-01", f"{end[0]}-{end[1]:02d}-01"
+    return f"{year}-01-01", f"{year + 1}-01-01"
+
+
+class IntentRouter:
+    """Matches questions against the template library; build once per process."""
+
+    def __init__(self, sample_values: dict, validate=None, current_year: int = 2025, subjects=SUBJECTS):
+        self.current_year = current_year
+        self.subjects = []
+        self.dropped = []           # (subject, dimension, reason) rejected by validate
+        for subject in subjects:
+            ok, reason = validate(self.build(subject)) if validate else (True, None)
+            if not ok:
+                self.dropped.append((subject.name, None, reason))
+                continue
+            kept = []
+            for dim in subject.dimensions:
+                ok, reason = validate(self.build(subject, dim)) if validate else (True, None)
+                if ok:
+                    kept.append(dim)
+                else:
+                    self.dropped.append((subject.name, dim.name, reason))
+            # SUBJECTS is shared by every router (one per value-index snapshot); drop dimensions on a copy
+            subject = copy.copy(subject)
+            subject.dimensions = kept
+            self.subjects.append(subject)
+        self._nouns = _longest_first(
+            (phrase, (s, s.implied.get(phrase))) for s in self.subjects for phrase in s.nouns + tuple(s.implied))
+        self._values, self._ambiguous = {}, {}
+        for s in self.subjects:
+            pairs = self._value_phrases(s, sample_values)
+            # A value that is also a filler word ("Issued", "Filed") can't be told apart from it
+            self._ambiguous[s.name] = {p[0] for p, _ in pairs if len(p) == 1 and p[0] in ALLOWED}
+            self._values[s.name] = _longest_first((p, v) for p, v in pairs if not set(p) <= ALLOWED)
+
+    @staticmethod
+    def _value_phrases(subject, sample_values):
+        pairs = []
+        for dim in subject.dimensions:
+            if not dim.values:
+                continue
+            table, col = dim.values
+            values = sample_values.get(table, {}).get(col, [])
+            for value in values:
+                pairs.append((words(value), (dim, value)))
+            if col == "port_name":
+                # "Islamabad", "Islamabad airport" -> 'Islamabad International Airport' when unambiguous
+                cores = {}
+                for value in values:
+                    core = tuple(w for w in words(value) if w not in PORT_GENERIC)
+                    cores.setdefault(core, []).append(value)
+                for core, owners in cores.items():
+                    if core and len(owners) == 1:
+                        for suffix in ((), ("airport",), ("port",), ("international", "airport")):
+                            if core + suffix != words(owners[0]):
+                                pairs.append((core + suffix, (dim, owners[0])))
+            for phrase, value in dim.aliases.items():
+                pairs.append((words(phrase), (dim, value)))
+        return pairs
+
+    # ---------- SQL ----------
+    def build(self, subject, dim=None, filters=(), flags=(), year=None, month=None, top=None, ascending=False):
+        a = subject.alias
+        count = subject.count_alias
+        select = f"{dim.select}, COUNT(*) AS {count}" if dim else f"COUNT(*) AS {count}"
+        joins = []
+        for d in ([dim] if dim else []) + [d for d, _ in filters]:
+            if d.join and d.join not in joins:
+                joins.append(d.join)
+        where = list(subject.where) + list(flags) + [f"{d.select} = {_quote(v)}" for d, v in filters]
+        if year:
+            start, end = _date_range(year, month)
+            col = f"{a}.{subject.date_column}"
+            where.append(f"{col} >= TO_DATE('{start}','YYYY-MM-DD') AND {col} < TO_DATE('{end}','YYYY-MM-DD')")
+        lines = [f"SELECT {select}", f"FROM {subject.table} {a}"] + joins
+        if where:
+            lines.append("WHERE " + " AND ".join(where))
+        if dim:
+            lines.append(f"GROUP BY {dim.group}")
+            if top:
+                lines.append(f"ORDER BY {count} {'ASC' if ascending else 'DESC'}")
+                lines.append(f"FETCH FIRST {top} ROWS ONLY")
+            else:
+                lines.append(f"ORDER BY {dim.order or count + ' DESC'}")
+        return "\n".join(lines)
+
+    # ---------- matching ----------
+    def match(self, question: str):
+        """TemplateMatch when the whole question fits one template, else None."""
+        tokens = words(question)
+        if not tokens or len(tokens) > MAX_WORDS:
+            return None
+        used = [False] * len(tokens)
+
+        hits = _take(tokens, used, self._nouns)
+        subjects = {s.name for s, _ in hits}
+        if len(subjects) != 1:
+            return None
+        subject = hits[0][0]
+        implied = {d for _, d in hits if d}
+        flags = sorted(set(_take(tokens, used, _longest_first(subject.flags.items()))))
+
+        dates = _date_slots(tokens, used, self.current_year)
+        if dates is False:
+            return None
+        year, month = dates
+        if year and not subject.date_column:
+            return None
+        n = _top_n(tokens, used)
+
+        found = _take_at(tokens, used, self._values[subject.name])
+        filters = [f for _, f in found]
+        if len({d.name for d, _ in filters}) != len(filters):
+            return None     # two values of one column ("Islamabad and Lahore"): leave it to the LLM
+        for i, (d, _) in found:
+            prep = _preposition(tokens, i)
+            if prep and d.prepositions is not None and prep not in d.prepositions:
+                return None     # "departures to Dubai": the value plays another role than the column's
+
+        dims = set(implied) | {d.name for d in _take(tokens, used, _longest_first(
+            (phrase, d) for d in subject.dimensions for phrase in d.nouns))}
+        if len(dims) > 1:
+            return None
+
+        rest = {t for t, u in zip(tokens, used) if not u}
+        if not rest <= ALLOWED or rest & self._ambiguous[subject.name]:
+            return None
+        top = n or (TOP_N if rest & (TOP_WORDS | BOTTOM_WORDS) else None)
+        ascending = bool(rest & BOTTOM_WORDS) and not rest & TOP_WORDS
+        dim = subject.dimension(dims.pop()) if dims else None
+
+        if dim:
+            intent = "top_n" if top else "count_by"
+        elif rest & COUNT_WORDS and not top:
+            intent = "count"
+        else:
+            return None     # "list ...", "top offloadings": rows, not counts
+        sql = self.build(subject, dim, filters, flags, year, month, top if dim else None, ascending)
+        slots = {"dimension": dim.name if dim else None, "filters": {d.name: v for d, v in filters},
+                 "flags": flags, "year": year, "month": month, "n": top if dim else None}
+        return TemplateMatch(intent, subject.name, sql, slots)
@@ -0,0 +1,262 @@
+"""
+llm_scheduler.py
+================
+Process-wide admission control between the app sessions and the single
+Ollama host.
+
+Every LLM call takes a slot for its model before it reaches Ollama:
+
+  - per-model concurrency (`parallel`, match OLLAMA_NUM_PARALLEL) — Ollama
+    batches the requests it runs in parallel for one model
+  - `max_loaded_models` — when VRAM only fits one 14B model, requests for
+    the other model wait until the current one drains, so consecutive
+    requests for the same model run back to back instead of swapping
+    the weights on every call; `burst` bounds how long one model can keep
+    the GPU while the other is waiting
+  - fair admission — among waiters for a model, the session with the
+    fewest calls in flight and the oldest last-served time goes first,
+    so one busy officer cannot starve the others
+  - queue-position callbacks so the UI can show "position 3 in queue"
+
+The session a call belongs to is carried in a context variable set with
+`llm_session(session_id, on_wait)`. Coroutines (engine.py) use
+acquire_async(), which queues in the same order without blocking a thread.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+_current_session = contextvars.ContextVar("llm_session", default=(None, None))
+
+
+@contextmanager
+def llm_session(session_id, on_wait=None):
+    """Attribute LLM calls in this block to session_id; on_wait(position, waiting) gets queue updates."""
+    token = _current_session.set((session_id, on_wait))
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+class _Ticket:
+    def __init__(self, seq, model, session_id):
+        self.seq = seq
+        self.model = model
+        self.session_id = session_id
+        self.enqueued = time.time()
+
+
+class _HeldStream:
+    """An Ollama stream that releases its scheduler slot when consumed or closed."""
+
+    def __init__(self, scheduler, model, session_id, stream, queue_wait):
+        self.queue_wait = queue_wait
+        self._scheduler = scheduler
+        self._model = model
+        self._session_id = session_id
+        self._stream = stream
+        self._released = False
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+        self._scheduler.release(self._model, self._session_id)
+
+    def __del__(self):
+        self.close()
+
+
+class LLMScheduler:
+    def __init__(self, parallel: dict, default_parallel: int = 1, max_loaded_models: int = 2,
+                 burst: int = 8, poll_interval: float = 0.5):
+        self.parallel = dict(parallel)
+        self.default_parallel = default_parallel
+        self.max_loaded_models = max_loaded_models
+        self.burst = burst
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []         # tickets in arrival order
+        self._active = {}          # model -> calls running
+        self._streak = {}          # model -> admissions since another model started waiting
+        self._session_active = {}  # session -> calls running
+        self._last_served = {}     # session -> time of last admission
+        self._served = {}          # model -> admissions
+        self._wait_total = {}      # model -> seconds spent queued
+        self._async_waiters = set()  # wake-up callbacks of acquire_async() waiters
+
+    # ------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------
+    def _order(self, model):
+        tickets = [t for t in self._waiting if t.model == model]
+        return sorted(tickets, key=lambda t: (self._session_active.get(t.session_id, 0),
+                                              self._last_served.get(t.session_id, 0.0),
+                                              t.seq))
+
+    def _burst_spent(self, model):
+        """With one loaded model, has `model` had its turn while another model waits?"""
+        if self.max_loaded_models >= 2 or self._streak.get(model, 0) < self.burst:
+            return False
+        return any(t.model != model for t in self._waiting)
+
+    def _can_admit(self, ticket):
+        model = ticket.model
+        if self._active.get(model, 0) >= self.parallel.get(model, self.default_parallel):
+            return False
+        if self._order(model)[0] is not ticket or self._burst_spent(model):
+            return False
+        loaded = {m for m, n in self._active.items() if n > 0}
+        if model in loaded or self.max_loaded_models >= 2:
+            return len(loaded | {model}) <= self.max_loaded_models
+        if loaded:
+            return False
+        # GPU is free: serve the model with the oldest eligible waiter
+        eligible = [t for t in self._waiting if not self._burst_spent(t.model)]
+        return min(eligible, key=lambda t: t.seq).model == model
+
+    def acquire(self, model, session_id=None, on_wait=None) -> float:
+        """Block until a slot for model is free. Returns seconds spent queued."""
+        with self._cond:
+            ticket = _Ticket(next(self._seq), model, session_id)
+            self._waiting.append(ticket)
+            last_reported = None
+            try:
+                while not self._can_admit(ticket):
+                    if on_wait is not None:
+                        pos = self._order(model).index(ticket) + 1
+                        if pos != last_reported:
+                            last_reported = pos
+                            waiting = len(self._waiting)
+                            self._cond.release()
+                            try:
+                                on_wait(pos, waiting)
+                            finally:
+                                self._cond.acquire()
+                            continue
+                    self._cond.wait(self.poll_interval)
+            except BaseException:
+                # on_wait raised (e.g. Streamlit's rerun/stop): a ticket left queued would block the model
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+                for notify in self._async_waiters:
+                    notify()
+                raise
+            return self._admit(ticket)
+
+    async def acquire_async(self, model, session_id=None, on_wait=None) -> float:
+        """acquire() for coroutines: waits on the event loop instead of blocking a thread."""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            loop.call_soon_threadsafe(wake.set)
+
+        with self._cond:
+            ticket = _Ticket(next(self._seq), model, session_id)
+            self._waiting.append(ticket)
+            self._async_waiters.add(notify)
+        admitted = False
+        last_reported = None
+        try:
+            while True:
+                wake.clear()
+                with self._cond:
+                    if self._can_admit(ticket):
+                        admitted = True
+                        return self._admit(ticket)
+                    pos = self._order(model).index(ticket) + 1
+                    waiting = len(self._waiting)
+                if on_wait is not None and pos != last_reported:
+                    last_reported = pos
+                    on_wait(pos, waiting)
+                try:
+                    await asyncio.wait_for(wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(notify)
+                if not admitted:   # cancelled while queued
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+
+    def _admit(self, ticket) -> float:
+        """Move an admissible ticket from the queue to running (caller holds the lock)."""
+        model, session_id = ticket.model, ticket.session_id
+        self._waiting.remove(ticket)
+        for other in list(self._streak):
+            if other != model:
+                self._streak[other] = 0
+        if any(t.model != model for t in self._waiting):
+            self._streak[model] = self._streak.get(model, 0) + 1
+        self._active[model] = self._active.get(model, 0) + 1
+        self._session_active[session_id] = self._session_active.get(session_id, 0) + 1
+        self._last_served[session_id] = time.time()
+        waited = time.time() - ticket.enqueued
+        self._served[model] = self._served.get(model, 0) + 1
+        self._wait_total[model] = self._wait_total.get(model, 0.0) + waited
+        return waited
+
+    def release(self, model, session_id=None):
+        with self._cond:
+            self._active[model] -= 1
+            self._session_active[session_id] -= 1
+            if not self._session_active[session_id]:
+                del self._session_active[session_id]
+            self._cond.notify_all()
+            for notify in self._async_waiters:
+                notify()
+
+    @contextmanager
+    def slot(self, model):
+        """Hold a slot for model on behalf of the current llm_session. Yields the queue wait."""
+        session_id, on_wait = _current_session.get()
+        waited = self.acquire(model, session_id, on_wait)
+        try:
+            yield waited
+        finally:
+            self.release(model, session_id)
+
+    def stream(self, model, open_stream):
+        """Wrap a streaming call so its slot is held until the stream is exhausted or closed."""
+        session_id, on_wait = _current_session.get()
+        waited = self.acquire(model, session_id, on_wait)
+        try:
+            stream = open_stream()
+        except BaseException:
+            self.release(model, session_id)
+            raise
+        return _HeldStream(self, model, session_id, stream, waited)
+
+    # ------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------
+    def snapshot(self) -> dict:
+        """Per-model running/queued counts, admissions and mean queue wait."""
+        with self._cond:
+            models = set(self._active) | set(self._served) | {t.model for t in self._waiting}
+            return {
+                model: {
+                    "running": self._active.get(model, 0),
+                    "queued": sum(1 for t in self._waiting if t.model == model),
+                    "served": self._served.get(model, 0),
+                    "mean_wait": self._wait_total.get(model, 0.0) / max(self._served.get(model, 0), 1),
+                }
+                for model in sorted(models)
+            }
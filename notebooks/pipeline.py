@@ -0,0 +1,770 @@
+"""
+pipeline.py
+===========
+NL2SQL pipeline stages, independent of any UI:
+
+  pre_classify / classify_query -> generate_sql -> validate_sql
+  -> execute_sql -> stream_narration     (stream_general_chat for GENERAL)
+
+Used by notebooks/app.py (Streamlit) and by the scripts in scripts/.
+Ollama is reached through the default client, so OLLAMA_HOST selects the
+server; every call goes through the shared LLMScheduler (llm_scheduler.py).
+Stages that call an LLM accept an optional `stats` dict that is filled
+with Ollama's token counters and durations.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import ollama
+import pandas as pd
+from llm_scheduler import LLMScheduler
+from cost_guard import make_sargable, explain_plan, check_plan
+from db_router import load_router
+from entity_lookup import detect_identifier, run_dossier
+from few_shot import ExampleStore, hashed_embedding, examples_section
+from intent_templates import IntentRouter
+from query_cache import data_version_token, question_literals
+from result_summary import summarize_result
+from schema_linker import load_schema, link_tables, linked_schema_block
+from sql_binds import bind_literals, is_bind_error
+from sql_repair import SQLRepairer
+from sql_validator import SQLValidator, SQLAnalysis
+from stream_filter import ThinkStreamFilter, RenderThrottle
+from summaries import SUMMARIES, SUMMARY_COLUMNS, STATE_FILE_NAME, summary_status, prompt_section
+from value_index import SNAPSHOT_NAME, load_value_index, snapshot_version
+
+# ══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ══════════════════════════════════════════════════════════════
+SQL_MODEL = "qwen2.5-coder:14b"
+CHAT_MODEL = "qwen3-14b-fixed:latest"
+
+QWEN3_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 20,
+    "repeat_penalty": 1.5,
+    "num_predict": 2048,
+}
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PROJECT_DIR / "Config"
+
+# Primary database; also the defaults of the entries in DB_CONFIG_FILE
+ORACLE_USER = "ibms_user"
+ORACLE_PASSWORD = "ibms_pass"
+ORACLE_HOST = "localhost:1521"
+ORACLE_SERVICE = "FREEPDB1"
+
+# LLM admission control — match OLLAMA_NUM_PARALLEL / OLLAMA_MAX_LOADED_MODELS on the server.
+# Set LLM_MAX_LOADED_MODELS = 1 when the GPU cannot hold both 14B models at once.
+LLM_PARALLEL = {SQL_MODEL: 2, CHAT_MODEL: 2}
+LLM_MAX_LOADED_MODELS = 2
+LLM_BURST = 8             # same-model admissions before yielding the GPU (single-model mode)
+LLM_KEEP_ALIVE = -1       # pin both models (and their cached prompt prefixes) in memory
+
+# Oracle pool: a query only runs after its SQL is generated, so the number of
+# sessions between LLM stages is bounded by the LLM slots
+ORACLE_POOL_SIZE = sum(LLM_PARALLEL.values())
+ORACLE_MAX_OVERFLOW = 2
+ORACLE_POOL_TIMEOUT = 15  # seconds to wait for a connection before failing the query
+
+# Databases execute_sql routes to (primary / read replicas, health checks, failover,
+# per-replica pool sizes and ALTER SESSION statements); see db_router.py.
+# Without the file the ORACLE_* database above is the only one.
+DB_CONFIG_FILE = CONFIG_DIR / "databases.json"
+
+# Repair loop for SQL that fails validation or execution
+REPAIR_ATTEMPTS = 2       # repair rounds per question (0 disables)
+REPAIR_DEADLINE = 45      # seconds of repair time per question
+
+# Precomputed summary tables (scripts/refresh_summaries.py): advertised in the SQL
+# prompt while fresh, i.e. refreshed after the last data load and within SUMMARY_MAX_AGE
+USE_SUMMARIES = True
+SUMMARY_MAX_AGE = 24 * 3600   # seconds
+SUMMARY_STATE_FILE = CONFIG_DIR / STATE_FILE_NAME
+DATA_VERSION_FILE = CONFIG_DIR / ".data_version"
+
+# Send only the tables/FKs/value lists linked to the question instead of the full template
+PRUNE_SCHEMA = True
+
+# Value index: full distinct values of the categorical columns (scripts/refresh_value_index.py
+# -> Config/.value_index.json; sample_values.json until its first run). The SQL prompt gets
+# the values a question names instead of the truncated lists; the intent templates match them too.
+VALUE_INDEX = True
+VALUE_INDEX_FILE = CONFIG_DIR / SNAPSHOT_NAME
+
+# Intent templates: counts / top-N / by-dimension questions whose every word maps onto a
+# template (intent_templates.py) skip SQL_MODEL; anything else falls through to the LLM
+INTENT_TEMPLATES = True
+DATA_YEAR = 2025    # "this year" (prompt rule 19)
+
+# Entity lookup: a pasted passport number / CNIC / "traveler id N" skips classify and SQL
+# generation; the dossier sections (entity_lookup.py) run in parallel on the pool.
+# LOOKUP_PARALLEL caps the sessions all lookups together hold, leaving the rest of
+# the pool (ORACLE_POOL_SIZE + ORACLE_MAX_OVERFLOW) to NL2SQL queries
+ENTITY_LOOKUP = True
+LOOKUP_SECTION_ROWS = 20
+LOOKUP_PARALLEL = 2
+
+# Few-shot examples: the FEW_SHOT_K most similar solved questions (seeded from
+# nb03_test_results.json, learned from runs that returned rows) go into the SQL prompt.
+# FEW_SHOT_EMBED_MODEL = None uses the in-process hashed n-gram embedding (no model call).
+FEW_SHOT_K = 3                 # 0 disables
+FEW_SHOT_MIN_SIMILARITY = 0.35
+FEW_SHOT_CAPACITY = 500        # learned examples kept (LRU); seeds are never evicted
+FEW_SHOT_EMBED_MODEL = None    # e.g. "nomic-embed-text"
+FEW_SHOT_SEED = CONFIG_DIR / "nb03_test_results.json"
+FEW_SHOT_LOG = PROJECT_DIR / "logs" / "sql_examples.jsonl"
+
+# Result fetching: rows beyond the cap are counted with COUNT(*) but never transferred
+MAX_RESULT_ROWS = 500
+ORACLE_ARRAYSIZE = 1000   # rows per round-trip (>= MAX_RESULT_ROWS + 1 => single fetch)
+
+# Cost guard: rewrite non-sargable date filters, EXPLAIN PLAN before running.
+# Over PLAN_COST_BUDGET -> FIRST_ROWS hint and estimated total instead of COUNT(*);
+# over PLAN_COST_LIMIT (or a cartesian join over budget) -> rejected.
+COST_GUARD = True
+PLAN_COST_BUDGET = 100_000
+PLAN_COST_LIMIT = 2_000_000
+ORACLE_CALL_TIMEOUT_MS = 30_000   # per round-trip; no single question can hold a pooled connection longer
+
+# Literal binding: the WHERE/ON/HAVING literals of generated SQL run as bind variables
+# (sql_binds.py) so repeated question shapes soft-parse, and python-oracledb's
+# per-session statement cache keeps those cursors open (stay below OPEN_CURSORS, default 300).
+BIND_LITERALS = True
+ORACLE_STMT_CACHE_SIZE = 100
+
+# Streaming redraw throttle: at most one placeholder update per interval / per N new chars
+STREAM_RENDER_INTERVAL = 0.08  # seconds
+STREAM_RENDER_CHARS = 400
+
+# Ollama response counters copied into a stage's `stats` dict
+LLM_STAT_KEYS = (
+    "prompt_eval_count", "prompt_eval_duration",
+    "eval_count", "eval_duration",
+    "load_duration", "total_duration",
+)
+
+# ══════════════════════════════════════════════════════════════
+# SHARED RESOURCES (one per process)
+# ══════════════════════════════════════════════════════════════
+@lru_cache(maxsize=None)
+def get_router():
+    defaults = {"name": "primary", "host": ORACLE_HOST, "service": ORACLE_SERVICE, "user": ORACLE_USER,
+                "password": ORACLE_PASSWORD, "pool_size": ORACLE_POOL_SIZE, "max_overflow": ORACLE_MAX_OVERFLOW,
+                "stmtcachesize": ORACLE_STMT_CACHE_SIZE}
+    return load_router(DB_CONFIG_FILE, defaults, pool_timeout=ORACLE_POOL_TIMEOUT)
+
+def get_engine():
+    """Engine of the first configured database (the primary)."""
+    return get_router().replicas[0].engine()
+
+@lru_cache(maxsize=None)
+def get_scheduler():
+    return LLMScheduler(LLM_PARALLEL, max_loaded_models=LLM_MAX_LOADED_MODELS, burst=LLM_BURST)
+
+@lru_cache(maxsize=None)
+def load_prompt_template():
+    return (CONFIG_DIR / "prompt_template.txt").read_text()
+
+@lru_cache(maxsize=None)
+def get_schema_info():
+    return load_schema(CONFIG_DIR)
+
+@lru_cache(maxsize=None)
+def get_repairer():
+    return SQLRepairer()
+
+@lru_cache(maxsize=None)
+def get_validator():
+    return SQLValidator({**get_schema_info().tables, **SUMMARY_COLUMNS})
+
+def get_value_index():
+    """ValueIndex of the current snapshot; rebuilt when the refresh job rewrites it."""
+    return _value_index(snapshot_version(VALUE_INDEX_FILE))
+
+@lru_cache(maxsize=1)
+def _value_index(version):
+    return load_value_index(VALUE_INDEX_FILE, get_schema_info().sample_values)
+
+def get_intent_router():
+    return _intent_router(snapshot_version(VALUE_INDEX_FILE) if VALUE_INDEX else None)
+
+def cache_literals(question: str) -> frozenset:
+    """Literals a semantic SQL-cache hit must share with the cached question (incl. its column values)."""
+    return question_literals(question, get_value_index().resolve if VALUE_INDEX else None)
+
+def cache_version():
+    """Changes on a data reload (Config/.data_version) or a schema edit; the caches drop their entries."""
+    return tuple(data_version_token(path) for path in
+                 (DATA_VERSION_FILE, CONFIG_DIR / "schema_ddl.txt", CONFIG_DIR / "prompt_template.txt"))
+
+@lru_cache(maxsize=1)
+def _intent_router(version):
+    values = get_value_index().values if VALUE_INDEX else get_schema_info().sample_values
+    return IntentRouter(values, validate=validate_sql, current_year=DATA_YEAR)
+
+@lru_cache(maxsize=None)
+def get_lookup_executor():
+    return ThreadPoolExecutor(max_workers=LOOKUP_PARALLEL, thread_name_prefix="lookup")
+
+@lru_cache(maxsize=None)
+def get_example_store():
+    embed_fn = hashed_embedding
+    if FEW_SHOT_EMBED_MODEL:
+        embed_fn = lambda q: ollama.embeddings(model=FEW_SHOT_EMBED_MODEL, prompt=q)["embedding"]
+    store = ExampleStore(embed_fn, capacity=FEW_SHOT_CAPACITY, log_path=FEW_SHOT_LOG)
+    if FEW_SHOT_SEED.exists():
+        store.load_seed(FEW_SHOT_SEED, tables_fn=lambda sql: analyze_sql(sql).tables)
+    return store
+
+# ══════════════════════════════════════════════════════════════
+# PROMPTS
+# ══════════════════════════════════════════════════════════════
+# Every prompt is [static system message, per-request user message]. The system
+# messages are byte-identical across requests, so Ollama reuses their KV cache
+# (prompt_eval_count only covers the user part); never put request data in them.
+SYSTEM_PROMPT_GENERAL = """You are an AI assistant for FIA (Federal Investigation Agency) Pakistan, specializing in the IBMS (Integrated Border Management System).
+
+Guidelines:
+- Match your response length to the question. Short questions get short answers. Detailed questions get detailed answers.
+- For greetings (hello, hi, etc.), respond briefly and warmly. Introduce yourself in 1-2 sentences and ask how you can help.
+- For follow-up questions about previous answers, provide relevant analysis or clarification.
+- For FIA/IBMS concept questions, explain clearly with relevant context.
+- If the officer needs specific data, suggest they ask a data question.
+- Be professional but conversational. Do NOT pad responses with unnecessary information.
+- Do NOT invent stories or hypothetical scenarios unless explicitly asked."""
+
+NARRATION_SYSTEM = """You are a senior FIA intelligence analyst. An officer asked a question and the system queried the IBMS database. Below are the results.
+
+Write a professional intelligence briefing based ONLY on the data provided.
+
+Rules:
+- Lead with the key finding that directly answers the question.
+- Include all important numbers exactly as shown (counts, percentages, dates).
+- If results have rankings/tables, present and analyze them.
+- If 0 rows returned, say "No records found" and suggest why.
+- Do NOT invent data. Do NOT mention SQL or databases.
+- Match response length to complexity: simple counts get 2-3 sentences, complex analyses get detailed paragraphs.
+- End with a brief operational insight when the data warrants it.
+- Do NOT pad your response to fill space. Be thorough but not verbose."""
+
+NARRATION_PROMPT = """QUESTION: {question}
+
+RESULTS:
+{results}
+
+Briefing:
+/no_think"""
+
+CLASSIFIER_SYSTEM = """Classify this message as DATABASE or GENERAL.
+
+DATABASE = needs data from IBMS database (counts, lists, lookups, comparisons, statistics)
+GENERAL = greeting, follow-up, explanation, opinion, or anything NOT needing a new database query
+
+Reply with one word only: DATABASE or GENERAL"""
+
+REPAIR_SYSTEM = """You are an Oracle 19c SQL generator. A query failed. Fix it.
+
+Return only the corrected Oracle SQL SELECT statement, no explanation."""
+
+REPAIR_PROMPT = """SCHEMA (use ONLY these tables and columns):
+{schema}
+
+QUESTION: {question}
+
+FAILED SQL:
+{sql}
+
+ERROR: {error}"""
+
+SQL_QUESTION_LINE = "Question: {question}"   # last line of prompt_template.txt
+
+# ══════════════════════════════════════════════════════════════
+# PIPELINE FUNCTIONS
+# ══════════════════════════════════════════════════════════════
+def record_stats(stats, response):
+    if stats is not None:
+        for key in LLM_STAT_KEYS:
+            value = response.get(key)
+            if value is not None:
+                stats[key] = value
+
+
+def _chat(model: str, messages: list, options: dict, stream: bool = False, stats: dict = None):
+    """ollama.chat through the scheduler; stats["queue_wait"] gets the seconds spent queued."""
+    def call():
+        return ollama.chat(model=model, messages=messages, options=options,
+                           stream=stream, keep_alive=LLM_KEEP_ALIVE)
+
+    scheduler = get_scheduler()
+    if stream:
+        response = scheduler.stream(model, call)
+        waited = response.queue_wait
+    else:
+        with scheduler.slot(model) as waited:
+            response = call()
+    if stats is not None:
+        stats["queue_wait"] = waited
+    return response
+
+
+def chat_messages(system: str, user: str) -> list:
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def static_prefixes() -> list:
+    """(model, system prompt) pairs worth prefilling at startup, largest first."""
+    return [(SQL_MODEL, sql_system_prompt(PRUNE_SCHEMA)), (SQL_MODEL, sql_system_prompt(False)),
+            (CHAT_MODEL, NARRATION_SYSTEM), (CHAT_MODEL, CLASSIFIER_SYSTEM)]
+
+
+WARM_OPTIONS = {"num_predict": 1}
+
+
+def warm_models():
+    """Load SQL_MODEL and CHAT_MODEL (an empty chat loads a model) and prefill their
+    static system prompts, so the first officer neither loads a model nor a prefix."""
+    for model in (SQL_MODEL, CHAT_MODEL):
+        try:
+            ollama.chat(model=model, messages=[], keep_alive=LLM_KEEP_ALIVE)
+        except Exception:
+            pass
+    for model, system in dict.fromkeys(static_prefixes()):
+        try:
+            ollama.chat(model=model, messages=[{"role": "system", "content": system}],
+                        options=WARM_OPTIONS, keep_alive=LLM_KEEP_ALIVE)
+        except Exception:
+            pass
+
+
+def render_stream(stream, placeholder, stats: dict = None) -> tuple:
+    """Render an ollama chat stream into a placeholder. Returns (final_text, latency, ttft)."""
+    t0 = time.time()
+    stream_filter = ThinkStreamFilter()
+    throttle = RenderThrottle(placeholder, STREAM_RENDER_INTERVAL, STREAM_RENDER_CHARS)
+    ttft = None
+
+    for chunk in stream:
+        token = chunk.get("message", {}).get("content", "")
+        if token and stream_filter.feed(token):
+            if ttft is None:
+                ttft = time.time() - t0
+            throttle.update(stream_filter.visible)
+        if chunk.get("done"):
+            record_stats(stats, chunk)
+
+    latency = time.time() - t0
+    final = stream_filter.finish()
+    throttle.flush(final)
+    return final, latency, ttft if ttft is not None else latency
+
+
+GREETING_RE = re.compile(
+    r"^\s*(hi|hello|hey|salam|assalam[- ]?o[- ]?alaikum|good (morning|afternoon|evening)"
+    r"|thanks|thank you|ok|okay|bye|goodbye)\b",
+    re.IGNORECASE,
+)
+DATA_INTENT_RE = re.compile(
+    r"\b(how many|number of|count|list|show|top \d+|top|which|compare|total|average|"
+    r"percentage|rate|trend|most|highest|lowest|breakdown|per|find|who)\b",
+    re.IGNORECASE,
+)
+
+
+def pre_classify(message: str):
+    """Local heuristic classifier. Returns DATABASE, GENERAL, or None when unsure."""
+    if GREETING_RE.match(message) and len(message.split()) <= 6:
+        return "GENERAL"
+    if DATA_INTENT_RE.search(message) and link_tables(message, get_schema_info()):
+        return "DATABASE"
+    return None
+
+
+CLASSIFIER_OPTIONS = {"temperature": 0.0, "num_predict": 10, "repeat_penalty": 1.5}
+SQL_OPTIONS = {"temperature": 0.0, "num_predict": 1024}
+
+
+def classifier_messages(message: str, history: list) -> list:
+    user = ""
+    if history:
+        recent = history[-4:]
+        context = "\n".join(f"{m['role']}: {m['content'][:150]}" for m in recent)
+        user = f"Context:\n{context}\n\n"
+    return chat_messages(CLASSIFIER_SYSTEM, user + f"Message: {message}\n/no_think")
+
+
+def parse_classification(reply: str) -> str:
+    return "DATABASE" if "DATABASE" in reply.strip().upper() else "GENERAL"
+
+
+def classify_query(message: str, history: list, stats: dict = None) -> str:
+    try:
+        response = _chat(
+            CHAT_MODEL,
+            classifier_messages(message, history),
+            CLASSIFIER_OPTIONS,
+            stats=stats,
+        )
+        record_stats(stats, response)
+        return parse_classification(response["message"]["content"])
+    except Exception:
+        return "DATABASE"
+
+
+def extract_sql(raw: str) -> str:
+    raw = raw.strip()
+    match = re.search(r'```(?:sql)?\s*\n?(.*?)\n?```', raw, re.DOTALL | re.IGNORECASE)
+    if match:
+        sql = match.group(1).strip()
+    else:
+        match = re.search(r'(SELECT\b.*)', raw, re.DOTALL | re.IGNORECASE)
+        sql = match.group(1).strip() if match else raw
+    if ';' in sql:
+        sql = sql[:sql.index(';')].strip()
+    return sql
+
+
+def get_summary_status() -> dict:
+    """{summary: (age_seconds or None, is_stale)}"""
+    return summary_status(SUMMARY_STATE_FILE, DATA_VERSION_FILE, SUMMARY_MAX_AGE)
+
+
+def fresh_summaries(tables=None) -> list:
+    """Fresh summary tables built from any of `tables` (all fresh ones when None)."""
+    if not USE_SUMMARIES:
+        return []
+    status = get_summary_status()
+    return [s.name for s in SUMMARIES
+            if not status[s.name][1] and (tables is None or set(s.sources) & set(tables))]
+
+
+@lru_cache(maxsize=None)
+def sql_system_prompt(pruned: bool) -> str:
+    """Static part of the SQL prompt: header + rules (pruned) or the whole template."""
+    if pruned:
+        schema = get_schema_info()
+        rules = schema.rules.replace(SQL_QUESTION_LINE, "").strip()
+        return f"{schema.header}\n\n{rules.replace('listed above', 'listed in the schema below')}"
+    return load_prompt_template().replace(SQL_QUESTION_LINE, "").strip()
+
+
+def sql_messages(question: str) -> list:
+    """Static system prompt, then the schema-linked tables (when they can be linked) with the
+    column values the question names, fresh summaries, similar examples and the question."""
+    tables = None
+    parts = []
+    index = get_value_index() if VALUE_INDEX else None
+    matches = index.resolve(question) if index else []
+    if PRUNE_SCHEMA:
+        schema = get_schema_info()
+        tables = link_tables(question, schema) or None
+        if tables:
+            parts.append(linked_schema_block(schema, tables, index.prompt_values(tables, matches) if index else None))
+    if index and tables is None:
+        parts.append(index.values_section(matches))
+    summaries = fresh_summaries(tables)
+    parts += [prompt_section(summaries), few_shot_section(question, tables, summaries),
+              SQL_QUESTION_LINE.replace("{question}", question)]
+    user = "\n\n".join(part.strip() for part in parts if part)
+    return chat_messages(sql_system_prompt(tables is not None), user)
+
+
+def few_shot_section(question: str, tables, summaries) -> str:
+    """Most similar solved questions that only use tables the prompt offers."""
+    if not FEW_SHOT_K:
+        return ""
+    allowed = set(tables if tables is not None else get_schema_info().tables) | set(summaries)
+    return examples_section(get_example_store().search(
+        question, FEW_SHOT_K, allowed_tables=allowed, min_similarity=FEW_SHOT_MIN_SIMILARITY))
+
+
+def learn_example(question: str, sql: str, df: pd.DataFrame):
+    """Remember SQL that executed and returned rows as a future few-shot example."""
+    if FEW_SHOT_K and df is not None and not df.empty:
+        get_example_store().add(question, sql, analyze_sql(sql).tables)
+
+
+def match_template(question: str):
+    """TemplateMatch (intent, sql, slots) when a template answers the question, else None."""
+    if not INTENT_TEMPLATES:
+        return None
+    return get_intent_router().match(question)
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+def generate_sql(question: str, messages: list = None, cancel_event: threading.Event = None,
+                 stats: dict = None) -> tuple:
+    """Generate SQL. With cancel_event, streams so a speculative run can be aborted mid-generation."""
+    if messages is None:
+        messages = sql_messages(question)
+    t0 = time.time()
+    if cancel_event is None:
+        response = _chat(
+            SQL_MODEL,
+            messages,
+            SQL_OPTIONS,
+            stats=stats,
+        )
+        record_stats(stats, response)
+        raw = response["message"]["content"]
+    else:
+        stream = _chat(
+            SQL_MODEL,
+            messages,
+            SQL_OPTIONS,
+            stream=True,
+            stats=stats,
+        )
+        parts = []
+        for chunk in stream:
+            if cancel_event.is_set():
+                stream.close()  # drops the HTTP stream (Ollama stops generating) and frees the slot
+                raise GenerationCancelled()
+            parts.append(chunk.get("message", {}).get("content", ""))
+            if chunk.get("done"):
+                record_stats(stats, chunk)
+        raw = "".join(parts)
+    latency = time.time() - t0
+    return raw, extract_sql(raw), latency
+
+
+@lru_cache(maxsize=1024)
+def analyze_sql(sql: str) -> SQLAnalysis:
+    """Lex + check + table/column extraction, memoized so later stages reuse the parse."""
+    return get_validator().analyze(sql)
+
+
+def validate_sql(sql: str) -> tuple:
+    analysis = analyze_sql(sql)
+    return analysis.ok, analysis.reason
+
+
+def schema_excerpt(question: str, sql: str) -> str:
+    """Columns and FKs of the tables the failing SQL or the question touches."""
+    schema = get_schema_info()
+    tables = [t for t in analyze_sql(sql).tables if t in schema.tables]
+    for table in link_tables(question, schema):
+        if table not in tables:
+            tables.append(table)
+    tables = tables or list(schema.tables)
+    lines = [f"{t}({', '.join(schema.tables[t])})" for t in tables]
+    lines += [f"{s}.{sc} -> {d}.{dc}" for s, sc, d, dc in schema.foreign_keys
+              if s in tables and d in tables]
+    return "\n".join(lines)
+
+
+def repair_messages(question: str, sql: str, error: str) -> list:
+    return chat_messages(REPAIR_SYSTEM, REPAIR_PROMPT.replace("{schema}", schema_excerpt(question, sql))
+                         .replace("{question}", question).replace("{sql}", sql).replace("{error}", error))
+
+
+def repair_sql(question: str, sql: str, error: str, stats: dict = None) -> tuple:
+    """One repair round. Returns (new_sql, source, latency) with source rule / cache / llm."""
+    def llm_fix(bad_sql, err):
+        response = _chat(SQL_MODEL, repair_messages(question, bad_sql, err), SQL_OPTIONS, stats=stats)
+        record_stats(stats, response)
+        return extract_sql(response["message"]["content"])
+
+    t0 = time.time()
+    new_sql, source = get_repairer().fix(sql, error, llm_fix)
+    return new_sql, source, time.time() - t0
+
+
+def _normalize_columns(names: list) -> list:
+    # Match SQLAlchemy: Oracle's case-insensitive (upper-case) names come back lower-case
+    return [n.lower() if n.isupper() else n for n in names]
+
+
+def fetch_dataframe(dbapi_conn, sql: str, binds: dict = None) -> pd.DataFrame:
+    """Fetch via python-oracledb's Arrow path when available, else a tuned cursor."""
+    if hasattr(dbapi_conn, "fetch_df_all"):
+        try:
+            import pyarrow as pa
+            odf = dbapi_conn.fetch_df_all(statement=sql, parameters=binds or None, arraysize=ORACLE_ARRAYSIZE)
+            table = pa.Table.from_arrays(odf.column_arrays(), names=odf.column_names())
+            df = table.to_pandas()
+            df.columns = _normalize_columns(list(df.columns))
+            return df
+        except ImportError:
+            pass
+    cursor = dbapi_conn.cursor()
+    cursor.arraysize = ORACLE_ARRAYSIZE
+    if hasattr(cursor, "prefetchrows"):
+        cursor.prefetchrows = ORACLE_ARRAYSIZE + 1
+    cursor.execute(sql, binds or None)
+    return rows_to_dataframe(cursor.description, cursor.fetchall())
+
+
+def rows_to_dataframe(description, rows) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows, columns=_normalize_columns([d[0] for d in description]))
+
+
+_FETCH_N_RE = re.compile(r"\bFETCH\s+(?:FIRST|NEXT)\s+(\d+)\s+ROWS?\s+ONLY\s*$", re.IGNORECASE)
+_FETCH_OTHER_RE = re.compile(r"\bFETCH\s+(?:FIRST|NEXT)\b[^()]*$", re.IGNORECASE)   # PERCENT, WITH TIES, no N
+_OFFSET_RE = re.compile(r"\bOFFSET\s+\S+\s+ROWS?$", re.IGNORECASE)
+
+
+def capped_sql(sql: str, max_rows: int, action: str = "run") -> str:
+    """sql limited to max_rows + 1 rows; one extra row tells us whether the cap was hit.
+
+    The row limit goes on the statement itself: re-projecting it through
+    SELECT * FROM (...) fails with ORA-00918 when the select list repeats a
+    column name (t.*, w.* over a join). A statement with its own FETCH keeps
+    it, lowered to the cap.
+    """
+    sql = sql.rstrip().rstrip(";").rstrip()
+    cap = max_rows + 1
+    m = _FETCH_N_RE.search(sql)
+    if m:
+        if int(m.group(1)) > cap:
+            sql = sql[:m.start(1)] + str(cap) + sql[m.end(1):]
+    elif not _FETCH_OTHER_RE.search(sql):
+        keyword = "NEXT" if _OFFSET_RE.search(sql) else "FIRST"
+        sql = f"{sql}\nFETCH {keyword} {cap} ROWS ONLY"
+    if action == "limit" and re.match(r"SELECT\s+(?!/\*\+)", sql, re.IGNORECASE):
+        sql = re.sub(r"^SELECT\s+", f"SELECT /*+ FIRST_ROWS({cap}) */ ", sql, count=1, flags=re.IGNORECASE)
+    return sql
+
+
+def is_duplicate_column_error(e: Exception) -> bool:
+    """ORA-00918: COUNT(*) FROM (sql) cannot wrap a select list that repeats a column name."""
+    return "ORA-00918" in str(e)
+
+
+def execution_error(e: Exception) -> str:
+    if "DPY-4024" in str(e) or "ORA-03156" in str(e):
+        return f"Query exceeded the {ORACLE_CALL_TIMEOUT_MS / 1000:.0f}s time limit"
+    return f"Error: {str(e)[:200]}"
+
+
+def execute_sql(sql: str, max_rows: int = MAX_RESULT_ROWS, cost_guard: bool = COST_GUARD) -> tuple:
+    """Run validated SQL capped at max_rows (server-side). df.attrs["total_rows"] holds the true count.
+
+    With cost_guard, date filters are made sargable and the plan is checked
+    first; df.attrs gets plan_cost, estimated_rows, rewrites and executed_sql.
+    Runs on the least-loaded healthy database of get_router(); df.attrs["database"] names it.
+    """
+    is_valid, reason = validate_sql(sql)
+    if not is_valid:
+        return False, None, f"Validation failed: {reason}", 0.0
+    rewrites = []
+    if cost_guard:
+        sql, rewrites = make_sargable(sql)
+
+    def run(conn, replica):
+        dbapi_conn = conn.connection.driver_connection
+        dbapi_conn.call_timeout = ORACLE_CALL_TIMEOUT_MS
+        try:
+            plan, action = None, "run"
+            if cost_guard:
+                plan = explain_plan(dbapi_conn, sql)
+                action, guard_msg = check_plan(plan, PLAN_COST_BUDGET, PLAN_COST_LIMIT)
+                if action == "reject":
+                    return None, plan, f"Rejected by cost guard: {guard_msg}"
+            shape, binds = bind_literals(sql) if BIND_LITERALS else (sql, {})
+            try:
+                df = fetch_dataframe(dbapi_conn, capped_sql(shape, max_rows, action), binds)
+            except Exception as e:
+                if not binds or not is_bind_error(e):
+                    raise
+                shape, binds = sql, {}
+                df = fetch_dataframe(dbapi_conn, capped_sql(sql, max_rows, action))
+            total_rows = len(df)
+            if total_rows > max_rows:
+                df = df.head(max_rows)
+                if action == "limit":
+                    # Counting every row is what the budget forbids; report the estimate
+                    total_rows = max(plan.cardinality, max_rows + 1)
+                    df.attrs["total_rows_estimated"] = True
+                else:
+                    cursor = dbapi_conn.cursor()
+                    try:
+                        cursor.execute(f"SELECT COUNT(*) FROM ({shape})", binds or None)
+                        total_rows = cursor.fetchone()[0]
+                    except Exception as e:
+                        if not is_duplicate_column_error(e):
+                            raise
+                        plan = plan or explain_plan(dbapi_conn, sql)
+                        total_rows = max(plan.cardinality, max_rows + 1)
+                        df.attrs["total_rows_estimated"] = True
+            df.attrs["total_rows"] = total_rows
+            df.attrs["database"] = replica.name
+            return df, plan, None
+        finally:
+            dbapi_conn.call_timeout = 0
+
+    try:
+        t0 = time.time()
+        df, plan, rejected = get_router().run(run)
+        if rejected:
+            return False, None, rejected, time.time() - t0
+        exec_time = time.time() - t0
+        total_rows = df.attrs["total_rows"]
+        df.attrs["executed_sql"] = sql
+        df.attrs["rewrites"] = rewrites
+        if plan is not None:
+            df.attrs["plan_cost"] = plan.cost
+            df.attrs["estimated_rows"] = plan.cardinality
+        msg = f"{total_rows} rows" if total_rows == len(df) else f"{len(df)} of {total_rows} rows"
+        return True, df, msg, exec_time
+    except Exception as e:
+        return False, None, execution_error(e), 0.0
+
+
+def detect_lookup(question: str):
+    """entity_lookup.Identifier when the question is a pasted identifier, else None."""
+    return detect_identifier(question) if ENTITY_LOOKUP else None
+
+
+def query_dataframe(sql: str, binds: dict = None) -> pd.DataFrame:
+    """Fixed, trusted SQL (no validation or cost guard) on the least-loaded database."""
+    def run(conn, replica):
+        dbapi_conn = conn.connection.driver_connection
+        dbapi_conn.call_timeout = ORACLE_CALL_TIMEOUT_MS
+        try:
+            return fetch_dataframe(dbapi_conn, sql, binds)
+        finally:
+            dbapi_conn.call_timeout = 0
+
+    return get_router().run(run)
+
+
+def run_lookup(identifier):
+    """entity_lookup.Dossier for the identifier; its sections run in parallel, one pooled connection each."""
+    return run_dossier(identifier, query_dataframe, get_lookup_executor(), LOOKUP_SECTION_ROWS)
+
+
+def narration_messages(question: str, df: pd.DataFrame) -> list:
+    results_text = summarize_result(df)
+    return chat_messages(NARRATION_SYSTEM, NARRATION_PROMPT.replace("{question}", question)
+                         .replace("{results}", results_text))
+
+
+def stream_narration(question: str, df: pd.DataFrame, placeholder, stats: dict = None):
+    """Stream narration token-by-token into a Streamlit placeholder."""
+    stream = _chat(CHAT_MODEL, narration_messages(question, df), QWEN3_OPTIONS, stream=True, stats=stats)
+    return render_stream(stream, placeholder, stats)
+
+
+def general_chat_messages(message: str, history: list) -> list:
+    user = ""
+    if history:
+        context = "\n".join(f"{m['role']}: {m['content'][:500]}" for m in history[-10:])
+        user = f"Previous conversation:\n{context}\n\n"
+    return chat_messages(SYSTEM_PROMPT_GENERAL, user + f"Officer's message: {message}\n\nRespond now. /no_think")
+
+
+def stream_general_chat(message: str, history: list, placeholder, stats: dict = None):
+    """Stream general chat response token-by-token."""
+    stream = _chat(CHAT_MODEL, general_chat_messages(message, history), QWEN3_OPTIONS, stream=True, stats=stats)
+    return render_stream(stream, placeholder, stats)
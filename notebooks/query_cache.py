@@ -0,0 +1,256 @@
+"""
+query_cache.py
+==============
+Shared two-tier cache in front of the NL2SQL pipeline.
+
+  Tier 1 (SQLCache)    : normalized question -> validated SQL
+                         (exact match, optional embedding similarity;
+                         invalidated when the data or schema changes)
+  Tier 2 (ResultCache) : normalized SQL text -> result DataFrame
+                         (TTL + LRU, invalidated when the data is reloaded)
+
+Both tiers are thread-safe so a single instance can be shared by every
+Streamlit session via st.cache_resource.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# ============================================================
+# Normalization
+# ============================================================
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_QUOTED_RE = re.compile(r"\"([^\"]+)\"|'([^']+)'")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    q = _PUNCT_RE.sub(" ", question.lower())
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so formatting differences share one cache entry."""
+    return _SPACE_RE.sub(" ", sql.strip())
+
+
+def question_literals(question: str, resolve=None) -> frozenset:
+    """Numbers, quoted strings and (with resolve, e.g. ValueIndex.resolve) the column values a
+    question names. "off-loadings in 2024" and "... in 2025" embed almost alike but differ here."""
+    literals = {("number", n) for n in _NUMBER_RE.findall(question)}
+    literals |= {("quoted", (a or b).lower()) for a, b in _QUOTED_RE.findall(question)}
+    if resolve is not None:
+        literals |= {(f"{m.table}.{m.column}", m.value) for m in resolve(question)}
+    return frozenset(literals)
+
+
+def _cosine(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    if na == 0 or nb == 0:
+        return 0.0
+    return dot / (na * nb)
+
+
+# ============================================================
+# Stats
+# ============================================================
+class CacheStats:
+    """Hit/miss counters and the generation/execution time saved by hits."""
+
+    def __init__(self):
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return (f"{self.hits}/{total} hits ({self.hit_rate:.0%}), "
+                f"{self.saved_seconds:.1f}s saved")
+
+
+# ============================================================
+# Tier 1: question -> SQL
+# ============================================================
+class SQLCache:
+    """Bounded LRU of question -> SQL with an optional semantic fallback.
+
+    embed_fn maps a question to an embedding vector (e.g. a local Ollama
+    embedding model). When it is None, or raises, only exact matches on
+    the normalized question are served. A semantic hit also needs the
+    same literals_fn(question) as the cached question: the SQL embeds
+    its literals, and a near neighbour with another year, number or
+    port is a different query.
+
+    version_fn works as in ResultCache; pass one that also changes with
+    the schema, since cached SQL names its tables and columns.
+    """
+
+    def __init__(self, max_entries: int = 256, embed_fn=None, threshold: float = 0.92,
+                 literals_fn=question_literals, version_fn=None):
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.literals_fn = literals_fn
+        self.version_fn = version_fn
+        self.stats = CacheStats()
+        self._entries = OrderedDict()   # key -> {"sql", "gen_time", "embedding", "literals"}
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        current = self.version_fn()
+        if current != self._version:
+            self._entries.clear()
+            self._version = current
+
+    def _embed(self, text_input: str):
+        if self.embed_fn is None:
+            return None
+        try:
+            return self.embed_fn(text_input)
+        except Exception:
+            return None
+
+    def get(self, question: str):
+        """Return (sql, match_type) or (None, None). match_type is 'exact' or 'semantic'."""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                self.stats.saved_seconds += entry["gen_time"]
+                return entry["sql"], "exact"
+
+        embedding = self._embed(key)
+        if embedding is not None:
+            literals = self.literals_fn(question)
+            with self._lock:
+                best_key, best_score = None, 0.0
+                for k, e in self._entries.items():
+                    if e["embedding"] is None or e["literals"] != literals:
+                        continue
+                    score = _cosine(embedding, e["embedding"])
+                    if score > best_score:
+                        best_key, best_score = k, score
+                if best_key is not None and best_score >= self.threshold:
+                    entry = self._entries[best_key]
+                    self._entries.move_to_end(best_key)
+                    self.stats.hits += 1
+                    self.stats.semantic_hits += 1
+                    self.stats.saved_seconds += entry["gen_time"]
+                    return entry["sql"], "semantic"
+
+        with self._lock:
+            self.stats.misses += 1
+        return None, None
+
+    def put(self, question: str, sql: str, gen_time: float):
+        """Store SQL that passed validation and executed successfully."""
+        key = normalize_question(question)
+        embedding = self._embed(key)
+        literals = self.literals_fn(question) if embedding is not None else None
+        with self._lock:
+            self._check_version()
+            self._entries[key] = {"sql": sql, "gen_time": gen_time, "embedding": embedding, "literals": literals}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ============================================================
+# Tier 2: SQL -> result DataFrame
+# ============================================================
+class ResultCache:
+    """TTL + LRU cache of SQL text -> result DataFrame.
+
+    version_fn returns a token identifying the currently loaded data
+    (see data_version_token). When the token changes, every cached
+    result is dropped.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 900.0, version_fn=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self.stats = CacheStats()
+        self._entries = OrderedDict()   # key -> (df, exec_time, stored_at)
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        current = self.version_fn()
+        if current != self._version:
+            self._entries.clear()
+            self._version = current
+
+    def get(self, sql: str):
+        """Return a copy of the cached DataFrame, or None on miss/expiry."""
+        key = normalize_sql(sql)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry[1]
+            return entry[0].copy()
+
+    def put(self, sql: str, df, exec_time: float):
+        key = normalize_sql(sql)
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (df.copy(), exec_time, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ============================================================
+# Data reload marker
+# ============================================================
+def data_version_token(marker: Path):
+    """Return the mtime of the marker touched by setup_oracle_ibms.py (None if absent)."""
+    try:
+        return marker.stat().st_mtime
+    except OSError:
+        return None
@@ -0,0 +1,105 @@
+"""
+result_summary.py
+=================
+What the narration model gets to see of a result set.
+
+summarize_result() replaces the fixed df.head(50).to_string() with a
+type-aware digest:
+
+  - 0 rows / single value   one line
+  - up to FULL_ROWS rows    the rows themselves
+  - larger frames           the first TOP_ROWS rows (generated SQL is
+                            usually ORDER BY ... DESC, so these are the
+                            top-k) plus per-column stats: min / max / sum /
+                            mean for numbers, range for dates, distinct
+                            count and most common values for text
+
+templated_answer() answers single-value results (a count, a total, one
+name) directly, so they need no CHAT_MODEL call at all.
+"""
+
+import math
+import re
+
+import pandas as pd
+
+FULL_ROWS = 15       # frames up to this size are sent whole
+TOP_ROWS = 10        # rows shown for larger frames
+TOP_VALUES = 5       # most common values listed per text column
+MAX_CELL_CHARS = 60
+
+# Column names that say nothing about the value ("COUNT(*)", "cnt", ...)
+GENERIC_COLUMN_RE = re.compile(r"^(count\(\*\)|count|cnt|n|num|total|value|result|sum|avg)$", re.IGNORECASE)
+
+
+def format_value(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "—"
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer() and abs(value) < 1e15):
+        return f"{int(value):,}"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d") if value == value.normalize() else value.strftime("%Y-%m-%d %H:%M")
+    text = str(value)
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS - 1] + "…"
+
+
+def _scalar(value):
+    """numpy scalar -> Python scalar, so format_value sees int/float/str."""
+    return value.item() if hasattr(value, "item") and not isinstance(value, pd.Timestamp) else value
+
+
+def _column_stats(name, series: pd.Series) -> str:
+    values = series.dropna()
+    nulls = len(series) - len(values)
+    null_note = f", {nulls:,} empty" if nulls else ""
+    if values.empty:
+        return f"- {name}: all empty"
+    if pd.api.types.is_bool_dtype(values):
+        return f"- {name}: {int(values.sum()):,} true / {int((~values).sum()):,} false{null_note}"
+    if pd.api.types.is_numeric_dtype(values):
+        return (f"- {name}: min {format_value(_scalar(values.min()))}, max {format_value(_scalar(values.max()))}, "
+                f"sum {format_value(_scalar(values.sum()))}, mean {format_value(float(values.mean()))}{null_note}")
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return f"- {name}: {format_value(values.min())} to {format_value(values.max())}{null_note}"
+    counts = values.astype(str).value_counts()
+    top = ", ".join(f"{format_value(v)} ({n:,})" for v, n in counts.head(TOP_VALUES).items())
+    return f"- {name}: {len(counts):,} distinct; most common: {top}{null_note}"
+
+
+def summarize_result(df: pd.DataFrame) -> str:
+    """Compact text for the narration prompt; df.attrs["total_rows"] is the true row count."""
+    if df is None or df.empty:
+        return "(No results — 0 rows returned)"
+    total_rows = df.attrs.get("total_rows", len(df))
+    approx = "about " if df.attrs.get("total_rows_estimated") else ""
+    if df.shape == (1, 1):
+        return f"{df.columns[0]}: {format_value(_scalar(df.iat[0, 0]))}"
+    if len(df) <= FULL_ROWS and total_rows == len(df):
+        return df.to_string(index=False)
+
+    lines = [f"{approx}{total_rows:,} rows in total. First {min(TOP_ROWS, len(df))} rows:",
+             df.head(TOP_ROWS).to_string(index=False), ""]
+    scope = "all rows" if total_rows == len(df) else f"the first {len(df):,} rows"
+    lines.append(f"Column summary ({scope}):")
+    lines += [_column_stats(name, df[name]) for name in df.columns]
+    return "\n".join(lines)
+
+
+def _label(column: str) -> str:
+    return column.replace("_", " ").strip().capitalize()
+
+
+def templated_answer(question: str, df: pd.DataFrame):
+    """Briefing for a single-value result without an LLM call; None when the result needs narration."""
+    if df is None or df.shape != (1, 1):
+        return None
+    value = _scalar(df.iat[0, 0])
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None    # let the narration explain an empty aggregate
+    column = str(df.columns[0])
+    label = "Result" if GENERIC_COLUMN_RE.match(column) else _label(column)
+    return f"{label}: **{format_value(value)}**"
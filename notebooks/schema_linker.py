@@ -0,0 +1,221 @@
+"""
+schema_linker.py
+================
+Schema linking for SQL generation: picks the tables, FK joins and value
+lists relevant to a question and assembles a pruned version of
+Config/prompt_template.txt instead of sending all 20 tables every time.
+
+Sources:
+  Config/schema_ddl.txt      -> tables, columns, types
+  Config/prompt_template.txt -> header, FOREIGN KEYS list, STRICT RULES
+  Config/sample_values.json  -> VALID COLUMN VALUES
+"""
+
+import json
+import re
+from collections import deque
+from pathlib import Path
+
+# Question words that point at a table even though they are not its name.
+# Matched on word boundaries with an optional plural/verb suffix.
+TABLE_SYNONYMS = {
+    "asylum_claims":        ["asylum", "claim", "refugee"],
+    "audit_log":            ["audit", "log", "officer activity", "terminal"],
+    "countries":            ["country", "countries", "nationality", "nationalities", "region", "conflict zone"],
+    "detention_records":    ["detention", "detained", "detainee", "facility", "facilities", "custody"],
+    "document_registry":    ["document", "cnic", "nicop", "stolen", "expired passport"],
+    "ecl_entries":          ["ecl", "exit control"],
+    "family_relationships": ["family", "families", "relative", "spouse", "sibling", "parent", "relationship"],
+    "illegal_crossings":    ["illegal crossing", "crossing", "smuggler", "apprehended"],
+    "offloading_records":   ["offload", "off-load", "off load", "offloading", "off-loading", "airline"],
+    "ports_of_entry":       ["port", "airport", "border post", "seaport", "iata"],
+    "removal_orders":       ["removal", "deport", "deportation", "deportee", "removed"],
+    "risk_profiles":        ["risk", "high-risk", "risk score"],
+    "sponsors":             ["sponsor", "employer"],
+    "suspect_networks":     ["network", "suspect", "ring", "gang"],
+    "trafficking_cases":    ["trafficking", "trafficked", "trafficker", "victim"],
+    "travel_records":       ["travel record", "trip", "flight", "frequent", "departure", "arrival",
+                             "overstay", "carrier", "inbound", "outbound", "travel history", "traveled", "travelled"],
+    "travelers":            ["traveler", "traveller", "passenger", "person", "people", "name",
+                             "passport", "gender", "occupation", "born"],
+    "visa_applications":    ["visa application", "applied", "application", "denied", "approved"],
+    "visa_categories":      ["visa type", "visa category", "visa categories", "visa class", "visa"],
+    "watchlist":            ["watchlist", "watch list", "alert", "interpol", "blacklist"],
+}
+_SYNONYM_RES = {
+    table: [re.compile(r"\b" + re.escape(syn) + r"(?:s|es|ed|ing)?\b") for syn in syns]
+    for table, syns in TABLE_SYNONYMS.items()
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class SchemaInfo:
+    """Parsed schema pieces used to assemble pruned prompts."""
+
+    def __init__(self, header, tables, foreign_keys, sample_values, rules):
+        self.header = header                # first line of prompt_template.txt
+        self.tables = tables                # {table: [column, ...]} in DDL order
+        self.foreign_keys = foreign_keys    # [(src_table, src_col, dst_table, dst_col)]
+        self.sample_values = sample_values  # {table: {column: [values]}}
+        self.rules = rules                  # "=== STRICT RULES ===" ... "Question: {question}"
+        # Value -> (owning table, column), for values unique to one table
+        # ("Active", "Other", "Approved" appear everywhere and link nothing).
+        # Short codes (ISB, ARE, PKR) keep their case; the rest are lowercased.
+        owners = {}
+        for table, cols in sample_values.items():
+            for col, values in cols.items():
+                for v in values:
+                    v = str(v) if len(str(v)) <= 3 else str(v).lower()
+                    owners.setdefault(v, set()).add((table, col))
+        self.value_owner = {
+            v: next(iter(o)) for v, o in owners.items()
+            if len({t for t, _ in o}) == 1 and len(v) > 1
+        }
+        self.graph = {t: set() for t in tables}
+        for src, _, dst, _ in foreign_keys:
+            self.graph.setdefault(src, set()).add(dst)
+            self.graph.setdefault(dst, set()).add(src)
+
+
+def _parse_ddl(ddl_text: str) -> dict:
+    tables = {}
+    current = None
+    for line in ddl_text.splitlines():
+        stripped = line.strip()
+        m = re.match(r"CREATE TABLE (\w+)", stripped, re.IGNORECASE)
+        if m:
+            current = m.group(1).lower()
+            tables[current] = []
+        elif stripped.startswith(")"):
+            current = None
+        elif current and stripped and not stripped.startswith("--"):
+            tables[current].append(stripped.split()[0].lower())
+    return tables
+
+
+def _parse_foreign_keys(template: str) -> list:
+    fks = []
+    for m in re.finditer(r"^(\w+)\.(\w+) -> (\w+)\.(\w+)$", template, re.MULTILINE):
+        fks.append((m.group(1), m.group(2), m.group(3), m.group(4)))
+    return fks
+
+
+def load_schema(config_dir: Path) -> SchemaInfo:
+    config_dir = Path(config_dir)
+    template = (config_dir / "prompt_template.txt").read_text()
+    tables = _parse_ddl((config_dir / "schema_ddl.txt").read_text())
+    sample_values = json.loads((config_dir / "sample_values.json").read_text())
+    header = template.splitlines()[0]
+    rules = template[template.index("=== STRICT RULES ==="):]
+    return SchemaInfo(header, tables, _parse_foreign_keys(template), sample_values, rules)
+
+
+# ============================================================
+# Linking
+# ============================================================
+def _score_tables(question: str, schema: SchemaInfo) -> dict:
+    q = question.lower()
+    words = set(_WORD_RE.findall(q))
+    scores = {}
+
+    def bump(table, amount):
+        scores[table] = scores.get(table, 0) + amount
+
+    for table, columns in schema.tables.items():
+        # Table name itself ("watchlist", "travel records", "ports of entry")
+        if table in words or table.replace("_", " ") in q:
+            bump(table, 3)
+        for syn_re in _SYNONYM_RES.get(table, []):
+            if syn_re.search(q):
+                bump(table, 2)
+        # Column names mentioned verbatim ("risk_tier", "severity", "carrier")
+        for col in columns:
+            if col in words or ("_" in col and re.search(r"\b" + col.replace("_", " ") + r"\b", q)):
+                bump(table, 1)
+
+    # Literal values: "Interpol", "Kuwait Airways", "ISB" ... Multi-word names
+    # also match on their first word ("Islamabad" -> Islamabad International Airport).
+    for value, (table, col) in schema.value_owner.items():
+        haystack = question if len(value) <= 3 else q
+        first = value.split()[0]
+        if (re.search(r"\b" + re.escape(value) + r"\b", haystack)
+                or (col.endswith("_name") and " " in value and len(first) > 3 and first in words)):
+            bump(table, 1)
+    return scores
+
+
+def _join_path(schema: SchemaInfo, selected: set, target: str) -> list:
+    """Shortest FK path from any selected table to target (BFS)."""
+    queue = deque((s, [s]) for s in selected)
+    seen = set(selected)
+    while queue:
+        node, path = queue.popleft()
+        if node == target:
+            return path
+        for nxt in sorted(schema.graph.get(node, ())):
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append((nxt, path + [nxt]))
+    return [target]
+
+
+def link_tables(question: str, schema: SchemaInfo, max_tables: int = 6) -> list:
+    """Return the tables relevant to the question, closed under FK join paths.
+
+    Returns an empty list when nothing could be linked; callers should then
+    fall back to the full prompt.
+    """
+    scores = _score_tables(question, schema)
+    if not scores:
+        return []
+    # Incidental matches far below the best table are noise, not intent
+    floor = max(scores.values()) / 4
+    ranked = sorted((t for t, s in scores.items() if s >= floor), key=lambda t: (-scores[t], t))
+    ranked = ranked[:max_tables]
+
+    selected = {ranked[0]}
+    for table in ranked[1:]:
+        selected.update(_join_path(schema, selected, table))
+    return [t for t in schema.tables if t in selected]
+
+
+# ============================================================
+# Prompt assembly
+# ============================================================
+def linked_schema_block(schema: SchemaInfo, tables: list, values: dict = None) -> str:
+    """TABLES AND COLUMNS / FOREIGN KEYS / VALID COLUMN VALUES restricted to `tables`.
+
+    `values` ({table: {column: [values]}}) replaces the sample value lists,
+    e.g. with the values a question names (value_index.py)."""
+    if values is None:
+        values = schema.sample_values
+    table_set = set(tables)
+    lines = ["=== TABLES AND COLUMNS (use ONLY these exact names) ==="]
+    for table in tables:
+        lines.append(f"TABLE {table}:")
+        lines.append(f"  COLUMNS: {', '.join(schema.tables[table])}")
+        lines.append("")
+
+    fk_lines = [f"{s}.{sc} -> {d}.{dc}" for s, sc, d, dc in schema.foreign_keys
+                if s in table_set and d in table_set]
+    if fk_lines:
+        lines.append("")
+        lines.append("=== FOREIGN KEYS ===")
+        lines.extend(fk_lines)
+
+    value_lines = []
+    for table in tables:
+        for col, col_values in values.get(table, {}).items():
+            value_lines.append(f"{table}.{col}: {col_values}")
+    if value_lines:
+        lines.append("")
+        lines.append("=== VALID COLUMN VALUES ===")
+        lines.extend(value_lines)
+    return "\n".join(lines)
+
+
+def build_pruned_prompt(question: str, schema: SchemaInfo, tables: list) -> str:
+    """Assemble a prompt_template.txt-shaped prompt restricted to `tables`."""
+    lines = [schema.header, "", linked_schema_block(schema, tables), "", schema.rules]
+    return "\n".join(lines).replace("{question}", question)
@@ -0,0 +1,153 @@
+"""
+session_store.py
+================
+Bounded chat history for one Streamlit session.
+
+Result tables are kept as Arrow tables (columnar, no per-cell Python
+objects) instead of pandas DataFrames. When the session's tables exceed
+memory_budget the oldest are spilled to zstd Parquet files in a private
+temp dir; when the spilled files exceed disk_budget the oldest are
+evicted (the answer text and details stay, the table is gone). The temp
+dir is removed when the store is closed or garbage-collected.
+
+    store = SessionStore()
+    store.append({"role": "assistant", "content": text, "dataframe": df, "details": md})
+    for i, msg in enumerate(store):
+        df = store.dataframe(msg)        # loads spilled tables on demand
+"""
+
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MEMORY_BUDGET = 8 * 1024 * 1024     # Arrow bytes kept in memory per session
+DISK_BUDGET = 64 * 1024 * 1024      # spilled Parquet bytes per session
+
+
+def unique_columns(columns) -> list:
+    """Column names made unique for Arrow: a repeated name (t.*, w.* joins) gets _2, _3, ..."""
+    seen, names = set(), []
+    for col in map(str, columns):
+        name, n = col, 1
+        while name in seen:
+            n += 1
+            name = f"{col}_{n}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+class StoredFrame:
+    """One result table: in memory (table), spilled (path) or evicted (neither)."""
+
+    __slots__ = ("table", "path", "nbytes", "rows", "columns")
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self.path = None
+        self.nbytes = table.nbytes
+        self.rows = table.num_rows
+        self.columns = table.num_columns
+
+    @property
+    def state(self) -> str:
+        return "memory" if self.table is not None else "disk" if self.path is not None else "evicted"
+
+
+class SessionStore:
+    """List-like chat history (append, len, iteration, indexing) with bounded table storage."""
+
+    def __init__(self, memory_budget: int = MEMORY_BUDGET, disk_budget: int = DISK_BUDGET, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._spill_root = spill_dir
+        self._spill_dir = None
+        self._messages = []
+        self._in_memory = []    # StoredFrames in append order
+        self._on_disk = []
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.spilled = 0
+        self.evicted = 0
+        self._finalizer = None
+
+    # ---------- list interface ----------
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def append(self, message: dict):
+        """Store a message; a "dataframe" entry (DataFrame or list of row dicts) becomes a StoredFrame."""
+        message = dict(message)
+        data = message.pop("dataframe", None)
+        if isinstance(data, list):
+            data = pd.DataFrame(data)
+        if data is not None and not data.empty:
+            if not data.columns.is_unique:
+                data = data.set_axis(unique_columns(data.columns), axis=1)
+            frame = StoredFrame(pa.Table.from_pandas(data, preserve_index=False))
+            message["frame"] = frame
+            self._in_memory.append(frame)
+            self.memory_bytes += frame.nbytes
+            self._enforce_budgets()
+        self._messages.append(message)
+
+    def chat_history(self, exclude_last: int = 0) -> list:
+        """[{"role", "content"}] for the LLM, without the tables."""
+        messages = self._messages[:len(self._messages) - exclude_last]
+        return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    # ---------- tables ----------
+    def dataframe(self, message: dict):
+        """The message's table as a DataFrame, read back from Parquet if spilled; None if none/evicted."""
+        frame = message.get("frame")
+        if frame is None:
+            return None
+        if frame.table is not None:
+            return frame.table.to_pandas()
+        if frame.path is not None:
+            return pq.read_table(frame.path).to_pandas()
+        return None
+
+    def _enforce_budgets(self):
+        while self.memory_bytes > self.memory_budget and self._in_memory:
+            self._spill(self._in_memory.pop(0))
+        while self.disk_bytes > self.disk_budget and self._on_disk:
+            frame = self._on_disk.pop(0)
+            self.disk_bytes -= frame.path.stat().st_size
+            frame.path.unlink(missing_ok=True)
+            frame.path = None
+            self.evicted += 1
+
+    def _spill(self, frame: StoredFrame):
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="ibms_session_", dir=self._spill_root))
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        path = self._spill_dir / f"frame_{self.spilled:05d}.parquet"
+        pq.write_table(frame.table, path, compression="zstd")
+        self.memory_bytes -= frame.nbytes
+        frame.table = None
+        frame.path = path
+        self.disk_bytes += path.stat().st_size
+        self._on_disk.append(frame)
+        self.spilled += 1
+
+    # ---------- housekeeping ----------
+    def stats(self) -> dict:
+        return {"messages": len(self._messages), "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes, "in_memory": len(self._in_memory),
+                "on_disk": len(self._on_disk), "evicted": self.evicted}
+
+    def close(self):
+        if self._finalizer is not None:
+            self._finalizer()
@@ -0,0 +1,160 @@
+"""
+sql_binds.py
+============
+Turns validated SQL into a bind-variable shape so Oracle shares one
+cursor per question shape instead of hard-parsing every literal variant:
+
+    WHERE poe.port_name = 'Islamabad International Airport' AND d >= TO_DATE('2025-01-01','YYYY-MM-DD')
+ -> WHERE POE.PORT_NAME = :b1 AND D >= :b2          {"b1": "Islamabad ...", "b2": date(2025, 1, 1)}
+
+Only literals in WHERE / ON / HAVING conditions are bound. Select-list,
+GROUP BY and ORDER BY literals stay, because Oracle matches GROUP BY
+expressions textually. Function arguments after the first (format masks,
+SUBSTR positions, NVL defaults) stay literal so function-based indexes
+still match, and so do type sizes and INTERVAL / ESCAPE literals.
+DATE 'YYYY-MM-DD' and TO_DATE('YYYY-MM-DD', 'YYYY-MM-DD') become date
+binds.
+
+The shape is normalized too: unquoted words are upper-cased and tokens
+single-spaced, since cursor sharing needs byte-identical text.
+"""
+
+import datetime
+import re
+from decimal import Decimal
+
+from sql_validator import _TOKEN_RE
+
+BIND_PREFIX = "b"
+
+# Clause keywords; literals are bound only while the innermost clause is a condition
+CLAUSE_WORDS = {"SELECT", "FROM", "JOIN", "WHERE", "ON", "GROUP", "HAVING", "ORDER", "CONNECT", "START",
+                "FETCH", "OFFSET", "PARTITION", "UNION", "INTERSECT", "MINUS", "EXCEPT", "WITH"}
+CONDITION_CLAUSES = {"WHERE", "ON", "HAVING"}
+
+# Words before "(" that do not make it a function call
+NON_FUNCTION_WORDS = CLAUSE_WORDS | {"IN", "AND", "OR", "NOT", "EXISTS", "AS", "ANY", "ALL", "SOME", "CASE",
+                                     "WHEN", "THEN", "ELSE", "BETWEEN", "LIKE", "IS", "BY", "OVER", "DISTINCT"}
+TYPE_WORDS = {"NUMBER", "VARCHAR2", "NVARCHAR2", "VARCHAR", "CHAR", "NCHAR", "RAW", "FLOAT", "DECIMAL",
+              "TIMESTAMP", "INTERVAL"}
+KEEP_AFTER = {"INTERVAL", "ESCAPE"}
+
+# Errors a bound statement can raise where the literal one would not
+BIND_ERRORS = ("ORA-00979", "ORA-01008", "ORA-01036", "ORA-00932", "ORA-01722", "ORA-01858", "ORA-01861",
+               "DPY-2006", "DPY-4010")
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ISO_DATE_MASK = "YYYY-MM-DD"
+
+
+def _string_value(text: str) -> str:
+    if text[:1] in "nN":
+        text = text[1:]
+    if text[:1] in "qQ":
+        return text[3:-2]
+    return text[1:-1].replace("''", "'")
+
+
+def _number_value(text: str):
+    return int(text) if text.isdigit() else Decimal(text)
+
+
+def _iso_date(text: str):
+    value = _string_value(text)
+    if not _ISO_DATE_RE.fullmatch(value):
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _lex(sql: str):
+    """[(kind, raw_text)] without whitespace/comments; None if the SQL has a character we do not lex."""
+    tokens = []
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup if m.lastgroup != "qdelim" else "string"
+        if kind == "error":
+            return None
+        if kind not in ("ws", "comment"):
+            tokens.append((kind, m.group()))
+    return tokens
+
+
+def _join(parts: list) -> str:
+    """Single-spaced SQL; a "(" opening a function call (marked "f(") follows its name directly."""
+    out = []
+    for text in parts:
+        call = text == "f("
+        text = "(" if call else text
+        if out and not (call or text in (",", ")", ".") or out[-1] in ("(", ".")):
+            out.append(" ")
+        out.append(text)
+    return "".join(out)
+
+
+def bind_literals(sql: str) -> tuple:
+    """Returns (shape_sql, binds); binds is {} and the SQL unchanged when there is nothing to bind."""
+    tokens = _lex(sql)
+    if tokens is None:
+        return sql, {}
+    binds = {}
+
+    def bind(value) -> str:
+        name = f"{BIND_PREFIX}{len(binds) + 1}"
+        binds[name] = value
+        return f":{name}"
+
+    # One frame per open parenthesis: [clause, function name, argument index]
+    frames = [[None, None, 0]]
+    parts = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        upper = text.upper() if kind == "word" else text
+        prev = parts[-1].upper() if parts else ""
+        frame = frames[-1]
+        bindable = (frame[0] in CONDITION_CLAUSES and prev not in KEEP_AFTER
+                    and (frame[1] is None or (frame[2] == 0 and frame[1] not in TYPE_WORDS)))
+
+        if kind == "word":
+            if upper in CLAUSE_WORDS:
+                frame[0] = upper
+            nxt = tokens[i + 1:i + 6]
+            # TO_DATE('2025-01-01', 'YYYY-MM-DD') -> date bind
+            if (bindable and upper == "TO_DATE" and len(nxt) == 5 and nxt[0][1] == "(" and nxt[1][0] == "string"
+                    and nxt[2][1] == "," and nxt[3][0] == "string" and nxt[4][1] == ")"
+                    and _string_value(nxt[3][1]).upper() == _ISO_DATE_MASK and _iso_date(nxt[1][1])):
+                parts.append(bind(_iso_date(nxt[1][1])))
+                i += 6
+                continue
+            # DATE '2025-01-01' -> date bind
+            if bindable and upper == "DATE" and nxt and nxt[0][0] == "string" and _iso_date(nxt[0][1]):
+                parts.append(bind(_iso_date(nxt[0][1])))
+                i += 2
+                continue
+            parts.append(upper)
+        elif kind == "string":
+            parts.append(bind(_string_value(text)) if bindable and prev not in ("DATE", "TIMESTAMP") else text)
+        elif kind == "number":
+            parts.append(bind(_number_value(text)) if bindable else text)
+        elif text == "(":
+            function = prev if tokens[i - 1:i] and tokens[i - 1][0] == "word" and prev not in NON_FUNCTION_WORDS \
+                else None
+            frames.append([frame[0], function, 0])
+            parts.append("f(" if function else text)
+        elif text == ")":
+            if len(frames) > 1:
+                frames.pop()
+            parts.append(text)
+        else:
+            if text == ",":
+                frame[2] += 1
+            parts.append(text)
+        i += 1
+    return _join(parts), binds
+
+
+def is_bind_error(e: Exception) -> bool:
+    """True when the bound statement failed in a way the literal SQL may not (retry with literals)."""
+    return any(code in str(e) for code in BIND_ERRORS)
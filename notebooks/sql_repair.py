@@ -0,0 +1,174 @@
+"""
+sql_repair.py
+=============
+Repair stage for generated SQL that failed validation or execution.
+
+SQLRepairer.fix() tries, in order:
+
+  1. rule   — deterministic rewrites for mistakes the models make often
+              (LIMIT n, TRUE/FALSE flags, "double-quoted" string values)
+  2. cache  — identifier substitutions learned from earlier successful
+              repairs of the same error class (e.g. ORA-00904 on
+              passport_no -> passport_number)
+  3. llm    — failing SQL + error + compact schema excerpt to SQL_MODEL
+
+learn() is called once a repaired query has run successfully; simple
+token-for-token fixes are kept per error signature so the next failure
+of that class is fixed without an LLM call. Only signatures that name
+the offending identifier are learned: a bare code (ORA-00979 "not a
+GROUP BY expression") says nothing about which swap a later, unrelated
+query needs. Substitutions replace whole identifier tokens, never text
+inside string literals.
+"""
+
+import difflib
+import re
+import threading
+from collections import OrderedDict
+
+# Errors that mean "not a read-only question" or "too expensive" rather than a mistake
+NOT_REPAIRABLE = ("Blocked:", "Database links", "Multiple statements", "Query exceeded")
+
+STATIC_RULES = [
+    (re.compile(r"\s+LIMIT\s+(\d+)\s*$", re.IGNORECASE), r" FETCH FIRST \1 ROWS ONLY", "LIMIT -> FETCH FIRST"),
+    (re.compile(r"(=|<>|!=)\s*TRUE\b", re.IGNORECASE), r"\1 1", "TRUE -> 1"),
+    (re.compile(r"(=|<>|!=)\s*FALSE\b", re.IGNORECASE), r"\1 0", "FALSE -> 0"),
+    (re.compile(r"(=|<>|!=|LIKE)\s*\"([^\"]*)\"(?!\s*\.)", re.IGNORECASE), r"\1 '\2'", "\"value\" -> 'value'"),
+]
+
+_ORA_RE = re.compile(r"ORA-(\d{5})")
+_QUOTED_IDENT_RE = re.compile(r'"([^"]+)"(?:\."([^"]+)")?')
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_IDENT_SIGNATURE_RE = re.compile(r"(?:unknown-(?:table|column)|ORA-\d{5}):.+")
+# String literals ('..', q'[..]') and quoted identifiers pass through apply_substitutions untouched
+_SQL_PART_RE = re.compile(r"""[nN]?[qQ]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(\S).*?\1)'|[nN]?'(?:[^']|'')*'|"[^"]*"|\w+""",
+                          re.DOTALL)
+
+
+def is_repairable(error: str) -> bool:
+    return not any(marker in error for marker in NOT_REPAIRABLE)
+
+
+def error_signature(error: str) -> str:
+    """Error class used as the learned-fix key: code/kind plus the offending identifier."""
+    m = re.match(r"(?:Validation failed: )?Unknown (table|column): (?:\w+\.)?(\w+)", error)
+    if m:
+        return f"unknown-{m.group(1)}:{m.group(2).lower()}"
+    m = _ORA_RE.search(error)
+    if m:
+        code = f"ORA-{m.group(1)}"
+        ident = _QUOTED_IDENT_RE.search(error[m.end():])
+        if ident:
+            return f"{code}:{(ident.group(2) or ident.group(1)).lower()}"
+        return code
+    return error.split(":")[0].strip()[:60]
+
+
+def is_learnable(signature: str) -> bool:
+    """A signature naming the offending identifier (unknown-column:passport_no, ORA-00904:passport_no)."""
+    return bool(_IDENT_SIGNATURE_RE.fullmatch(signature))
+
+
+def token_substitutions(bad_sql: str, fixed_sql: str):
+    """[(old, new)] when fixed_sql only swaps single identifiers of bad_sql, else None."""
+    a = [t.lower() for t in _TOKEN_RE.findall(bad_sql)]
+    b = [t.lower() for t in _TOKEN_RE.findall(fixed_sql)]
+    subs = []
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == "equal":
+            continue
+        if op != "replace" or i2 - i1 != 1 or j2 - j1 != 1:
+            return None
+        old, new = a[i1], b[j1]
+        if not (old.isidentifier() and new.isidentifier()):
+            return None
+        subs.append((old, new))
+    return subs or None
+
+
+def apply_substitutions(sql: str, subs: list) -> str:
+    """Swap whole identifier tokens (case-insensitive); literals and quoted identifiers are left as is."""
+    swaps = {old.lower(): new for old, new in subs}
+    return _SQL_PART_RE.sub(lambda m: swaps.get(m.group().lower(), m.group()), sql)
+
+
+class RepairStats:
+    def __init__(self):
+        self.questions = 0        # questions that needed a repair
+        self.repaired = 0         # ... and ran successfully afterwards
+        self.attempts = 0
+        self.by_source = {"rule": 0, "cache": 0, "llm": 0}
+        self.added_seconds = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.repaired / self.questions if self.questions else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.success_rate:.0%} repaired ({self.repaired}/{self.questions}), "
+                f"rule {self.by_source['rule']} / cache {self.by_source['cache']} / llm {self.by_source['llm']}, "
+                f"+{self.added_seconds:.1f}s total")
+
+
+class SQLRepairer:
+    def __init__(self, max_patterns: int = 256):
+        self.max_patterns = max_patterns
+        self.stats = RepairStats()
+        self._patterns = OrderedDict()   # error signature -> [(old, new)]
+        self._lock = threading.Lock()
+
+    def quick_fix(self, sql: str, error: str) -> tuple:
+        """Rule or learned fix without an LLM call: (new_sql, source), or (None, None)."""
+        for pattern, replacement, _ in STATIC_RULES:
+            fixed = pattern.sub(replacement, sql)
+            if fixed != sql:
+                return self._count(fixed, "rule")
+
+        signature = error_signature(error)
+        with self._lock:
+            subs = self._patterns.get(signature)
+            if subs:
+                self._patterns.move_to_end(signature)
+        if subs:
+            fixed = apply_substitutions(sql, subs)
+            if fixed != sql:
+                return self._count(fixed, "cache")
+        return None, None
+
+    def fix(self, sql: str, error: str, llm_fix) -> tuple:
+        """Returns (new_sql, source). llm_fix(sql, error) -> sql is only called when nothing cheaper applies."""
+        fixed, source = self.quick_fix(sql, error)
+        if fixed is not None:
+            return fixed, source
+        return self._count(llm_fix(sql, error), "llm")
+
+    async def fix_async(self, sql: str, error: str, llm_fix) -> tuple:
+        """fix() with a coroutine function llm_fix(sql, error)."""
+        fixed, source = self.quick_fix(sql, error)
+        if fixed is not None:
+            return fixed, source
+        return self._count(await llm_fix(sql, error), "llm")
+
+    def _count(self, sql, source):
+        with self._lock:
+            self.stats.attempts += 1
+            self.stats.by_source[source] += 1
+        return sql, source
+
+    def learn(self, error: str, bad_sql: str, fixed_sql: str):
+        signature = error_signature(error)
+        subs = token_substitutions(bad_sql, fixed_sql) if is_learnable(signature) else None
+        if not subs:
+            return
+        with self._lock:
+            self._patterns[signature] = subs
+            self._patterns.move_to_end(signature)
+            while len(self._patterns) > self.max_patterns:
+                self._patterns.popitem(last=False)
+
+    def record(self, repaired: bool, seconds: float):
+        """One question that went through the repair loop."""
+        with self._lock:
+            self.stats.questions += 1
+            self.stats.repaired += int(repaired)
+            self.stats.added_seconds += seconds
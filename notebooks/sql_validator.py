@@ -0,0 +1,274 @@
+"""
+sql_validator.py
+================
+Tokenizer-based safety check for generated SQL.
+
+The SQL is lexed once with a single compiled pattern that understands
+'string' / q'[quoted]' literals, "quoted identifiers", comments and bind
+variables, so keywords or table names inside literals no longer trip (or
+satisfy) the checks. The same pass enforces:
+
+  - SELECT / WITH statements only, no ';', no comments, no @dblink
+  - no DML/DDL/PL-SQL keywords, no SYS./DBA_/V$/DBMS_/UTL_ objects
+
+A second walk over the tokens extracts the tables (with aliases and CTE
+names) and columns the query references and checks them against
+Config/schema_ddl.txt. Aliases are scoped per (sub)query: alias.column
+resolves in the innermost query that binds the alias, then outward. The resulting SQLAnalysis is returned so later
+stages can reuse the parse.
+"""
+
+import re
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>[nN]?[qQ]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(?P<qdelim>\S).*?(?P=qdelim))'
+              |[nN]?'(?:[^']|'')*')
+  | (?P<qident>"[^"]+")
+  | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$#]*)
+  | (?P<bind>:\w+)
+  | (?P<op><>|!=|<=|>=|\|\||=>|[-+*/%(),.=<>;@\[\]])
+  | (?P<error>.)
+""", re.VERBOSE | re.DOTALL)
+
+BLOCKED_WORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE",
+    "CREATE", "DROP", "ALTER", "TRUNCATE", "RENAME",
+    "GRANT", "REVOKE",
+    "BEGIN", "DECLARE", "EXEC", "EXECUTE",
+}
+BLOCKED_PREFIXES = ("DBMS_", "UTL_", "DBA_", "V$", "GV$")
+
+# Words that end a FROM item instead of naming its alias
+CLAUSE_WORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL",
+    "OUTER", "CROSS", "NATURAL", "ON", "USING", "UNION", "INTERSECT", "MINUS",
+    "EXCEPT", "FETCH", "OFFSET", "CONNECT", "START", "PIVOT", "UNPIVOT", "MODEL",
+    "PARTITION", "FOR", "SELECT", "FROM", "WITH", "SAMPLE", "WINDOW",
+}
+FROM_END_WORDS = CLAUSE_WORDS - {"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL"}
+
+IDENT_KINDS = ("word", "qident")
+
+
+class SQLAnalysis:
+    """Result of analyze(): verdict plus the parse for reuse."""
+
+    def __init__(self, sql, ok, reason, statement=None, tables=(), aliases=None,
+                 columns=frozenset(), ctes=frozenset(), literals=()):
+        self.sql = sql
+        self.ok = ok
+        self.reason = reason
+        self.statement = statement    # "SELECT" or "WITH"
+        self.tables = tables          # schema tables in order of first reference
+        self.aliases = aliases or {}  # alias / table name -> table
+        self.columns = columns        # {(table, column)} resolved against the schema
+        self.ctes = ctes              # names defined in the WITH clause
+        self.literals = literals      # string literal values, unquoted
+
+    def __repr__(self):
+        return f"SQLAnalysis(ok={self.ok}, reason={self.reason!r}, tables={self.tables})"
+
+
+def _literal_value(text):
+    if text[:1] in "nN":
+        text = text[1:]
+    if text[:1] in "qQ":
+        return text[3:-2]
+    return text[1:-1].replace("''", "'")
+
+
+def tokenize(sql: str) -> list:
+    """[(kind, text)] without whitespace/comments; words upper-cased, "quoted" identifiers unquoted."""
+    tokens = []
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup if m.lastgroup != "qdelim" else "string"
+        if kind in ("ws", "comment"):
+            continue
+        text = m.group()
+        if kind == "word":
+            text = text.upper()
+        elif kind == "qident":
+            text = text[1:-1]
+        tokens.append((kind, text))
+    return tokens
+
+
+class SQLValidator:
+    def __init__(self, tables: dict):
+        self.tables = {t.lower(): set(c.lower() for c in cols) for t, cols in tables.items()}
+
+    # ------------------------------------------------------------
+    # Pass 1: lex + safety checks
+    # ------------------------------------------------------------
+    def _lex(self, sql):
+        """Tokens and literals, or (None, reason) on the first violation."""
+        tokens, literals = [], []
+        prev = None
+        for m in _TOKEN_RE.finditer(sql):
+            kind = m.lastgroup if m.lastgroup != "qdelim" else "string"
+            if kind == "ws":
+                continue
+            text = m.group()
+            if not tokens and (kind, text.upper()) not in (("word", "SELECT"), ("word", "WITH")):
+                return None, "Must start with SELECT/WITH"
+            if kind == "comment":
+                return None, "SQL comments not allowed"
+            if kind == "error":
+                return None, f"Unterminated literal or invalid character: {text!r}"
+            if kind == "string":
+                literals.append(_literal_value(text))
+            elif kind in IDENT_KINDS:
+                text = text.upper() if kind == "word" else text[1:-1]
+                name = text.upper()
+                if kind == "word" and name in BLOCKED_WORDS:
+                    return None, f"Blocked: {m.group()}"
+                if name.startswith(BLOCKED_PREFIXES):
+                    return None, f"Blocked: {m.group()}"
+            elif kind == "op":
+                if text == ";":
+                    return None, "Multiple statements detected"
+                if text == "@":
+                    return None, "Database links not allowed"
+                if text == "." and prev is not None and prev[0] in IDENT_KINDS and prev[1].upper() == "SYS":
+                    return None, "Blocked: SYS."
+            prev = (kind, text)
+            tokens.append(prev)
+        return (tokens, literals), None
+
+    # ------------------------------------------------------------
+    # Pass 2: tables, aliases, columns
+    # ------------------------------------------------------------
+    def _structure(self, tokens):
+        n = len(tokens)
+        tables, aliases, ctes = [], {}, set()
+        qualified, bare = [], set()
+        parens = []          # "query" / "expr" per open paren
+        scopes = [{}]        # alias -> table per open query, outermost first
+        from_depths = []     # paren depths with an open FROM list
+        expect_table = False
+
+        def at(j):
+            return tokens[j] if j < n else (None, None)
+
+        i = 0
+        while i < n:
+            kind, val = tokens[i]
+            depth = len(parens)
+
+            if kind == "op":
+                if val == "(":
+                    parens.append("query" if at(i + 1) in (("word", "SELECT"), ("word", "WITH")) else "expr")
+                    if parens[-1] == "query":
+                        scopes.append({})
+                    expect_table = False
+                elif val == ")":
+                    if from_depths and from_depths[-1] == depth:
+                        from_depths.pop()
+                    if parens and parens.pop() == "query":
+                        scopes.pop()
+                elif val == "," and from_depths and from_depths[-1] == depth:
+                    expect_table = True
+                i += 1
+                continue
+
+            if kind not in IDENT_KINDS:
+                i += 1
+                continue
+
+            # CTE: WITH name AS ( ... ), name AS ( ... )
+            if at(i + 1) == ("word", "AS") and at(i + 2) == ("op", "(") and \
+                    i > 0 and tokens[i - 1] in (("word", "WITH"), ("op", ",")):
+                ctes.add(val.lower())
+                i += 2
+                continue
+
+            if kind == "word" and val == "FROM":
+                if depth == 0 or parens[-1] == "query":   # not EXTRACT(YEAR FROM ...)
+                    from_depths.append(depth)
+                    expect_table = True
+                i += 1
+                continue
+            if kind == "word" and val == "JOIN":
+                expect_table = True
+                i += 1
+                continue
+            if kind == "word" and val in FROM_END_WORDS and from_depths and from_depths[-1] == depth:
+                from_depths.pop()
+                expect_table = False
+
+            if expect_table:
+                if at(i + 1) == ("op", "("):      # TABLE(...), LATERAL (...)
+                    expect_table = False
+                    i += 1
+                    continue
+                name, j = val, i + 1
+                if at(j) == ("op", ".") and at(j + 1)[0] in IDENT_KINDS:
+                    name, j = at(j + 1)[1], j + 2
+                table = name.lower()
+                if table not in tables:
+                    tables.append(table)
+                aliases[table] = scopes[-1][table] = table
+                if at(j) == ("word", "AS"):
+                    j += 1
+                nxt = at(j)
+                if nxt[0] == "qident" or (nxt[0] == "word" and nxt[1] not in CLAUSE_WORDS):
+                    aliases[nxt[1].lower()] = scopes[-1][nxt[1].lower()] = table
+                    j += 1
+                expect_table = False
+                i = j
+                continue
+
+            # Column references: alias.column or bare identifiers (not function calls)
+            if at(i + 1) == ("op", "."):
+                col = at(i + 2)
+                if col[0] in IDENT_KINDS or col == ("op", "*"):
+                    if at(i + 3) != ("op", "("):
+                        # The scopes' aliases are complete once the walk ends (FROM follows SELECT)
+                        qualified.append((val.lower(), col[1].lower(), scopes[::-1]))
+                    i += 3
+                    continue
+            if at(i + 1) != ("op", "("):
+                bare.add(val.lower())
+            i += 1
+
+        return tables, aliases, ctes, qualified, bare
+
+    # ------------------------------------------------------------
+    def analyze(self, sql: str) -> SQLAnalysis:
+        if not sql or not sql.strip():
+            return SQLAnalysis(sql, False, "Empty SQL")
+        lexed, reason = self._lex(sql)
+        if lexed is None:
+            return SQLAnalysis(sql, False, reason)
+        tokens, literals = lexed
+        statement = tokens[0][1]
+
+        tables, aliases, ctes, qualified, bare = self._structure(tokens)
+        for table in tables:
+            if table not in self.tables and table not in ctes and table != "dual":
+                return SQLAnalysis(sql, False, f"Unknown table: {table}", statement, tuple(tables),
+                                   aliases, ctes=frozenset(ctes), literals=tuple(literals))
+        schema_tables = [t for t in tables if t in self.tables]
+        if not schema_tables:
+            return SQLAnalysis(sql, False, "No known IBMS table referenced", statement, tuple(tables),
+                               aliases, ctes=frozenset(ctes), literals=tuple(literals))
+
+        columns = set()
+        for qualifier, col, scopes in qualified:
+            table = next((scope[qualifier] for scope in scopes if qualifier in scope), None)
+            if table not in self.tables or col == "*":
+                continue   # CTE / subquery alias, or t.*
+            if col not in self.tables[table]:
+                return SQLAnalysis(sql, False, f"Unknown column: {qualifier}.{col}", statement,
+                                   tuple(tables), aliases, ctes=frozenset(ctes), literals=tuple(literals))
+            columns.add((table, col))
+        for name in bare:
+            for table in schema_tables:
+                if name in self.tables[table]:
+                    columns.add((table, name))
+
+        return SQLAnalysis(sql, True, "OK", statement, tuple(schema_tables), aliases,
+                           frozenset(columns), frozenset(ctes), tuple(literals))
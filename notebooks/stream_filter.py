@@ -0,0 +1,133 @@
+"""
+stream_filter.py
+================
+Incremental cleanup of streamed qwen3 output.
+
+ThinkStreamFilter tracks <think> regions and the leading "A:" prefix as
+chunks arrive, so each token costs O(len(token)) instead of re-running
+clean_qwen3_output over the whole accumulated buffer. RenderThrottle
+limits how often the Streamlit placeholder is redrawn.
+"""
+
+import re
+import time
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+
+def clean_qwen3_output(text_input: str) -> str:
+    text_input = re.sub(r'<think>.*?</think>\s*', '', text_input, flags=re.DOTALL)
+    text_input = re.sub(r'<think>(?:(?!</think>).)*$', '', text_input, flags=re.DOTALL)
+    text_input = re.sub(r'^(A:\s*\n?)+', '', text_input)
+    text_input = re.sub(r'(Okay,.*?(done|ready|complete|wrap it up|finalize|all set)[.\s]*)+$', '', text_input, flags=re.DOTALL)
+    return text_input.strip()
+
+
+def _partial_tag_suffix(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for n in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:n]):
+            return n
+    return 0
+
+
+class ThinkStreamFilter:
+    """State machine: OUTSIDE / INSIDE a <think> block, plus a leading-prefix phase."""
+
+    def __init__(self):
+        self.visible = ""       # cleaned text so far (for live rendering)
+        self._raw = []          # every chunk, for the final one-shot cleanup
+        self._pending = ""      # tail that may be the start of a tag
+        self._in_think = False
+        self._after_close = False   # swallow whitespace after </think>
+        self._at_start = True       # still stripping leading whitespace / "A:"
+        self._pending_prefix = ""   # "A" that may become an "A:" prefix
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; return the newly visible text (may be empty)."""
+        self._raw.append(chunk)
+        buf = self._pending + chunk
+        self._pending = ""
+        out = []
+
+        while buf:
+            if self._in_think:
+                idx = buf.find(CLOSE_TAG)
+                if idx < 0:
+                    keep = _partial_tag_suffix(buf, CLOSE_TAG)
+                    self._pending = buf[len(buf) - keep:] if keep else ""
+                    buf = ""
+                else:
+                    buf = buf[idx + len(CLOSE_TAG):]
+                    self._in_think = False
+                    self._after_close = True
+                continue
+
+            if self._after_close:
+                buf = buf.lstrip()
+                if not buf:
+                    break
+                self._after_close = False
+
+            idx = buf.find(OPEN_TAG)
+            if idx < 0:
+                keep = _partial_tag_suffix(buf, OPEN_TAG)
+                text, self._pending = (buf[:len(buf) - keep], buf[len(buf) - keep:]) if keep else (buf, "")
+                buf = ""
+            else:
+                text, buf = buf[:idx], buf[idx + len(OPEN_TAG):]
+                self._in_think = True
+            out.append(text)
+
+        new_text = "".join(out)
+        if self._at_start:
+            new_text = self._strip_prefix(new_text)
+        self.visible += new_text
+        return new_text
+
+    def _strip_prefix(self, text: str) -> str:
+        # Hold text back until it can no longer be leading whitespace or an "A:" prefix
+        text = self._pending_prefix + text
+        self._pending_prefix = ""
+        while True:
+            text = text.lstrip()
+            if text.startswith("A:"):
+                text = text[2:]
+                continue
+            if text in ("", "A"):
+                self._pending_prefix = text
+                return ""
+            break
+        self._at_start = False
+        return text
+
+    def finish(self) -> str:
+        """Final cleaned text, identical to clean_qwen3_output on the full response."""
+        return clean_qwen3_output("".join(self._raw))
+
+
+class RenderThrottle:
+    """Redraw a placeholder at most every `interval` seconds or every `min_chars` new characters."""
+
+    def __init__(self, placeholder, interval: float = 0.08, min_chars: int = 400):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.min_chars = min_chars
+        self.renders = 0
+        self._last_time = 0.0
+        self._last_len = 0
+
+    def update(self, text: str):
+        now = time.time()
+        if now - self._last_time >= self.interval or len(text) - self._last_len >= self.min_chars:
+            self._render(text, now)
+
+    def flush(self, text: str):
+        self._render(text, time.time())
+
+    def _render(self, text: str, now: float):
+        self.placeholder.markdown(text)
+        self.renders += 1
+        self._last_time = now
+        self._last_len = len(text)
@@ -0,0 +1,162 @@
+"""
+summaries.py
+============
+Precomputed aggregate tables for the most common officer questions.
+
+Each Summary is a plain table (sum_*) rebuilt from its SELECT by
+scripts/refresh_summaries.py. Plain tables rather than materialized views
+because ibms_user only has CONNECT/RESOURCE. The refresh job records when
+each table was rebuilt in Config/.summary_refresh.json. The app:
+
+  - describes the fresh summaries in the SQL prompt so SQL_MODEL reads a
+    few hundred pre-grouped rows instead of grouping the base tables
+  - lets the validator accept them (SUMMARY_COLUMNS)
+  - shows a staleness indicator when an answer came from a summary
+
+A summary is stale when it is older than max_age or older than the last
+data load (Config/.data_version).
+"""
+
+import json
+import time
+from pathlib import Path
+
+
+class Summary:
+    def __init__(self, name, description, columns, sources, sql, indexes=()):
+        self.name = name
+        self.description = description  # one line for the SQL prompt
+        self.columns = columns          # in SELECT order
+        self.sources = sources          # base tables it aggregates
+        self.sql = sql
+        self.indexes = indexes          # column lists to index after a rebuild
+
+
+SUMMARIES = [
+    Summary(
+        "sum_offloading_monthly",
+        "off-loadings per year/month, port, airline and reason (COUNT(*) over offloading_records)",
+        ["offload_year", "offload_month", "port_id", "port_name", "airline", "reason", "offload_count"],
+        ["offloading_records", "ports_of_entry"],
+        """SELECT EXTRACT(YEAR FROM o.offload_date) AS offload_year,
+       EXTRACT(MONTH FROM o.offload_date) AS offload_month,
+       o.port_id, p.port_name, o.airline, o.reason,
+       COUNT(*) AS offload_count
+FROM offloading_records o
+JOIN ports_of_entry p ON p.port_id = o.port_id
+GROUP BY EXTRACT(YEAR FROM o.offload_date), EXTRACT(MONTH FROM o.offload_date),
+         o.port_id, p.port_name, o.airline, o.reason""",
+        indexes=[("port_id",), ("airline",)],
+    ),
+    Summary(
+        "sum_departures_monthly",
+        "outbound departures per year/month, exit port and carrier — denominator for off-loading rates "
+        "(carrier matches sum_offloading_monthly.airline)",
+        ["departure_year", "departure_month", "port_id", "port_name", "carrier", "departure_count"],
+        ["travel_records", "ports_of_entry"],
+        """SELECT EXTRACT(YEAR FROM tr.exit_date) AS departure_year,
+       EXTRACT(MONTH FROM tr.exit_date) AS departure_month,
+       tr.exit_port_id AS port_id, p.port_name, tr.carrier,
+       COUNT(*) AS departure_count
+FROM travel_records tr
+JOIN ports_of_entry p ON p.port_id = tr.exit_port_id
+WHERE tr.travel_direction = 'Outbound'
+GROUP BY EXTRACT(YEAR FROM tr.exit_date), EXTRACT(MONTH FROM tr.exit_date),
+         tr.exit_port_id, p.port_name, tr.carrier""",
+        indexes=[("port_id",), ("carrier",)],
+    ),
+    Summary(
+        "sum_watchlist_counts",
+        "watchlist alerts per alert_type, severity and is_active (1=active)",
+        ["alert_type", "severity", "is_active", "alert_count"],
+        ["watchlist"],
+        """SELECT alert_type, severity, is_active, COUNT(*) AS alert_count
+FROM watchlist
+GROUP BY alert_type, severity, is_active""",
+    ),
+    Summary(
+        "sum_asylum_yearly",
+        "asylum claims per filing year, origin country, claim_basis and status",
+        ["filing_year", "origin_country_id", "country_name", "claim_basis", "status", "claim_count"],
+        ["asylum_claims", "countries"],
+        """SELECT EXTRACT(YEAR FROM ac.filing_date) AS filing_year,
+       ac.origin_country_id, c.country_name, ac.claim_basis, ac.status,
+       COUNT(*) AS claim_count
+FROM asylum_claims ac
+JOIN countries c ON c.country_id = ac.origin_country_id
+GROUP BY EXTRACT(YEAR FROM ac.filing_date), ac.origin_country_id, c.country_name,
+         ac.claim_basis, ac.status""",
+    ),
+    Summary(
+        "sum_traveler_trips_yearly",
+        "trips per traveler per entry year with name and passport — frequent travelers",
+        ["traveler_id", "first_name", "last_name", "passport_number", "nationality_id",
+         "entry_year", "trip_count"],
+        ["travel_records", "travelers"],
+        """SELECT t.traveler_id, t.first_name, t.last_name, t.passport_number, t.nationality_id,
+       EXTRACT(YEAR FROM tr.entry_date) AS entry_year,
+       COUNT(*) AS trip_count
+FROM travel_records tr
+JOIN travelers t ON t.traveler_id = tr.traveler_id
+GROUP BY t.traveler_id, t.first_name, t.last_name, t.passport_number, t.nationality_id,
+         EXTRACT(YEAR FROM tr.entry_date)""",
+        indexes=[("entry_year", "trip_count"), ("traveler_id",)],
+    ),
+]
+
+SUMMARY_COLUMNS = {s.name: s.columns for s in SUMMARIES}
+
+# Written by the refresh job inside Config/
+STATE_FILE_NAME = ".summary_refresh.json"
+
+
+# ============================================================
+# Refresh state / staleness
+# ============================================================
+def load_refresh_state(state_file: Path) -> dict:
+    """{summary: {"refreshed_at": epoch, "rows": n, "seconds": s}}; {} before the first refresh."""
+    try:
+        return json.loads(Path(state_file).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def summary_status(state_file: Path, data_version_file: Path, max_age: float) -> dict:
+    """{summary: (age_seconds or None, is_stale)} for every defined summary."""
+    state = load_refresh_state(state_file)
+    try:
+        data_loaded = Path(data_version_file).stat().st_mtime
+    except OSError:
+        data_loaded = 0.0
+    now = time.time()
+    status = {}
+    for s in SUMMARIES:
+        refreshed = state.get(s.name, {}).get("refreshed_at")
+        if refreshed is None:
+            status[s.name] = (None, True)
+        else:
+            status[s.name] = (now - refreshed, now - refreshed > max_age or refreshed < data_loaded)
+    return status
+
+
+def format_age(seconds) -> str:
+    if seconds is None:
+        return "never refreshed"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min ago"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h ago"
+    return f"{seconds / 86400:.1f} days ago"
+
+
+def prompt_section(names) -> str:
+    """Prompt block advertising the given summaries; "" when there are none."""
+    chosen = [s for s in SUMMARIES if s.name in names]
+    if not chosen:
+        return ""
+    lines = ["=== PRECOMPUTED SUMMARY TABLES (prefer these for counts/rates; far faster than the base tables) ==="]
+    for s in chosen:
+        lines.append(f"TABLE {s.name}: {s.description}")
+        lines.append(f"  COLUMNS: {', '.join(s.columns)}")
+    lines.append("Use a base table only when the question needs a filter or column the summary does not have.")
+    return "\n".join(lines) + "\n\n"
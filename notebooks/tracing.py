@@ -0,0 +1,258 @@
+"""
+tracing.py
+==========
+Per-stage tracing for the pipeline.
+
+Each officer question becomes a Trace made of spans (classify, sql_gen,
+validate, execute, narrate, render, ...) with durations and attributes
+(Ollama token counters, row counts, cache hits). Finished traces are
+
+  - appended to a rolling JSONL log (logs/pipeline_traces.jsonl, rotated by size)
+  - folded into Prometheus-style histograms/counters (prometheus_text())
+  - kept in a bounded in-memory window for the admin summary (summary())
+
+A Tracer is thread-safe and meant to be shared by every session.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Histogram buckets (seconds) — LLM stages run 1-30 s, Oracle stages ms-s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# Span attributes that are summed into counters
+COUNTER_ATTRS = ("prompt_eval_count", "eval_count", "rows")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self.duration = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def to_dict(self):
+        return {"name": self.name, "start": self.start, "duration": self.duration,
+                "status": self.status, "attrs": self.attrs}
+
+
+class Trace:
+    """Spans for one question. Use trace.span(...) as a context manager."""
+
+    def __init__(self, tracer, session_id, question):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.question = question
+        self.start = time.time()
+        self.spans = []
+        self.attrs = {}
+        self._finished = False
+
+    @contextmanager
+    def span(self, name, **attrs):
+        sp = Span(name, attrs)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.status = "error" if isinstance(e, Exception) else "stopped"
+            raise
+        finally:
+            sp.duration = time.time() - sp.start
+            self.spans.append(sp)
+
+    def record(self, name, duration, **attrs):
+        """Add a span measured elsewhere (e.g. a speculative run on another thread)."""
+        sp = Span(name, attrs)
+        sp.duration = duration
+        self.spans.append(sp)
+        return sp
+
+    def set(self, **attrs):
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        self.tracer._export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "question": self.question,
+            "start": self.start,
+            "duration": time.time() - self.start,
+            "attrs": self.attrs,
+            "spans": [sp.to_dict() for sp in self.spans],
+        }
+
+
+class Tracer:
+    def __init__(self, log_path: Path = None, max_bytes: int = 20_000_000, backups: int = 5,
+                 window: int = 1000):
+        self.log_path = Path(log_path) if log_path else None
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._hist = {}        # stage -> [bucket counts..., +Inf count]
+        self._sum = {}         # stage -> total seconds
+        self._count = {}       # stage -> observations
+        self._errors = {}      # stage -> error count
+        self._counters = {}    # (stage, attr) -> total
+        self._cache_hits = {}  # tier -> hits
+        self._requests = 0
+
+    def start_trace(self, session_id, question) -> Trace:
+        return Trace(self, session_id, question)
+
+    # ------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------
+    def _export(self, trace: Trace):
+        record = trace.to_dict()
+        with self._lock:
+            self._requests += 1
+            for sp in trace.spans:
+                self._observe(sp)
+            self.recent.append(record)
+            if self.log_path:
+                self._write_jsonl(record)
+
+    def _observe(self, sp: Span):
+        name = sp.name
+        if name not in self._hist:
+            self._hist[name] = [0] * (len(LATENCY_BUCKETS) + 1)
+            self._sum[name] = 0.0
+            self._count[name] = 0
+            self._errors[name] = 0
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if sp.duration <= bound:
+                self._hist[name][i] += 1
+        self._hist[name][-1] += 1
+        self._sum[name] += sp.duration
+        self._count[name] += 1
+        if sp.status == "error":
+            self._errors[name] += 1
+        for attr in COUNTER_ATTRS:
+            value = sp.attrs.get(attr)
+            if isinstance(value, (int, float)):
+                self._counters[(name, attr)] = self._counters.get((name, attr), 0) + value
+        if sp.attrs.get("cache_hit"):
+            tier = sp.attrs.get("cache_tier", name)
+            self._cache_hits[tier] = self._cache_hits.get(tier, 0) + 1
+
+    def _write_jsonl(self, record):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.log_path.exists() and self.log_path.stat().st_size >= self.max_bytes:
+            for i in range(self.backups - 1, 0, -1):
+                older = self.log_path.with_name(f"{self.log_path.name}.{i}")
+                if older.exists():
+                    older.replace(self.log_path.with_name(f"{self.log_path.name}.{i + 1}"))
+            self.log_path.replace(self.log_path.with_name(f"{self.log_path.name}.1"))
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    # ------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP ibms_requests_total Officer questions processed.",
+            "# TYPE ibms_requests_total counter",
+        ]
+        with self._lock:
+            lines.append(f"ibms_requests_total {self._requests}")
+            lines.append("# HELP ibms_stage_duration_seconds Pipeline stage latency.")
+            lines.append("# TYPE ibms_stage_duration_seconds histogram")
+            for stage, counts in sorted(self._hist.items()):
+                for bound, count in zip(LATENCY_BUCKETS, counts):
+                    lines.append(f'ibms_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'ibms_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {counts[-1]}')
+                lines.append(f'ibms_stage_duration_seconds_sum{{stage="{stage}"}} {self._sum[stage]:.6f}')
+                lines.append(f'ibms_stage_duration_seconds_count{{stage="{stage}"}} {self._count[stage]}')
+            lines.append("# HELP ibms_stage_errors_total Stage failures.")
+            lines.append("# TYPE ibms_stage_errors_total counter")
+            for stage, count in sorted(self._errors.items()):
+                lines.append(f'ibms_stage_errors_total{{stage="{stage}"}} {count}')
+            lines.append("# HELP ibms_stage_units_total Tokens and rows processed per stage.")
+            lines.append("# TYPE ibms_stage_units_total counter")
+            for (stage, attr), total in sorted(self._counters.items()):
+                lines.append(f'ibms_stage_units_total{{stage="{stage}",unit="{attr}"}} {total}')
+            lines.append("# HELP ibms_cache_hits_total Answer cache hits per tier.")
+            lines.append("# TYPE ibms_cache_hits_total counter")
+            for tier, count in sorted(self._cache_hits.items()):
+                lines.append(f'ibms_cache_hits_total{{tier="{tier}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list:
+        """Per-stage rows over the in-memory window: count, p50, p95, max, errors."""
+        with self._lock:
+            records = list(self.recent)
+        durations, errors = {}, {}
+        for record in records:
+            for sp in record["spans"]:
+                durations.setdefault(sp["name"], []).append(sp["duration"])
+                if sp["status"] == "error":
+                    errors[sp["name"]] = errors.get(sp["name"], 0) + 1
+        return [
+            {
+                "stage": stage,
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+                "errors": errors.get(stage, 0),
+            }
+            for stage, values in durations.items()
+        ]
+
+
+# ============================================================
+# /metrics endpoint
+# ============================================================
+def start_metrics_server(tracer: Tracer, port: int, host: str = "127.0.0.1"):
+    """Serve tracer.prometheus_text() at http://host:port/metrics on a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = tracer.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="metrics").start()
+    return httpd
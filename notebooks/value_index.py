@@ -0,0 +1,255 @@
+"""
+value_index.py
+==============
+Exact column values for the literals in a question. Config/sample_values.json
+holds at most 25 values per column (24 of 50 countries, no "Pakistan";
+no Torkham or Wagah among the ports) and only some columns, so a question
+about a missing value got SQL with a guessed literal ('Torkham Border')
+and zero rows.
+
+The refresh job (scripts/refresh_value_index.py) extracts the full
+distinct values of the categorical columns into Config/.value_index.json.
+Only tables that changed since the last run are re-read. ValueIndex holds
+them in process:
+
+  - a word index: word -> values containing it, each word weighted by
+    how rare it is in its column ("torkham" decides, "border" barely)
+  - a character trigram index over those words for misspellings
+    ("Islamabd" -> islamabad)
+
+resolve() scores every value by the weighted share of its words found in
+the question. "Islamabad airport" -> 'Islamabad International Airport',
+"Wagah" -> 'Wagah Border Crossing' (and the city 'Wagah'). Short codes
+(ISB, AFG) and abbreviations in parentheses ("NAB" -> 'National
+Accountability Bureau (NAB)') must appear upper-case. It takes well
+under a millisecond, so it runs on every question. The SQL prompt lists only the matched values
+of long columns; short enumerations (status, severity, ...) stay whole.
+
+Without a snapshot the index is built from Config/sample_values.json.
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+
+SNAPSHOT_NAME = ".value_index.json"     # inside Config/, written by the refresh job
+
+MAX_DISTINCT = 5000     # a column with more distinct values is not categorical and is not indexed
+ENUM_SIZE = 12          # columns up to this many values are listed whole in the prompt
+MIN_COVERAGE = 0.6      # weighted share of a value's words the question must contain
+MIN_SIMILARITY = 0.7    # trigram Dice coefficient for a misspelled word
+MAX_PER_COLUMN = 5
+
+# Categorical columns beyond those in Config/sample_values.json
+EXTRA_COLUMNS = {
+    "asylum_claims":      ["assigned_officer"],
+    "audit_log":          ["officer_name"],
+    "countries":          ["sub_region", "income_group"],
+    "detention_records":  ["facility_name", "reason"],
+    "ecl_entries":        ["issuing_authority"],
+    "illegal_crossings":  ["location_name"],
+    "offloading_records": ["airline"],
+    "sponsors":           ["sponsor_type", "sponsor_name", "city", "industry"],
+    "travelers":          ["occupation"],
+    "visa_applications":  ["denial_reason", "processing_office"],
+    "watchlist":          ["issued_by"],
+}
+
+# Question words that never identify a value
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "for", "to", "from", "by", "with", "and", "or", "is", "are", "was",
+    "were", "how", "many", "what", "which", "who", "show", "list", "all", "me", "per", "top", "most", "total",
+    "number", "count", "this", "that", "year", "month", "there", "have", "has", "their", "any",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CODE_RE = re.compile(r"\b[A-Z][A-Z0-9]{1,4}\b")
+_ABBREVIATION_RE = re.compile(r"\(([A-Z]{2,5})\)")
+
+
+def _words(text: str) -> list:
+    """Lower-case words, a plural "s" dropped ("airlines" and "airline" index alike)."""
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+            for w in _WORD_RE.findall(str(text).lower())]
+
+
+def _trigrams(word: str) -> set:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_code(value: str) -> bool:
+    return len(value) <= 4 and value.isupper() and value.isalnum()
+
+
+def value_columns(sample_values: dict, tables: dict) -> dict:
+    """{table: [column]} to index: sample_values' columns plus EXTRA_COLUMNS, where the schema has them."""
+    columns = {}
+    for source in (sample_values, EXTRA_COLUMNS):
+        for table, cols in source.items():
+            for col in cols:
+                if col in tables.get(table, ()) and col not in columns.get(table, []):
+                    columns.setdefault(table, []).append(col)
+    return columns
+
+
+class ValueMatch:
+    def __init__(self, table: str, column: str, value: str, score: float):
+        self.table = table
+        self.column = column
+        self.value = value
+        self.score = score      # weighted share of the value's words in the question (1.0 = all)
+
+    def __repr__(self):
+        return f"ValueMatch({self.table}.{self.column} = {self.value!r}, {self.score:.2f})"
+
+
+class ValueIndex:
+    """Word + trigram index over {table: {column: [values]}}; build once per snapshot."""
+
+    def __init__(self, values: dict, refreshed_at: float = None):
+        self.values = values                # {table: {column: [values]}}
+        self.refreshed_at = refreshed_at    # None = built from sample_values.json
+        self._entries = []                  # (table, column, value, {word: weight}, total weight)
+        self._postings = {}                 # word -> [entry]
+        self._codes = {}                    # "ISB" -> [entry]
+        self._grams = {}                    # trigram -> {word}
+        for table, cols in values.items():
+            for col, col_values in cols.items():
+                self._add_column(table, col, col_values)
+        for word in self._postings:
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, set()).add(word)
+
+    def _add_column(self, table, col, col_values):
+        tokenized = []
+        df = {}
+        for value in col_values:
+            value = str(value)
+            if _is_code(value):
+                if len(value) > 1:
+                    self._codes.setdefault(value, []).append(len(self._entries))
+                    self._entries.append((table, col, value, {}, 0.0))
+                continue
+            words = set(_words(value)) - STOPWORDS
+            tokenized.append((value, words))
+            for w in words:
+                df[w] = df.get(w, 0) + 1
+        for value, words in tokenized:
+            if not words:
+                continue
+            # Rare in its column -> decides the match; present in most values ("airport") -> barely counts
+            weights = {w: math.log(1 + len(tokenized) / df[w]) for w in words}
+            entry = len(self._entries)
+            self._entries.append((table, col, value, weights, sum(weights.values())))
+            for code in _ABBREVIATION_RE.findall(value):
+                self._codes.setdefault(code, []).append(entry)
+            for w in words:
+                self._postings.setdefault(w, []).append(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _similar(self, word: str) -> list:
+        """[(indexed word, similarity)] for a word the index does not contain."""
+        grams = _trigrams(word)
+        shared = {}
+        for gram in grams:
+            for other in self._grams.get(gram, ()):
+                shared[other] = shared.get(other, 0) + 1
+        similar = []
+        for other, n in shared.items():
+            dice = 2 * n / (len(grams) + len(other))
+            if dice >= MIN_SIMILARITY:
+                similar.append((other, dice))
+        return similar
+
+    def resolve(self, question: str) -> list:
+        """[ValueMatch] for the values the question names, best first, at most MAX_PER_COLUMN per column."""
+        found = {}      # entry -> {word: similarity}
+        for word in set(_words(question)) - STOPWORDS:
+            if word in self._postings:
+                candidates = [(word, 1.0)]
+            elif len(word) >= 5 and not word.isdigit():
+                candidates = self._similar(word)
+            else:
+                continue
+            for indexed, similarity in candidates:
+                for entry in self._postings[indexed]:
+                    seen = found.setdefault(entry, {})
+                    seen[indexed] = max(seen.get(indexed, 0.0), similarity)
+        matches = []
+        for entry, seen in found.items():
+            table, col, value, weights, total = self._entries[entry]
+            score = sum(weights[w] * s for w, s in seen.items()) / total
+            if score >= MIN_COVERAGE:
+                matches.append(ValueMatch(table, col, value, score))
+        for code in set(_CODE_RE.findall(question)):
+            for entry in self._codes.get(code, ()):
+                table, col, value = self._entries[entry][:3]
+                matches.append(ValueMatch(table, col, value, 1.0))
+
+        matches.sort(key=lambda m: (-m.score, m.table, m.column, m.value))
+        per_column = {}
+        kept = []
+        for m in matches:
+            key = (m.table, m.column)
+            if per_column.get(key, 0) < MAX_PER_COLUMN:
+                per_column[key] = per_column.get(key, 0) + 1
+                kept.append(m)
+        return kept
+
+    def prompt_values(self, tables: list, matches: list) -> dict:
+        """{table: {column: [values]}} for the prompt: short columns whole, long ones only their matches."""
+        matched = {}
+        for m in matches:
+            matched.setdefault((m.table, m.column), []).append(m.value)
+        values = {}
+        for table in tables:
+            for col, col_values in self.values.get(table, {}).items():
+                if len(col_values) <= ENUM_SIZE:
+                    values.setdefault(table, {})[col] = col_values
+                elif (table, col) in matched:
+                    values.setdefault(table, {})[col] = sorted(matched[(table, col)])
+        return values
+
+    def values_section(self, matches: list) -> str:
+        """Prompt section naming the exact values of long columns a question refers to (for the full,
+        unpruned prompt, whose static lists already hold the short columns)."""
+        lines = {}
+        for m in matches:
+            if len(self.values.get(m.table, {}).get(m.column, ())) > ENUM_SIZE:
+                lines.setdefault(f"{m.table}.{m.column}", []).append(m.value)
+        if not lines:
+            return ""
+        return "=== VALUES IN THIS QUESTION (use these exact literals) ===\n" + "\n".join(
+            f"{column}: {sorted(values)}" for column, values in lines.items())
+
+
+# ============================================================
+# Snapshot
+# ============================================================
+def load_snapshot(path: Path) -> dict:
+    """{"refreshed_at": epoch, "tables": {table: {"signature", "refreshed_at", "columns", "skipped"}}}; {} if none."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def snapshot_version(path: Path):
+    """mtime of the snapshot (None if absent); changes whenever the refresh job rewrites it."""
+    try:
+        return Path(path).stat().st_mtime
+    except OSError:
+        return None
+
+
+def load_value_index(path: Path, sample_values: dict) -> ValueIndex:
+    """Index over the snapshot's columns; columns it lacks keep their sample_values.json lists."""
+    snapshot = load_snapshot(path)
+    values = {table: dict(cols) for table, cols in sample_values.items()}
+    for table, entry in snapshot.get("tables", {}).items():
+        values.setdefault(table, {}).update(entry.get("columns", {}))
+    return ValueIndex(values, snapshot.get("refreshed_at"))
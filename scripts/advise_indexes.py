@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+advise_indexes.py
+=================
+Proposes (and optionally creates) indexes for the SQL the chatbot has
+actually run, using notebooks/index_advisor.py on the execute spans of
+logs/pipeline_traces.jsonl.
+
+Without a database the existing indexes are read from
+scripts/oracle_schema.sql; with --db they come from USER_IND_COLUMNS.
+
+--benchmark replays the most expensive logged queries before and after
+creating the proposed indexes and reports the median time per query.
+Without --apply the new indexes are dropped again afterwards (trial run).
+
+Usage:
+    python scripts/advise_indexes.py                          # offline report
+    python scripts/advise_indexes.py --db --output reports/indexes.sql
+    python scripts/advise_indexes.py --db --benchmark --top 5 # trial: create, measure, drop
+    python scripts/advise_indexes.py --db --benchmark --apply # keep the indexes
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PROJECT_ROOT / "Config"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from index_advisor import (  # noqa: E402
+    load_workload, recommend, existing_indexes_from_ddl, existing_indexes_from_db,
+)
+from schema_linker import load_schema  # noqa: E402
+from sql_validator import SQLValidator  # noqa: E402
+from summaries import SUMMARY_COLUMNS  # noqa: E402
+
+TRACE_LOG = PROJECT_ROOT / "logs" / "pipeline_traces.jsonl"
+SCHEMA_SQL = PROJECT_ROOT / "scripts" / "oracle_schema.sql"
+REPLAY_ROWS = 501              # what the app fetches (MAX_RESULT_ROWS + 1)
+REPLAY_CALL_TIMEOUT_MS = 120_000
+
+
+def time_query(conn, sql, repeat):
+    """Median seconds over `repeat` runs after one warm-up run."""
+    cursor = conn.cursor()
+    times = []
+    for i in range(repeat + 1):
+        t0 = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchmany(REPLAY_ROWS)
+        if i:
+            times.append(time.perf_counter() - t0)
+    cursor.close()
+    return statistics.median(times)
+
+
+def replay(conn, queries, repeat):
+    results = {}
+    for sql in queries:
+        try:
+            results[sql] = time_query(conn, sql, repeat)
+        except Exception as e:
+            print(f"  ✗ replay failed: {str(e)[:80]}")
+            results[sql] = None
+    return results
+
+
+def create_indexes(conn, candidates):
+    created = []
+    cursor = conn.cursor()
+    for cand in candidates:
+        t0 = time.time()
+        try:
+            cursor.execute(cand.ddl)
+        except Exception as e:
+            print(f"  ✗ {cand.name}: {str(e)[:80]}")
+            continue
+        created.append(cand)
+        print(f"  ✓ {cand.ddl}  ({time.time() - t0:.1f}s)")
+    cursor.close()
+    return created
+
+
+def drop_indexes(conn, candidates):
+    cursor = conn.cursor()
+    for cand in candidates:
+        cursor.execute(f"DROP INDEX {cand.name}")
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, default=TRACE_LOG, help="Trace log (rotated backups are read too)")
+    parser.add_argument("--corpus", type=Path,
+                        help="Extra JSON list of SQL strings or {sql} objects, weighted 1 s each")
+    parser.add_argument("--top", type=int, default=10, help="Indexes to propose")
+    parser.add_argument("--min-seconds", type=float, default=0.0, help="Skip candidates below this Oracle time")
+    parser.add_argument("--output", type=Path, help="Write the proposed DDL to this .sql file")
+    parser.add_argument("--db", action="store_true", help="Connect to Oracle for the existing indexes")
+    parser.add_argument("--apply", action="store_true", help="Create the proposed indexes (implies --db)")
+    parser.add_argument("--benchmark", action="store_true", help="Replay queries before/after (implies --db)")
+    parser.add_argument("--replay", type=int, default=20, help="Most expensive queries to replay")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query and phase")
+    args = parser.parse_args()
+    use_db = args.db or args.apply or args.benchmark
+
+    workload = load_workload(args.log)
+    if args.corpus:
+        for item in json.loads(args.corpus.read_text()):
+            sql = item["sql"] if isinstance(item, dict) else item
+            entry = workload.setdefault(sql, [0.0, 0])
+            entry[0] += 1.0
+            entry[1] += 1
+    if not workload:
+        print(f"No executed SQL found in {args.log}; run the app for a while or pass --corpus.")
+        return
+
+    validator = SQLValidator({**load_schema(CONFIG_DIR).tables, **SUMMARY_COLUMNS})
+    conn = None
+    if use_db:
+        from refresh_summaries import get_connection
+        conn = get_connection()
+        conn.call_timeout = REPLAY_CALL_TIMEOUT_MS
+        existing = existing_indexes_from_db(conn)
+        if not (args.apply or args.benchmark):
+            conn.close()
+    else:
+        existing = existing_indexes_from_ddl(SCHEMA_SQL.read_text())
+
+    total = sum(s for s, _ in workload.values())
+    print("=" * 60)
+    print(f"Index advisor — {len(workload)} distinct queries, "
+          f"{sum(n for _, n in workload.values())} executions, {total:.1f}s in Oracle")
+    print("=" * 60)
+    candidates = [c for c in recommend(workload, validator, existing) if c.seconds >= args.min_seconds][:args.top]
+    if not candidates:
+        print("  Existing indexes already cover the logged access patterns.")
+        if args.apply or args.benchmark:
+            conn.close()
+        return
+    for cand in candidates:
+        share = cand.seconds / total if total else 0.0
+        print(f"  {cand.seconds:8.1f}s {share:5.0%} {cand.queries:5d}q  {cand.table}({', '.join(cand.columns)})"
+              f"  — {', '.join(sorted(cand.reasons))}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text("".join(f"{c.ddl};\n" for c in candidates))
+        print(f"\n  DDL written to {args.output}")
+
+    if not (args.apply or args.benchmark):
+        return
+
+    queries = [sql for sql, _ in sorted(workload.items(), key=lambda kv: -kv[1][0])[:args.replay]]
+    try:
+        if args.benchmark:
+            print(f"\nReplaying {len(queries)} queries (median of {args.repeat}) before indexing...")
+            before = replay(conn, queries, args.repeat)
+        print("\nCreating indexes...")
+        created = create_indexes(conn, candidates)
+        if args.benchmark:
+            print("\nReplaying after indexing...")
+            after = replay(conn, queries, args.repeat)
+            print(f"\n  {'before':>9s} {'after':>9s} {'speedup':>8s}  query")
+            sum_before = sum_after = 0.0
+            for sql in queries:
+                b, a = before[sql], after[sql]
+                if b is None or a is None:
+                    continue
+                sum_before += b
+                sum_after += a
+                print(f"  {b:8.3f}s {a:8.3f}s {b / a if a else 0:7.1f}x  {' '.join(sql.split())[:60]}")
+            if sum_after:
+                print(f"\n  Total: {sum_before:.2f}s -> {sum_after:.2f}s ({sum_before / sum_after:.1f}x)")
+            if not args.apply:
+                drop_indexes(conn, created)
+                print("  Trial indexes dropped (re-run with --apply to keep them).")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+benchmark_db_router.py
+======================
+Exercises notebooks/db_router.py against local SQLite stand-ins built
+from data/raw (no Oracle needed):
+
+  routing    --threads workers run --queries aggregate queries on one
+             database, then on two replicas where the second answers
+             --slow-ms later (a busier or more distant host); reports
+             throughput and how least-loaded routing spread the work
+  failover   the first replica's file disappears mid-run and its pooled
+             sessions are dropped (an instance going down); queries fail
+             over to the second, the first is marked down and the health
+             check brings it back once the file returns
+
+Every replica runs a session_sql PRAGMA once per new connection, the
+stand-in for Oracle's ALTER SESSION statements.
+
+Usage:
+    python scripts/benchmark_db_router.py
+    python scripts/benchmark_db_router.py --threads 32 --queries 1000 --slow-ms 40
+"""
+
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "raw"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import percentile  # noqa: E402
+from db_router import Replica, ReplicaRouter  # noqa: E402
+
+SESSION_SQL = ["PRAGMA cache_size = -16000"]
+POOL_SIZE, MAX_OVERFLOW = 4, 2
+
+
+def build_database(path: Path) -> list:
+    """Every data/raw CSV as a table; returns the benchmark queries."""
+    queries = []
+    with sqlite3.connect(path) as con:
+        for csv_path in sorted(DATA_DIR.glob("*.csv")):
+            df = pd.read_csv(csv_path)
+            df.to_sql(csv_path.stem, con, index=False)
+            queries.append(f"SELECT COUNT(*) FROM {csv_path.stem}")
+            text_columns = [c for c in df.columns if df[c].dtype == object]
+            if text_columns:
+                queries.append(f"SELECT {text_columns[0]}, COUNT(*) FROM {csv_path.stem} "
+                               f"GROUP BY {text_columns[0]} ORDER BY 2 DESC LIMIT 10")
+    return queries
+
+
+def replica(name: str, path: Path) -> Replica:
+    # mode=rw: a missing file is a connection error instead of a new empty database
+    return Replica(name, f"sqlite:///file:{path}?mode=rw&uri=true", pool_size=POOL_SIZE,
+                   max_overflow=MAX_OVERFLOW, pool_timeout=5, session_sql=SESSION_SQL)
+
+
+def run_load(router, queries, n, threads, delays, on_progress=None):
+    """n queries through router.run; returns (wall seconds, latencies, errors)."""
+    latencies, errors = [], []
+    done = [0]
+    lock = threading.Lock()
+
+    def query(i):
+        def fn(conn, chosen):
+            rows = conn.execute(text(queries[i % len(queries)])).fetchall()
+            time.sleep(delays.get(chosen.name, 0.0))
+            return rows
+
+        t0 = time.perf_counter()
+        try:
+            router.run(fn)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            with lock:
+                errors.append(str(e)[:120])
+        with lock:
+            done[0] += 1
+            if on_progress:
+                on_progress(done[0])
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(query, range(n)))
+    return time.perf_counter() - t0, latencies, errors
+
+
+def report(label, wall, latencies, errors, n):
+    print(f"  {label:28s} {n / wall:>8.0f} q/s   p50 {1000 * percentile(latencies, 50):>6.1f} ms   "
+          f"p95 {1000 * percentile(latencies, 95):>6.1f} ms   errors {len(errors)}")
+
+
+def print_status(router):
+    for db in router.status():
+        print(f"    {db['name']:10s} {'up' if db['healthy'] else 'DOWN':4s} served {db['served']:>5}  "
+              f"failovers {db['failovers']:>3}  errors {db['errors']:>3}  latency {db['latency_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=600)
+    parser.add_argument("--base-ms", type=float, default=10.0, help="Simulated round-trip of every replica")
+    parser.add_argument("--slow-ms", type=float, default=15.0, help="Extra latency of the second replica")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="ibms_router_"))
+    try:
+        path_a, path_b = tmp / "replica_a.db", tmp / "replica_b.db"
+        queries = build_database(path_a)
+        shutil.copy(path_a, path_b)
+        delays = {"a": args.base_ms / 1000, "b": (args.base_ms + args.slow_ms) / 1000}
+
+        print("=" * 60)
+        print(f"DB router — SQLite stand-ins, {args.threads} threads, {args.queries} queries, "
+              f"pool {POOL_SIZE}+{MAX_OVERFLOW} per replica")
+        print("=" * 60)
+
+        print("\n  Routing")
+        single = ReplicaRouter([replica("a", path_a)], health_sql="SELECT 1")
+        wall, latencies, errors = run_load(single, queries, args.queries, args.threads, delays)
+        report("one database", wall, latencies, errors, args.queries)
+        single.close()
+
+        router = ReplicaRouter([replica("a", path_a), replica("b", path_b)], health_sql="SELECT 1")
+        wall, latencies, errors = run_load(router, queries, args.queries, args.threads, delays)
+        report(f"two replicas (b +{args.slow_ms:.0f} ms)", wall, latencies, errors, args.queries)
+        print_status(router)
+        router.close()
+
+        print("\n  Failover (replica a goes away at 1/3 of the run, returns at 2/3)")
+        router = ReplicaRouter([replica("a", path_a), replica("b", path_b)], health_sql="SELECT 1",
+                               retry_seconds=0.2)
+        offline = tmp / "replica_a.offline"
+
+        def on_progress(done):
+            if done == args.queries // 3:
+                path_a.rename(offline)
+                router.replicas[0].dispose()
+            elif done == 2 * args.queries // 3:
+                offline.rename(path_a)
+
+        wall, latencies, errors = run_load(router, queries, args.queries, args.threads, delays, on_progress)
+        report("two replicas, a fails", wall, latencies, errors, args.queries)
+        deadline = time.time() + 5
+        while not router.replicas[0].healthy and time.time() < deadline:
+            time.sleep(0.05)
+        print_status(router)
+        print(f"    replica a back after restore: {router.replicas[0].healthy}")
+        if errors:
+            print(f"    first error: {errors[0]}")
+        router.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+benchmark_entity_lookup.py
+==========================
+Checks and times the entity lookup fast path (notebooks/entity_lookup.py):
+
+  offline        identifier detection on pasted identifiers and on
+                 questions that must stay NL2SQL, detection time
+  --db oracle    on the Oracle instance:
+                   - EXPLAIN PLAN of every dossier section per identifier
+                     kind; full scans of the big tables are flagged
+                   - --lookups sampled passports, CNICs and traveler ids,
+                     each dossier run sequentially and in parallel on
+                     pipeline.get_lookup_executor(); p50 / p95 per mode
+                 --create-indexes first creates the CREATE INDEX
+                 statements of scripts/oracle_schema.sql that the
+                 database does not have yet (existing schemas predate
+                 idx_watchlist_passport, idx_document_number,
+                 idx_ecl_traveler).
+
+The DuckDB stand-in is not used: data/raw has no travelers,
+document_registry or travel_records CSVs.
+
+Usage:
+    python scripts/benchmark_entity_lookup.py
+    python scripts/benchmark_entity_lookup.py --db oracle --create-indexes --lookups 50
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_SQL = PROJECT_ROOT / "scripts" / "oracle_schema.sql"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import percentile  # noqa: E402
+from entity_lookup import Identifier, detect_identifier, section_queries  # noqa: E402
+
+# (message, expected kind or None = must stay an NL2SQL question)
+MESSAGES = [
+    ("AFG56759493", "passport"),
+    ("check passport afg56759493", "passport"),
+    ("who is AB1234567?", "passport"),
+    ("passport AFG56759493 travel history", "passport"),
+    ("CNIC 35202-1234567-1", "cnic"),
+    ("3520212345671", "cnic"),
+    ("details for 35202-1234567-1 please", "cnic"),
+    ("traveler id 4711", "traveler_id"),
+    ("Show me the profile of traveler #12", "traveler_id"),
+    ("How many trips did AFG56759493 make in 2025?", None),
+    ("AFG56759493 and PAK12345678", None),
+    ("Top 10 most frequent travelers this year", None),
+    ("12345", None),
+    ("List all off-loaded passengers at Islamabad Airport in 2025", None),
+]
+BIG_TABLES = {"TRAVELERS", "DOCUMENT_REGISTRY", "TRAVEL_RECORDS", "WATCHLIST", "ECL_ENTRIES", "OFFLOADING_RECORDS",
+              "RISK_PROFILES"}
+SAMPLE_SQL = {
+    "passport": "SELECT passport_number FROM travelers SAMPLE (1) FETCH FIRST :n ROWS ONLY",
+    "cnic": "SELECT document_number FROM document_registry WHERE document_type = 'CNIC' FETCH FIRST :n ROWS ONLY",
+    "traveler_id": "SELECT traveler_id FROM travelers SAMPLE (1) FETCH FIRST :n ROWS ONLY",
+}
+
+
+def check_detection():
+    wrong = []
+    t0 = time.perf_counter()
+    for message, expected in MESSAGES:
+        found = detect_identifier(message)
+        if (found.kind if found else None) != expected:
+            wrong.append((message, expected, found))
+    us = 1e6 * (time.perf_counter() - t0) / len(MESSAGES)
+    print(f"  Detection: {len(MESSAGES) - len(wrong)}/{len(MESSAGES)} as expected, {us:.0f} µs per message")
+    for message, expected, found in wrong:
+        print(f"    ✗ {message!r}: expected {expected}, got {found}")
+
+
+def create_indexes(conn):
+    """Run the schema's CREATE INDEX statements; already existing ones are skipped."""
+    created = 0
+    cursor = conn.cursor()
+    for statement in re.findall(r"^CREATE INDEX [^;]+", SCHEMA_SQL.read_text(), flags=re.MULTILINE):
+        try:
+            cursor.execute(statement)
+            created += 1
+            print(f"    + {statement}")
+        except Exception as e:
+            if "ORA-00955" not in str(e) and "ORA-01408" not in str(e):     # name used / column list indexed
+                print(f"    ✗ {statement}: {str(e)[:120]}")
+    print(f"  Indexes: {created} created")
+
+
+def sample_identifiers(conn, n):
+    cursor = conn.cursor()
+    samples = []
+    for kind, sql in SAMPLE_SQL.items():
+        cursor.execute(sql, n=n)
+        for (value,) in cursor.fetchall():
+            samples.append(Identifier(kind, str(value), [str(value)]))
+    return samples
+
+
+def explain_sections(conn, samples):
+    from cost_guard import explain_plan
+
+    seen = set()
+    print(f"\n  {'kind':12s} {'section':11s} {'cost':>8}  full scans")
+    for identifier in samples:
+        if identifier.kind in seen:
+            continue
+        seen.add(identifier.kind)
+        for name, sql, _ in section_queries(identifier):
+            plan = explain_plan(conn, sql)
+            scans = [t for t in plan.full_scans() if t in BIG_TABLES]
+            print(f"  {identifier.kind:12s} {name:11s} {plan.cost:>8}  {', '.join(scans) or '-'}"
+                  f"{'  ⚠' if scans else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", choices=("none", "oracle"), default="none")
+    parser.add_argument("--lookups", type=int, default=20, help="Sampled identifiers per kind")
+    parser.add_argument("--create-indexes", action="store_true")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Entity lookup")
+    print("=" * 60)
+    check_detection()
+    if args.db != "oracle":
+        return
+
+    import pipeline
+    from entity_lookup import run_dossier
+
+    with pipeline.get_engine().connect() as sa_conn:
+        conn = sa_conn.connection.driver_connection
+        if args.create_indexes:
+            create_indexes(conn)
+        samples = sample_identifiers(conn, args.lookups)
+        explain_sections(conn, samples)
+
+    print(f"\n  {len(samples)} dossiers ({len(section_queries(samples[0]))} sections each)")
+    executor = pipeline.get_lookup_executor()
+    for label, pool in (("sequential", None), ("parallel", executor)):
+        times, found, errors = [], 0, 0
+        for identifier in samples:
+            dossier = run_dossier(identifier, pipeline.query_dataframe, pool, pipeline.LOOKUP_SECTION_ROWS)
+            times.append(1000 * dossier.seconds)
+            found += dossier.found
+            errors += len(dossier.errors)
+        print(f"  {label:11s} p50 {percentile(times, 50):>7.1f} ms   p95 {percentile(times, 95):>7.1f} ms   "
+              f"found {found}/{len(samples)}   failed sections {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+benchmark_few_shot.py
+=====================
+Measures the few-shot example store (notebooks/few_shot.py):
+
+  latency    search time (p50/p95) for stores of 5 .. 5,000 examples
+  relevance  leave-one-out over the question set: how often a retrieved
+             example shares a table with the question's reference SQL, and
+             how many prompt characters the examples add
+  accuracy   with --llm ollama: SQL_MODEL generates every question with and
+             without examples (leave-one-out), both run on --db and are
+             compared with the reference SQL's rows; also reports the
+             generation latency of each variant
+
+Usage:
+    python scripts/benchmark_few_shot.py                          # offline: latency + relevance
+    python scripts/benchmark_few_shot.py --llm ollama --db duckdb
+    python scripts/benchmark_few_shot.py --questions my_set.json --k 3
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import DEFAULT_QUESTIONS, DuckDBBackend, OracleBackend, result_signature, percentile  # noqa: E402
+from few_shot import ExampleStore  # noqa: E402
+
+STORE_SIZES = (5, 50, 500, 5000)
+SEARCHES = 200
+WORDS = ("how many travelers airlines off-loaded watchlist alerts active asylum claims ports airport "
+         "Islamabad Karachi Lahore 2025 month top most frequent compare rates departures arrivals "
+         "removal orders detention records by country nationality").split()
+
+
+def synthetic_store(n, seed=3):
+    rng = random.Random(seed)
+    store = ExampleStore(capacity=n)
+    for i in range(n):
+        question = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 12))) + f" #{i}"
+        store.add(question, f"SELECT COUNT(*) FROM travelers -- {i}", ("travelers",))
+    return store
+
+
+def bench_latency(k):
+    print(f"\n  {'examples':>9} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    rng = random.Random(5)
+    for size in STORE_SIZES:
+        store = synthetic_store(size)
+        times = []
+        for _ in range(SEARCHES):
+            question = " ".join(rng.choice(WORDS) for _ in range(8))
+            t0 = time.perf_counter()
+            store.search(question, k)
+            times.append((time.perf_counter() - t0) * 1000)
+        print(f"  {len(store):>9,} {percentile(times, 50):>9.3f} {percentile(times, 95):>9.3f}")
+
+
+def prompt_chars(messages):
+    return sum(len(m["content"]) for m in messages)
+
+
+def loo_store(pipeline, items, exclude):
+    """Store with every question of the set but `exclude` (no log file)."""
+    store = ExampleStore(capacity=len(items))
+    for item in items:
+        if item is not exclude and item.get("sql"):
+            store.add(item["question"], item["sql"], pipeline.analyze_sql(item["sql"]).tables)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS,
+                        help="JSON list of {question, sql} (sql = reference)")
+    parser.add_argument("--k", type=int, default=3, help="Examples per prompt")
+    parser.add_argument("--llm", choices=("none", "ollama"), default="none")
+    parser.add_argument("--db", choices=("oracle", "duckdb"), default="duckdb")
+    parser.add_argument("--output", type=Path, help="Write per-question results as JSON")
+    args = parser.parse_args()
+
+    import pipeline
+    pipeline.FEW_SHOT_K = args.k
+    items = [i for i in json.loads(args.questions.read_text()) if i.get("sql")]
+
+    print("=" * 60)
+    print(f"Few-shot examples — {len(items)} questions, k={args.k}")
+    print("=" * 60)
+    bench_latency(args.k)
+
+    backend = None
+    if args.llm == "ollama":
+        backend = DuckDBBackend(pipeline) if args.db == "duckdb" else OracleBackend(pipeline)
+
+    rows = []
+    for item in items:
+        store = loo_store(pipeline, items, item)
+        pipeline.get_example_store = lambda: store
+        ref_tables = set(pipeline.analyze_sql(item["sql"]).tables)
+        with_prompt = pipeline.sql_messages(item["question"])
+        pipeline.FEW_SHOT_K = 0
+        without_prompt = pipeline.sql_messages(item["question"])
+        pipeline.FEW_SHOT_K = args.k
+        found = store.search(item["question"], args.k)
+        row = {
+            "question": item["question"],
+            "examples": [e.question for e, _ in found],
+            "relevant": any(set(e.tables) & ref_tables for e, _ in found),
+            "added_chars": prompt_chars(with_prompt) - prompt_chars(without_prompt),
+        }
+        if backend:
+            ref_ok, ref_df, _, _ = backend.execute(item["sql"])
+            for name, prompt in (("without", without_prompt), ("with", with_prompt)):
+                _, sql, gen_time = pipeline.generate_sql(item["question"], messages=prompt)
+                ok, df, _, _ = backend.execute(sql)
+                row[name] = {"sql": sql, "gen_time": gen_time,
+                             "match": bool(ok and ref_ok and result_signature(df) == result_signature(ref_df))}
+        rows.append(row)
+
+    print(f"\n  Leave-one-out relevance: {sum(r['relevant'] for r in rows)}/{len(rows)} questions got an "
+          f"example sharing a table with the reference SQL")
+    print(f"  Prompt growth: {statistics.mean(r['added_chars'] for r in rows):.0f} chars/question on average")
+    if backend:
+        for name in ("without", "with"):
+            matches = sum(r[name]["match"] for r in rows)
+            gen = [r[name]["gen_time"] for r in rows]
+            print(f"  {name:>7} examples: accuracy {matches}/{len(rows)}, "
+                  f"SQL gen p50 {percentile(gen, 50):.2f}s p95 {percentile(gen, 95):.2f}s")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(rows, indent=2, default=str))
+        print(f"\n  Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
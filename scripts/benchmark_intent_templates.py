@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+benchmark_intent_templates.py
+=============================
+Runs a question set through notebooks/intent_templates.py (the fast
+path in front of SQL_MODEL) and reports:
+
+  coverage     which questions a template answers, with its intent, and
+               which fall through to the LLM (the built-in phrasings
+               include questions that must fall through: lists, names,
+               negations, two conditions on one column)
+  latency      match + SQL build time per question
+  results      every matched SQL on the DuckDB stand-in (data/raw CSVs;
+               tables without a CSV are skipped); questions with a
+               reference "sql" must return the same rows
+  --llm ollama SQL_MODEL generation time for the matched questions, i.e.
+               what the template saves per question
+
+Usage:
+    python scripts/benchmark_intent_templates.py
+    python scripts/benchmark_intent_templates.py --llm ollama --verbose
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import (  # noqa: E402
+    DEFAULT_QUESTIONS, DuckDBBackend, percentile, result_signature,
+)
+
+# Common officer phrasings; None = must not match (the LLM handles it)
+PHRASINGS = [
+    ("How many travelers are in the system?", "count"),
+    ("How many watchlist alerts are currently active?", "count"),
+    ("Compare off-loadings across all airports", "count_by"),
+    ("How many off-loadings at Islamabad airport in 2025?", "count"),
+    ("Top 5 airlines by off-loadings in March 2025", "top_n"),
+    ("Off-loadings by reason this year", "count_by"),
+    ("Monthly off-loadings in 2025", "count_by"),
+    ("Which port has the most departures?", "top_n"),
+    ("How many critical watchlist alerts by alert type?", "count_by"),
+    ("Number of asylum claims per status", "count_by"),
+    ("Asylum claims by country of origin", "count_by"),
+    ("How many active detentions are there?", "count"),
+    ("Illegal crossings by detection method in 2025", "count_by"),
+    ("Trafficking cases by case type", "count_by"),
+    ("How many ECL entries are active?", "count"),
+    ("How many visa applications were denied in 2025?", "count"),
+    ("How many high-risk travelers are there?", "count"),
+    ("Travelers by nationality", "count_by"),
+    ("List all off-loaded passengers at Islamabad Airport in 2025", None),
+    ("How many travelers are on the watchlist?", None),
+    ("How many off-loadings were not at Islamabad airport?", None),
+    ("Off-loadings at Islamabad and Lahore airports", None),
+    ("How many off-loadings last month?", None),
+    ("Show the passport details of Ahmed Khan", None),
+    ("Compare off-loadings in 2024 and 2025", None),
+    ("Compare off-loading rates across all airports", None),        # a rate, not a count
+    ("What is the offloading rate by airline", None),
+    ("How many departures from Islamabad airport in 2025?", "count"),
+    ("How many arrivals at Dubai airport?", "count"),
+    ("How many departures to Dubai?", None),            # a destination, not the exit port
+    ("How many off-loadings to Dubai?", None),          # ditto, not where they were stopped
+    ("How many arrivals from Dubai?", None),            # an origin, not the entry port
+]
+
+
+def load_questions(path):
+    items = {q: {"question": q, "expect": intent} for q, intent in PHRASINGS}
+    for item in json.loads(path.read_text()):
+        items.setdefault(item["question"], {"question": item["question"]})["sql"] = item.get("sql")
+    return list(items.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS,
+                        help="Extra questions (reference 'sql' is compared on DuckDB)")
+    parser.add_argument("--llm", choices=("none", "ollama"), default="none")
+    parser.add_argument("--verbose", action="store_true", help="Print every question and its SQL")
+    args = parser.parse_args()
+
+    import pipeline
+    items = load_questions(args.questions)
+    router = pipeline.get_intent_router()
+
+    print("=" * 60)
+    print(f"Intent templates — {len(items)} questions, {len(router.subjects)} subjects, "
+          f"{sum(len(s.dimensions) for s in router.subjects)} dimensions")
+    print("=" * 60)
+    for subject, dim, reason in router.dropped:
+        print(f"  dropped {subject}{'.' + dim if dim else ''}: {reason}")
+
+    times, matches = [], []
+    for item in items:
+        router.match(item["question"])     # warm
+        t0 = time.perf_counter()
+        match = router.match(item["question"])
+        times.append(time.perf_counter() - t0)
+        matches.append(match)
+
+    wrong = [(i, m) for i, m in zip(items, matches)
+             if "expect" in i and (m.intent if m else None) != i["expect"]]
+    intents = {}
+    for m in matches:
+        if m:
+            intents[m.intent] = intents.get(m.intent, 0) + 1
+    matched = sum(1 for m in matches if m)
+    us = [1e6 * t for t in times]
+    print(f"  Matched: {matched}/{len(items)} ({', '.join(f'{k} {v}' for k, v in sorted(intents.items()))})")
+    print(f"  Expected intent: {len(items) - len(wrong)}/{len(items)}")
+    for item, m in wrong:
+        print(f"    ✗ {item['question']!r}: expected {item['expect']}, got {m.intent if m else None}")
+    print(f"  Match time: p50 {percentile(us, 50):.0f} µs, p95 {percentile(us, 95):.0f} µs")
+
+    backend = DuckDBBackend(pipeline)
+    ran = skipped = same = compared = 0
+    for item, m in zip(items, matches):
+        if not m:
+            continue
+        ok, df, msg, _ = backend.execute(m.sql)
+        if not ok:
+            if "does not exist" in msg:
+                skipped += 1
+                continue
+            print(f"    ✗ {item['question']!r}: {msg}")
+            continue
+        ran += 1
+        if args.verbose:
+            print(f"\n  {item['question']}  [{m.intent}] {len(df)} rows\n    " + m.sql.replace("\n", "\n    "))
+        if item.get("sql"):
+            ref_ok, ref_df, _, _ = backend.execute(item["sql"])
+            compared += 1
+            if ref_ok and result_signature(df) == result_signature(ref_df):
+                same += 1
+            else:
+                print(f"    ≠ {item['question']!r}: rows differ from the reference SQL")
+    print(f"  DuckDB: {ran} matched SQL ran ({skipped} skipped: table not in data/raw), "
+          f"{same}/{compared} equal to the reference SQL")
+
+    if args.llm == "ollama":
+        gen = []
+        for item, m in zip(items, matches):
+            if m:
+                _, _, seconds = pipeline.generate_sql(item["question"])
+                gen.append(seconds)
+        if gen:
+            print(f"  SQL_MODEL for the same questions: p50 {percentile(gen, 50):.2f} s, "
+                  f"p95 {percentile(gen, 95):.2f} s (template p50 {percentile(us, 50) / 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+benchmark_pipeline.py
+=====================
+Offline NL2SQL benchmark: replays a question set through
+classify_query -> generate_sql -> validate_sql -> execute_sql ->
+stream_narration and writes a JSON report with p50/p95/p99 latency per
+stage, tokens/sec, rows fetched and execution accuracy.
+
+Backends:
+  --llm ollama   real Ollama server (OLLAMA_HOST, default localhost:11434)
+  --llm stub     in-process stub of Ollama's /api/chat (canned answers,
+                 reference SQL from the question set)
+  --db oracle    pipeline.execute_sql against the Oracle engine
+  --db duckdb    in-memory DuckDB stand-in loaded from data/raw/*.csv
+                 (pip install duckdb; Oracle-only syntax is translated,
+                 see oracle_to_duckdb)
+
+Execution accuracy compares the rows returned by the generated SQL with
+those of the question's reference "sql" on the same backend.
+
+Usage:
+    python scripts/benchmark_pipeline.py --llm stub --db duckdb
+    python scripts/benchmark_pipeline.py --output reports/run.json --compare reports/baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PROJECT_ROOT / "Config"
+DATA_DIR = PROJECT_ROOT / "data" / "raw"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from result_summary import templated_answer  # noqa: E402  (no ollama import, unlike pipeline)
+
+DEFAULT_QUESTIONS = CONFIG_DIR / "nb03_test_results.json"
+STAGES = ("classify", "sql_gen", "validate", "execute", "narrate", "narrate_ttft", "total")
+LLM_STAGES = ("classify", "sql_gen", "narrate")
+
+
+# ============================================================
+# Statistics
+# ============================================================
+def percentile(values, pct):
+    """Linear-interpolated percentile (pct in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "n": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+# ============================================================
+# Stub LLM server (Ollama /api/chat wire format)
+# ============================================================
+class StubOllamaServer:
+    """Answers /api/chat like Ollama: DATABASE for the classifier, the
+    reference SQL for SQL generation, a short briefing for narration.
+    prompt_eval_count (~4 chars/token) excludes the longest prefix shared
+    with a previous prompt in one of the model's `slots` KV caches, which is
+    what Ollama (OLLAMA_NUM_PARALLEL slots) reuses."""
+
+    def __init__(self, reference_sql, delay=0.05, slots=2):
+        self.reference_sql = reference_sql   # question -> SQL
+        self.delay = delay
+        self.slots = slots
+        self._slot_prompts = {}              # model -> [last prompt per slot], LRU first
+        self._prefix_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def compute(self, model):
+        """Time spent "on the GPU" per call; load_test.py overrides this."""
+        time.sleep(self.delay)
+
+    def cached_prefix(self, model, prompt):
+        """Characters of prompt found in the best slot's cache; that slot now holds prompt."""
+        with self._prefix_lock:
+            slots = self._slot_prompts.setdefault(model, [])
+            shared = [len(os.path.commonprefix([cached, prompt])) for cached in slots]
+            best = max(range(len(slots)), key=shared.__getitem__) if shared and max(shared) else None
+            if best is None and len(slots) >= self.slots:
+                best = 0
+            reused = shared[best] if best is not None else 0
+            if best is not None:
+                del slots[best]
+            slots.append(prompt)
+        return reused
+
+    def answer(self, prompt):
+        if "Classify this message" in prompt:
+            return "DATABASE"
+        m = re.search(r"Question: (.*)$", prompt.strip())
+        if m and "Oracle 19c SQL generator" in prompt:
+            return self.reference_sql.get(m.group(1).strip(), "SELECT COUNT(*) FROM travelers")
+        return ("<think>\nreviewing the results\n</think>\n\nThe records show the requested "
+                "figures. Officers should review the flagged entries.")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = "\n\n".join(m["content"] for m in body.get("messages", []))
+                text = server.answer(prompt) if prompt else ""   # empty chat = model load
+                tokens = re.findall(r"\S+\s*|\s+", text)
+                cached = server.cached_prefix(body["model"], prompt) if prompt else 0
+                server.compute(body["model"])
+                counters = {
+                    "prompt_eval_count": (len(prompt) - cached) // 4,
+                    "prompt_eval_duration": int(server.delay * 1e9),
+                    "eval_count": len(tokens),
+                    "eval_duration": int(server.delay * 1e9),
+                    "total_duration": int(2 * server.delay * 1e9),
+                }
+                base = {"model": body["model"], "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+                self.send_response(200)
+                if body.get("stream", True):
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+                    for tok in tokens:
+                        line = dict(base, message={"role": "assistant", "content": tok}, done=False)
+                        self.wfile.write((json.dumps(line) + "\n").encode())
+                    final = dict(base, message={"role": "assistant", "content": ""},
+                                 done=True, done_reason="stop", **counters)
+                    self.wfile.write((json.dumps(final) + "\n").encode())
+                else:
+                    self.send_header("Content-Type", "application/json")
+                    self.end_headers()
+                    final = dict(base, message={"role": "assistant", "content": text},
+                                 done=True, done_reason="stop", **counters)
+                    self.wfile.write(json.dumps(final).encode())
+
+        return Handler
+
+
+# ============================================================
+# Database backends
+# ============================================================
+class OracleBackend:
+    name = "oracle"
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def execute(self, sql):
+        return self.pipeline.execute_sql(sql)
+
+
+def oracle_to_duckdb(sql):
+    """Translate the Oracle-only constructs the prompt asks for into DuckDB SQL."""
+    sql = re.sub(r"TO_DATE\(\s*'([^']*)'\s*,\s*'YYYY-MM-DD'\s*\)", r"DATE '\1'", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bSYSTIMESTAMP\b", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bSYSDATE\b", "CURRENT_DATE", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bNVL\(", "COALESCE(", sql, flags=re.IGNORECASE)
+    return sql
+
+
+class DuckDBBackend:
+    """Local stand-in: every data/raw/*.csv becomes a table of the same name."""
+    name = "duckdb"
+
+    def __init__(self, pipeline, data_dir=DATA_DIR):
+        import duckdb
+
+        self.pipeline = pipeline
+        self.con = duckdb.connect(":memory:")
+        self.lock = threading.Lock()
+        for csv_path in sorted(data_dir.glob("*.csv")):
+            self.con.execute(
+                f"CREATE TABLE {csv_path.stem} AS SELECT * FROM read_csv_auto('{csv_path.as_posix()}')"
+            )
+
+    def execute(self, sql, max_rows=None):
+        max_rows = max_rows or self.pipeline.MAX_RESULT_ROWS
+        is_valid, reason = self.pipeline.validate_sql(sql)
+        if not is_valid:
+            return False, None, f"Validation failed: {reason}", 0.0
+        try:
+            local_sql = oracle_to_duckdb(sql)
+            t0 = time.time()
+            with self.lock:
+                df = self.con.execute(f"SELECT * FROM ({local_sql}) LIMIT {max_rows + 1}").df()
+                total_rows = len(df)
+                if total_rows > max_rows:
+                    df = df.head(max_rows)
+                    total_rows = self.con.execute(f"SELECT COUNT(*) FROM ({local_sql})").fetchone()[0]
+            exec_time = time.time() - t0
+            df.attrs["total_rows"] = total_rows
+            return True, df, f"{total_rows} rows", exec_time
+        except Exception as e:
+            return False, None, f"Error: {str(e)[:200]}", 0.0
+
+
+def result_signature(df):
+    """Order- and column-name-insensitive fingerprint of a result set."""
+    if df is None:
+        return None
+    rows = [tuple(str(v) for v in row) for row in df.itertuples(index=False, name=None)]
+    return sorted(rows), df.attrs.get("total_rows", len(df))
+
+
+class NullPlaceholder:
+    def markdown(self, text):
+        pass
+
+
+# ============================================================
+# Replay
+# ============================================================
+def tokens_per_sec(stats):
+    if stats.get("eval_count") and stats.get("eval_duration"):
+        return stats["eval_count"] / (stats["eval_duration"] / 1e9)
+    return None
+
+
+def run_question(pipeline, backend, item):
+    question = item["question"]
+    row = {"question": question, "timings": {}, "tokens_per_sec": {}, "prompt_tokens": {}}
+    t_start = time.time()
+
+    stats = {}
+    t0 = time.time()
+    row["classification"] = pipeline.classify_query(question, [], stats=stats)
+    row["timings"]["classify"] = time.time() - t0
+    row["tokens_per_sec"]["classify"] = tokens_per_sec(stats)
+    row["prompt_tokens"]["classify"] = stats.get("prompt_eval_count")
+
+    stats = {}
+    try:
+        _, sql, gen_time = pipeline.generate_sql(question, stats=stats)
+    except Exception as e:
+        row["error"] = f"SQL generation failed: {str(e)[:200]}"
+        return row
+    row["sql"] = sql
+    row["timings"]["sql_gen"] = gen_time
+    row["tokens_per_sec"]["sql_gen"] = tokens_per_sec(stats)
+    row["prompt_tokens"]["sql_gen"] = stats.get("prompt_eval_count")
+
+    t0 = time.time()
+    is_valid, reason = pipeline.validate_sql(sql)
+    row["timings"]["validate"] = time.time() - t0
+    row["is_valid"] = is_valid
+    if not is_valid:
+        row["error"] = f"Validation failed: {reason}"
+        return row
+
+    ok, df, msg, exec_time = backend.execute(sql)
+    row["exec_success"] = ok
+    if not ok:
+        row["error"] = msg
+        return row
+    row["timings"]["execute"] = exec_time
+    row["rows_fetched"] = len(df)
+    row["total_rows"] = df.attrs.get("total_rows", len(df))
+
+    if item.get("sql"):
+        ref_ok, ref_df, _, _ = backend.execute(item["sql"])
+        row["exec_match"] = bool(ref_ok and result_signature(df) == result_signature(ref_df))
+
+    if templated_answer(question, df):
+        row["narration"] = "template"
+        row["timings"]["narrate"] = row["timings"]["narrate_ttft"] = 0.0
+        row["timings"]["total"] = time.time() - t_start
+        return row
+    row["narration"] = "llm"
+    stats = {}
+    _, nar_time, ttft = pipeline.stream_narration(question, df, NullPlaceholder(), stats=stats)
+    row["timings"]["narrate"] = nar_time
+    row["timings"]["narrate_ttft"] = ttft
+    row["tokens_per_sec"]["narrate"] = tokens_per_sec(stats)
+    row["prompt_tokens"]["narrate"] = stats.get("prompt_eval_count")
+    row["timings"]["total"] = time.time() - t_start
+    return row
+
+
+def build_report(rows, meta):
+    stages = {s: summarize([r["timings"][s] for r in rows if s in r["timings"]]) for s in STAGES}
+    tps = {s: summarize([r["tokens_per_sec"][s] for r in rows if r["tokens_per_sec"].get(s)])
+           for s in LLM_STAGES}
+    matches = [r["exec_match"] for r in rows if "exec_match" in r]
+    return {
+        "meta": meta,
+        "stages": stages,
+        "tokens_per_sec": tps,
+        "rows_fetched": summarize([r["rows_fetched"] for r in rows if "rows_fetched" in r]),
+        "validation_pass_rate": sum(1 for r in rows if r.get("is_valid")) / len(rows),
+        "exec_success_rate": sum(1 for r in rows if r.get("exec_success")) / len(rows),
+        "execution_accuracy": sum(matches) / len(matches) if matches else None,
+        "templated_narrations": sum(1 for r in rows if r.get("narration") == "template"),
+        "questions": rows,
+    }
+
+
+def compare_reports(current, baseline, tolerance):
+    """Print p95 deltas per stage; return the stages that regressed beyond tolerance."""
+    regressions = []
+    print(f"\n  {'stage':14s} {'baseline p95':>14} {'current p95':>14} {'delta':>8}")
+    for stage in STAGES:
+        cur, base = current["stages"].get(stage), baseline["stages"].get(stage)
+        if not cur or not base:
+            continue
+        delta = (cur["p95"] - base["p95"]) / base["p95"] if base["p95"] else 0.0
+        flag = ""
+        if delta > tolerance:
+            regressions.append(stage)
+            flag = "  ⚠ REGRESSION"
+        print(f"  {stage:14s} {base['p95']:>13.3f}s {cur['p95']:>13.3f}s {delta:>+7.0%}{flag}")
+    cur_acc, base_acc = current.get("execution_accuracy"), baseline.get("execution_accuracy")
+    if cur_acc is not None and base_acc is not None and cur_acc < base_acc:
+        regressions.append("execution_accuracy")
+        print(f"  execution accuracy dropped: {base_acc:.0%} -> {cur_acc:.0%}  ⚠ REGRESSION")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS,
+                        help="JSON list of {question, sql?} objects")
+    parser.add_argument("--llm", choices=("ollama", "stub"), default="ollama")
+    parser.add_argument("--db", choices=("oracle", "duckdb"), default="oracle")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the question set N times")
+    parser.add_argument("--stub-delay", type=float, default=0.05, help="Stub LLM latency per call (s)")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="Baseline report; exit 1 on p95/accuracy regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 increase (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    items = json.loads(args.questions.read_text())
+
+    stub = None
+    if args.llm == "stub":
+        stub = StubOllamaServer({i["question"]: i.get("sql", "") for i in items}, args.stub_delay).start()
+        os.environ["OLLAMA_HOST"] = stub.host   # read by the ollama client at import
+
+    import pipeline
+    backend = DuckDBBackend(pipeline) if args.db == "duckdb" else OracleBackend(pipeline)
+
+    print("=" * 60)
+    print(f"NL2SQL benchmark — {len(items)} questions x {args.repeat}, llm={args.llm}, db={backend.name}")
+    print("=" * 60)
+
+    rows = []
+    for _ in range(args.repeat):
+        for item in items:
+            row = run_question(pipeline, backend, item)
+            rows.append(row)
+            status = row.get("error") or f"{row.get('total_rows', 0)} rows"
+            match = {True: " ✓ match", False: " ✗ mismatch"}.get(row.get("exec_match"), "")
+            print(f"  {row['timings'].get('total', 0):6.2f}s  {item['question'][:60]:60s} {status}{match}")
+
+    if stub:
+        stub.stop()
+
+    meta = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "llm_backend": args.llm,
+        "db_backend": backend.name,
+        "sql_model": pipeline.SQL_MODEL,
+        "chat_model": pipeline.CHAT_MODEL,
+        "questions_file": str(args.questions),
+        "repeat": args.repeat,
+    }
+    report = build_report(rows, meta)
+
+    print(f"\n  {'stage':14s} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, summary in report["stages"].items():
+        if summary:
+            print(f"  {stage:14s} {summary['p50']:>8.3f}s {summary['p95']:>8.3f}s {summary['p99']:>8.3f}s")
+    for stage, summary in report["tokens_per_sec"].items():
+        if summary:
+            print(f"  {stage + ' tok/s':14s} {summary['p50']:>9.1f}")
+    acc = report["execution_accuracy"]
+    print(f"\n  Validation pass rate: {report['validation_pass_rate']:.0%}")
+    print(f"  Execution success:    {report['exec_success_rate']:.0%}")
+    print(f"  Execution accuracy:   {'n/a' if acc is None else f'{acc:.0%}'}")
+    print(f"  Templated answers:    {report['templated_narrations']} (no narration LLM call)")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+        print(f"\n  Report written to {args.output}")
+
+    if args.compare:
+        regressions = compare_reports(report, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"\n  ✗ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n  ✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
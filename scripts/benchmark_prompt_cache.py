@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+benchmark_prompt_cache.py
+=========================
+Measures how much of each prompt Ollama has to evaluate (prompt_eval_count,
+prompt_eval_duration) when a question set is replayed in the app's order
+(classify -> SQL -> narrate), for two prompt layouts:
+
+  legacy   one user message per call, as before: the schema-pruned SQL
+           prompt puts the per-question tables ahead of the static rules
+  stable   pipeline.py's [static system message, per-request user message]
+
+Ollama reuses the KV cache of the longest prefix shared with a slot's
+previous prompt and only counts the rest in prompt_eval_count, so the
+difference is the prefill work saved. Every call generates one token;
+the first question of each layout warms the models and is not recorded.
+
+  --llm ollama   real server (OLLAMA_HOST); set OLLAMA_NUM_PARALLEL as in production
+  --llm stub     benchmark_pipeline's stub, which models the prefix reuse per model
+
+Usage:
+    python scripts/benchmark_prompt_cache.py --llm ollama --repeat 2
+    python scripts/benchmark_prompt_cache.py --llm stub --full-schema
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import DEFAULT_QUESTIONS, StubOllamaServer, percentile  # noqa: E402
+
+STAGES = ("classify", "sql_gen", "narrate")
+MEASURE_OPTIONS = {"temperature": 0.0, "num_predict": 1}
+
+
+def sample_result(i):
+    """Small stand-in result set; its content does not matter for prefix reuse."""
+    return pd.DataFrame({"category": [f"group {i}-{n}" for n in range(8)],
+                         "count": [(i + 1) * (n + 3) for n in range(8)]})
+
+
+def legacy_messages(pipeline, stage, question, df):
+    """The single user message the pipeline sent before the system/user split."""
+    if stage == "classify":
+        return [{"role": "user", "content": pipeline.CLASSIFIER_SYSTEM + "\n/no_think\n\nMessage: " + question}]
+    if stage == "narrate":
+        system, user = pipeline.narration_messages(question, df)
+        return [{"role": "user", "content": system["content"] + "\n\n" + user["content"]}]
+    from schema_linker import build_pruned_prompt, link_tables
+    schema = pipeline.get_schema_info()
+    tables = link_tables(question, schema) if pipeline.PRUNE_SCHEMA else []
+    if tables:
+        prompt = build_pruned_prompt(question, schema, tables)
+    else:
+        tables = None
+        prompt = pipeline.load_prompt_template().replace("{question}", question)
+    summaries = pipeline.fresh_summaries(tables)
+    section = pipeline.prompt_section(summaries) + pipeline.few_shot_section(question, tables, summaries)
+    return [{"role": "user", "content": prompt.replace("=== STRICT RULES ===", section + "=== STRICT RULES ===", 1)}]
+
+
+def stable_messages(pipeline, stage, question, df):
+    if stage == "classify":
+        return pipeline.classifier_messages(question, [])
+    if stage == "narrate":
+        return pipeline.narration_messages(question, df)
+    return pipeline.sql_messages(question)
+
+
+def replay(pipeline, layout, questions, repeat):
+    build = legacy_messages if layout == "legacy" else stable_messages
+    models = {"classify": pipeline.CHAT_MODEL, "sql_gen": pipeline.SQL_MODEL, "narrate": pipeline.CHAT_MODEL}
+    samples = {stage: [] for stage in STAGES}
+    runs = [(0, questions[0], False)] + [(i, q, True) for _ in range(repeat) for i, q in enumerate(questions)]
+    for i, question, record in runs:
+        df = sample_result(i)
+        for stage in STAGES:
+            stats = {}
+            response = pipeline._chat(models[stage], build(pipeline, stage, question, df), MEASURE_OPTIONS,
+                                      stats=stats)
+            pipeline.record_stats(stats, response)
+            if record:
+                samples[stage].append((stats.get("prompt_eval_count", 0),
+                                       stats.get("prompt_eval_duration", 0) / 1e6))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--llm", choices=("ollama", "stub"), default="ollama")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the question set N times per layout")
+    parser.add_argument("--full-schema", action="store_true",
+                        help="PRUNE_SCHEMA = False: the whole schema becomes part of the cached prefix")
+    parser.add_argument("--output", type=Path, help="Write the per-stage numbers as JSON")
+    args = parser.parse_args()
+
+    questions = [i["question"] for i in json.loads(args.questions.read_text())]
+    stub = None
+    if args.llm == "stub":
+        stub = StubOllamaServer({}, delay=0.0).start()
+        os.environ["OLLAMA_HOST"] = stub.host   # read by the ollama client at import
+
+    import pipeline
+    if args.full_schema:
+        pipeline.PRUNE_SCHEMA = False
+
+    print("=" * 60)
+    print(f"Prompt prefix reuse — {len(questions)} questions x {args.repeat}, llm={args.llm}, "
+          f"schema={'full' if args.full_schema else 'pruned'}")
+    print("=" * 60)
+    report = {}
+    for layout in ("legacy", "stable"):
+        samples = replay(pipeline, layout, questions, args.repeat)
+        report[layout] = {
+            stage: {"prompt_eval_count": statistics.mean(n for n, _ in rows),
+                    "prompt_eval_ms_p50": percentile([ms for _, ms in rows], 50)}
+            for stage, rows in samples.items()
+        }
+
+    print(f"\n  {'stage':10s} {'legacy tokens':>14} {'stable tokens':>14} {'legacy ms':>10} {'stable ms':>10}")
+    for stage in STAGES:
+        old, new = report["legacy"][stage], report["stable"][stage]
+        print(f"  {stage:10s} {old['prompt_eval_count']:>14.0f} {new['prompt_eval_count']:>14.0f} "
+              f"{old['prompt_eval_ms_p50']:>10.1f} {new['prompt_eval_ms_p50']:>10.1f}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n  Report written to {args.output}")
+    if stub:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+benchmark_prompt_pruning.py
+===========================
+Compares the full prompt_template.txt against the schema-pruned prompt
+(notebooks/schema_linker.py) on a question set: prompt size, prompt
+tokens and SQL generation latency as reported by Ollama.
+
+Usage:
+    cd ~/ml-projects/python-projects/IBMS_LLM
+    python scripts/benchmark_prompt_pruning.py              # calls SQL_MODEL
+    python scripts/benchmark_prompt_pruning.py --dry-run    # prompt sizes only
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PROJECT_ROOT / "Config"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from schema_linker import load_schema, link_tables, build_pruned_prompt  # noqa: E402
+
+SQL_MODEL = "qwen2.5-coder:14b"
+DEFAULT_QUESTIONS = CONFIG_DIR / "nb03_test_results.json"
+
+
+def run_generation(model, prompt):
+    """Return (prompt_tokens, prompt_eval_seconds, total_seconds) for one SQL generation."""
+    import ollama
+
+    t0 = time.time()
+    response = ollama.chat(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        options={"temperature": 0.0, "num_predict": 1024},
+    )
+    total = time.time() - t0
+    return (
+        response.get("prompt_eval_count", 0),
+        response.get("prompt_eval_duration", 0) / 1e9,
+        total,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS,
+                        help="JSON list of objects with a 'question' key")
+    parser.add_argument("--model", default=SQL_MODEL)
+    parser.add_argument("--dry-run", action="store_true", help="Only report prompt sizes, no LLM calls")
+    parser.add_argument("--output", type=Path, help="Write per-question results as JSON")
+    args = parser.parse_args()
+
+    questions = [q["question"] for q in json.loads(args.questions.read_text())]
+    schema = load_schema(CONFIG_DIR)
+    template = (CONFIG_DIR / "prompt_template.txt").read_text()
+
+    print("=" * 60)
+    print(f"Prompt pruning benchmark — {len(questions)} questions")
+    print("=" * 60)
+
+    results = []
+    for question in questions:
+        tables = link_tables(question, schema)
+        full_prompt = template.replace("{question}", question)
+        pruned_prompt = build_pruned_prompt(question, schema, tables) if tables else full_prompt
+        row = {
+            "question": question,
+            "tables": tables,
+            "full_chars": len(full_prompt),
+            "pruned_chars": len(pruned_prompt),
+        }
+        if not args.dry_run:
+            for label, prompt in (("full", full_prompt), ("pruned", pruned_prompt)):
+                tokens, eval_s, total_s = run_generation(args.model, prompt)
+                row[f"{label}_prompt_tokens"] = tokens
+                row[f"{label}_prompt_eval_s"] = eval_s
+                row[f"{label}_gen_s"] = total_s
+        results.append(row)
+
+        print(f"\n  {question}")
+        print(f"    tables: {', '.join(tables) or '(none linked — full prompt)'}")
+        print(f"    chars:  {row['full_chars']:,} -> {row['pruned_chars']:,}")
+        if not args.dry_run:
+            print(f"    tokens: {row['full_prompt_tokens']:,} -> {row['pruned_prompt_tokens']:,}")
+            print(f"    gen:    {row['full_gen_s']:.2f}s -> {row['pruned_gen_s']:.2f}s "
+                  f"(prompt eval {row['full_prompt_eval_s']:.2f}s -> {row['pruned_prompt_eval_s']:.2f}s)")
+
+    print(f"\n  {'─' * 56}")
+    full_chars = statistics.mean(r["full_chars"] for r in results)
+    pruned_chars = statistics.mean(r["pruned_chars"] for r in results)
+    print(f"  Mean prompt chars: {full_chars:,.0f} -> {pruned_chars:,.0f} "
+          f"({1 - pruned_chars / full_chars:.0%} smaller)")
+    if not args.dry_run:
+        for key, label in (("prompt_tokens", "prompt tokens"), ("gen_s", "SQL gen (s)")):
+            before = statistics.mean(r[f"full_{key}"] for r in results)
+            after = statistics.mean(r[f"pruned_{key}"] for r in results)
+            print(f"  Mean {label}: {before:,.2f} -> {after:,.2f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\n  Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
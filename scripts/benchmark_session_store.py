@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+benchmark_session_store.py
+==========================
+Replays a long investigative session (default 100 questions) against the
+old history (a list of dicts holding pandas DataFrames, every table
+re-drawn on each rerun) and against notebooks/session_store.py (Arrow
+tables under a memory budget, Parquet spill, only recent tables drawn).
+
+Result tables are 1-50 row slices of the CSVs in data/raw, as app.py
+stores df.head(50). "In RAM" is the text plus the tables' deep pandas
+memory (old) or Arrow buffers held in memory (store). "Render" is the Arrow serialization st.dataframe
+performs for every table drawn; a rerun happens after every question.
+
+It also checks that a table with repeated column names (a t.*, w.*
+join) is stored with suffixed names instead of failing.
+
+No Streamlit, Ollama or Oracle needed.
+
+Usage:
+    python scripts/benchmark_session_store.py
+    python scripts/benchmark_session_store.py --questions 200 --memory-budget 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "raw"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from session_store import SessionStore, MEMORY_BUDGET, DISK_BUDGET  # noqa: E402
+
+HISTORY_VISIBLE = 20    # as in app.py
+HISTORY_TABLES = 3
+DISPLAY_ROWS = 50
+
+
+def synthetic_session(n_questions, seed=11):
+    """(question, answer, DataFrame or None, details) tuples drawn from data/raw."""
+    rng = random.Random(seed)
+    tables = [pd.read_csv(path, nrows=2000) for path in sorted(DATA_DIR.glob("*.csv"))]
+    session = []
+    for q in range(n_questions):
+        df = None
+        if rng.random() > 0.15:     # ~15% general questions without a table
+            source = rng.choice(tables)
+            columns = rng.sample(list(source.columns), k=rng.randint(1, min(8, len(source.columns))))
+            start = rng.randrange(max(1, len(source) - DISPLAY_ROWS))
+            df = source[columns].iloc[start:start + rng.randint(1, DISPLAY_ROWS)].reset_index(drop=True).copy()
+        answer = f"Briefing {q}: " + " ".join(rng.choice(("travelers", "off-loaded", "alerts", "2025", "rate"))
+                                              for _ in range(120))
+        details = f"**Generated SQL:**\n```sql\nSELECT ... -- question {q}\n```\n\n" + "x" * 1200
+        session.append((f"Question {q}?", answer, df, details))
+    return session
+
+
+def render(df):
+    """What st.dataframe costs per drawn table: pandas -> Arrow."""
+    pa.Table.from_pandas(df, preserve_index=False)
+
+
+def replay_list(session):
+    messages, render_seconds, drawn = [], 0.0, 0
+    for question, answer, df, details in session:
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer, "dataframe": df, "details": details})
+        t0 = time.perf_counter()
+        for msg in messages:
+            if msg.get("dataframe") is not None:
+                render(msg["dataframe"])
+                drawn += 1
+        render_seconds += time.perf_counter() - t0
+    return messages, render_seconds, drawn
+
+
+def replay_store(session, store):
+    render_seconds, drawn = 0.0, 0
+    for question, answer, df, details in session:
+        store.append({"role": "user", "content": question})
+        store.append({"role": "assistant", "content": answer, "dataframe": df, "details": details})
+        t0 = time.perf_counter()
+        recent = set([i for i, m in enumerate(store) if m.get("frame")][-HISTORY_TABLES:])
+        for i in range(max(0, len(store) - HISTORY_VISIBLE), len(store)):
+            if i in recent:
+                render(store.dataframe(store[i]))
+                drawn += 1
+        render_seconds += time.perf_counter() - t0
+    return store, render_seconds, drawn
+
+
+def check_duplicate_columns():
+    """A t.*, w.* join repeats column names; the store must keep the table (renamed), not raise."""
+    df = pd.DataFrame([[1, "AFG1", 1, "HIGH"]], columns=["traveler_id", "passport_number", "traveler_id", "severity"])
+    store = SessionStore()
+    try:
+        store.append({"role": "assistant", "content": "1 row", "dataframe": df})
+        columns = list(store.dataframe(store[0]).columns)
+    finally:
+        store.close()
+    ok = columns == ["traveler_id", "passport_number", "traveler_id_2", "severity"]
+    print(f"  Duplicate column names: {'✓' if ok else '✗'} stored as {columns}")
+
+
+def text_bytes(messages):
+    return sum(len(m["content"]) + len(m.get("details", "")) for m in messages)
+
+
+def list_bytes(messages):
+    """RAM held by the old history: deep pandas memory of every table plus the text."""
+    frames = [m["dataframe"] for m in messages if m.get("dataframe") is not None]
+    return text_bytes(messages) + sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--memory-budget", type=int, default=MEMORY_BUDGET, help="Arrow bytes kept in memory")
+    parser.add_argument("--disk-budget", type=int, default=DISK_BUDGET, help="Spilled Parquet bytes kept")
+    args = parser.parse_args()
+
+    session = synthetic_session(args.questions)
+    tables = sum(1 for _, _, df, _ in session if df is not None)
+
+    print("=" * 60)
+    print(f"Session history benchmark — {args.questions} questions, {tables} result tables")
+    print("=" * 60)
+
+    messages, list_render, list_drawn = replay_list(session)
+    store, store_render, store_drawn = replay_store(session, SessionStore(args.memory_budget, args.disk_budget))
+    stats = store.stats()
+    old_bytes, new_bytes = list_bytes(messages), text_bytes(store) + stats["memory_bytes"]
+
+    print(f"  {'':22s} {'in RAM (MB)':>12} {'tables drawn':>13} {'render (s)':>11}")
+    print(f"  {'list of DataFrames':22s} {old_bytes / 1e6:>12.3f} {list_drawn:>13,} {list_render:>11.2f}")
+    print(f"  {'SessionStore':22s} {new_bytes / 1e6:>12.3f} {store_drawn:>13,} {store_render:>11.2f}")
+    print(f"\n  Store: {stats['in_memory']} tables in memory ({stats['memory_bytes'] / 1e6:.2f} MB), "
+          f"{stats['on_disk']} spilled ({stats['disk_bytes'] / 1e6:.2f} MB), {stats['evicted']} evicted")
+    print(f"  Last rerun: {tables} tables drawn before, {min(HISTORY_TABLES, tables)} now")
+    store.close()
+    check_duplicate_columns()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+benchmark_sql_binds.py
+======================
+Replays the question set's reference SQL as --variants literal variants
+per question (other years, dates and sample values of the same column,
+as officers ask the same question about another port or month) and
+compares executing them as generated (literals) with the bind-variable
+shapes of notebooks/sql_binds.py:
+
+  offline        distinct statement texts (cursors Oracle has to hard
+                 parse) before/after, rewrite cost per statement, and a
+                 DuckDB check that every bound variant returns the same
+                 rows as its literal original
+  --db oracle    each variant on a fresh session per mode: literals with
+                 the driver's default statement cache vs. binds with
+                 ORACLE_STMT_CACHE_SIZE; reports parse count (total /
+                 hard), session cursor cache hits and execution latency.
+                 The parse counters need
+                     GRANT SELECT ON v_$mystat TO ibms_user;
+                     GRANT SELECT ON v_$statname TO ibms_user;
+                 without them only latency is reported.
+
+Statements carry a per-run comment so earlier runs' cursors are not reused.
+
+Usage:
+    python scripts/benchmark_sql_binds.py
+    python scripts/benchmark_sql_binds.py --db oracle --variants 20
+"""
+
+import argparse
+import datetime
+import json
+import re
+import sys
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import (  # noqa: E402
+    CONFIG_DIR, DEFAULT_QUESTIONS, DuckDBBackend, oracle_to_duckdb, percentile, result_signature,
+)
+from cost_guard import make_sargable  # noqa: E402
+from sql_binds import bind_literals  # noqa: E402
+
+PARSE_STATS = ("parse count (total)", "parse count (hard)", "session cursor cache hits")
+_BIND_RE = re.compile(r":(b\d+)\b")
+
+
+def sample_columns():
+    """value -> list of the sample values of its column (Config/sample_values.json)."""
+    columns = {}
+    for table in json.loads((CONFIG_DIR / "sample_values.json").read_text()).values():
+        for values in table.values():
+            for value in values:
+                columns.setdefault(value, values)
+    return columns
+
+
+def vary(value, k, samples):
+    """The k-th variant of a bound literal (k = 0 is the original)."""
+    if k == 0:
+        return value
+    if isinstance(value, datetime.date):
+        return value.replace(year=value.year - k % 5, day=min(value.day, 28))
+    if isinstance(value, bool) or not isinstance(value, (int, Decimal, str)):
+        return value
+    if isinstance(value, int):
+        return value - k % 5 if 1900 <= value <= 2100 else value + k
+    if isinstance(value, Decimal):
+        return value + k
+    column = samples.get(value)
+    return column[(column.index(value) + k) % len(column)] if column else value
+
+
+def literal(value) -> str:
+    if isinstance(value, datetime.date):
+        return f"TO_DATE('{value.isoformat()}','YYYY-MM-DD')"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def inline(shape: str, binds: dict) -> str:
+    """The literal SQL a bound shape stands for."""
+    return _BIND_RE.sub(lambda m: literal(binds[m.group(1)]), shape)
+
+
+def build_variants(items, n_variants):
+    """[(literal_sql, shape, binds)] for every question and variant."""
+    samples = sample_columns()
+    variants = []
+    for item in items:
+        sql, _ = make_sargable(item["sql"])
+        shape, binds = bind_literals(sql)
+        for k in range(n_variants):
+            values = {name: vary(value, k, samples) for name, value in binds.items()}
+            variants.append((inline(shape, values), shape, values))
+    return variants
+
+
+def check_duckdb(pipeline, variants):
+    """(equivalent, comparable): bound variant vs. literal variant on the DuckDB stand-in."""
+    con = DuckDBBackend(pipeline).con
+    same = comparable = 0
+    for literal_sql, shape, binds in variants:
+        try:
+            expected = con.execute(oracle_to_duckdb(literal_sql)).df()
+        except Exception:
+            continue    # Oracle-only construct or a table the CSVs lack
+        comparable += 1
+        try:
+            got = con.execute(oracle_to_duckdb(_BIND_RE.sub(r"$\1", shape)), binds).df()
+        except Exception as e:
+            print(f"    bound variant failed: {str(e)[:120]}\n      {shape[:160]}")
+            continue
+        same += result_signature(got) == result_signature(expected)
+    return same, comparable
+
+
+# ============================================================
+# Oracle replay
+# ============================================================
+def session_stats(cursor):
+    try:
+        cursor.execute("SELECT n.name, s.value FROM v$mystat s JOIN v$statname n ON n.statistic# = s.statistic# "
+                       "WHERE n.name IN ('parse count (total)', 'parse count (hard)', 'session cursor cache hits')")
+        return dict(cursor.fetchall())
+    except Exception:
+        return None
+
+
+def replay_oracle(pipeline, variants, mode, tag):
+    import oracledb
+
+    replica = pipeline.get_router().replicas[0]
+    cache_size = pipeline.ORACLE_STMT_CACHE_SIZE if mode == "binds" else oracledb.defaults.stmtcachesize
+    conn = oracledb.connect(user=replica.user, password=replica.password, dsn=replica.dsn, stmtcachesize=cache_size)
+    cursor = conn.cursor()
+    cursor.arraysize = pipeline.ORACLE_ARRAYSIZE
+    before = session_stats(cursor)
+    times, errors = [], 0
+    for literal_sql, shape, binds in variants:
+        sql, params = (shape, binds) if mode == "binds" else (literal_sql, None)
+        statement = pipeline.capped_sql(sql, pipeline.MAX_RESULT_ROWS).replace("SELECT ", f"SELECT /* {tag} */ ", 1)
+        t0 = time.perf_counter()
+        try:
+            cursor.execute(statement, params)
+            cursor.fetchall()
+            times.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+    after = session_stats(cursor)
+    conn.close()
+    parses = {name: after[name] - before[name] for name in PARSE_STATS} if before and after else None
+    return {"cache_size": cache_size, "times": times, "errors": errors, "parses": parses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--variants", type=int, default=10, help="Literal variants per question")
+    parser.add_argument("--db", choices=("none", "oracle"), default="none")
+    args = parser.parse_args()
+
+    import pipeline
+    items = [i for i in json.loads(args.questions.read_text()) if i.get("sql")]
+    variants = build_variants(items, args.variants)
+
+    print("=" * 60)
+    print(f"Literal binding — {len(items)} questions x {args.variants} variants")
+    print("=" * 60)
+    texts = len({v[0] for v in variants})
+    shapes = len({v[1] for v in variants})
+    t0 = time.perf_counter()
+    for literal_sql, _, _ in variants:
+        bind_literals(literal_sql)
+    rewrite_us = 1e6 * (time.perf_counter() - t0) / len(variants)
+    print(f"  Distinct statement texts: {texts} with literals, {shapes} bound shapes")
+    print(f"  bind_literals: {rewrite_us:.0f} µs per statement")
+    same, comparable = check_duckdb(pipeline, variants)
+    print(f"  DuckDB: {same}/{comparable} bound variants return the same rows as the literal SQL")
+
+    if args.db == "oracle":
+        tag = f"bind-bench {uuid.uuid4().hex[:8]}"
+        print(f"\n  {'mode':9s} {'stmt cache':>10} {'parses':>7} {'hard':>6} {'cache hits':>10} "
+              f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'errors':>7}")
+        for mode in ("literals", "binds"):
+            run = replay_oracle(pipeline, variants, mode, tag)
+            parses = run["parses"] or {}
+            ms = [1000 * t for t in run["times"]] or [0.0]
+            print(f"  {mode:9s} {run['cache_size']:>10} {parses.get(PARSE_STATS[0], '-'):>7} "
+                  f"{parses.get(PARSE_STATS[1], '-'):>6} {parses.get(PARSE_STATS[2], '-'):>10} "
+                  f"{percentile(ms, 50):>9.1f} {percentile(ms, 95):>9.1f} {run['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+benchmark_sql_validator.py
+==========================
+Compares the tokenizer-based validator (notebooks/sql_validator.py)
+with the previous regex validate_sql on a corpus of generated queries:
+time per query and every query where the two verdicts differ.
+
+The default corpus is the reference SQL from Config/nb03_test_results.json
+plus synthetic SELECTs built from Config/schema_ddl.txt and a set of
+unsafe / tricky statements. Pass --corpus with a JSON list of SQL strings
+(or objects with a "sql" key) to use logged queries instead.
+
+Usage:
+    python scripts/benchmark_sql_validator.py
+    python scripts/benchmark_sql_validator.py --corpus reports/generated_sql.json --repeat 200
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PROJECT_ROOT / "Config"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from schema_linker import load_schema  # noqa: E402
+from sql_validator import SQLValidator  # noqa: E402
+
+# ============================================================
+# Previous implementation (pipeline.validate_sql before the tokenizer)
+# ============================================================
+IBMS_TABLES = {
+    "countries", "ports_of_entry", "visa_categories", "sponsors",
+    "travelers", "document_registry", "visa_applications", "travel_records",
+    "asylum_claims", "removal_orders", "detention_records",
+    "family_relationships", "watchlist", "ecl_entries",
+    "trafficking_cases", "illegal_crossings", "offloading_records",
+    "risk_profiles", "suspect_networks", "audit_log",
+}
+
+BLOCKED_KEYWORDS = [
+    r"\bINSERT\b", r"\bUPDATE\b", r"\bDELETE\b", r"\bMERGE\b",
+    r"\bCREATE\b", r"\bDROP\b", r"\bALTER\b", r"\bTRUNCATE\b", r"\bRENAME\b",
+    r"\bGRANT\b", r"\bREVOKE\b",
+    r"\bDBMS_", r"\bUTL_", r"\bSYS\.", r"\bDBA_",
+    r"\bV\$", r"\bEXECUTE\s+IMMEDIATE\b",
+    r"\bBEGIN\b", r"\bDECLARE\b", r"\bEXEC\b",
+]
+
+
+def legacy_validate_sql(sql: str) -> tuple:
+    if not sql or not sql.strip():
+        return False, "Empty SQL"
+    sql_upper = sql.strip().upper()
+    if not (sql_upper.startswith("SELECT") or sql_upper.startswith("WITH")):
+        return False, f"Must start with SELECT/WITH"
+    if ';' in sql:
+        return False, "Multiple statements detected"
+    for pattern in BLOCKED_KEYWORDS:
+        match = re.search(pattern, sql, re.IGNORECASE)
+        if match:
+            return False, f"Blocked: {match.group()}"
+    if '--' in sql or '/*' in sql:
+        return False, "SQL comments not allowed"
+    sql_lower = sql.lower()
+    if not any(t in sql_lower for t in IBMS_TABLES):
+        return False, "No known IBMS table referenced"
+    return True, "OK"
+
+
+# ============================================================
+# Corpus
+# ============================================================
+TRICKY = [
+    "SELECT COUNT(*) FROM audit_log WHERE action = 'UPDATE'",
+    "SELECT COUNT(*) FROM audit_log WHERE details LIKE '%-- manual override%'",
+    "SELECT 'travelers' AS label FROM dual",
+    "SELECT * FROM employees",
+    "SELECT t.passport_no FROM travelers t",
+    "SELECT * FROM travelers; DROP TABLE travelers",
+    "SELECT * FROM travelers /* hidden */",
+    "DELETE FROM watchlist",
+    "SELECT * FROM sys.dba_users",
+    "SELECT * FROM v$session",
+    "SELECT dbms_random.value FROM travelers",
+    "SELECT * FROM travelers@remote_link",
+    "SELECT * FROM travelers FOR UPDATE",
+    "WITH hits AS (SELECT traveler_id FROM watchlist WHERE is_active = 1) "
+    "SELECT COUNT(*) FROM hits h JOIN travelers t ON t.traveler_id = h.traveler_id",
+    "SELECT q'[it's a DROP]' AS note, COUNT(*) FROM travelers",
+    # An alias reused in a subquery binds only there
+    "SELECT t.first_name FROM travelers t WHERE t.traveler_id IN (SELECT t.traveler_id FROM watchlist t)",
+    "SELECT t.first_name FROM travelers t WHERE EXISTS (SELECT 1 FROM watchlist w WHERE w.traveler_id = t.traveler_id)",
+]
+
+
+def synthetic_queries(schema, n, seed=11):
+    """Generated-looking SELECTs: filters, joins over FKs, GROUP BY, FETCH FIRST."""
+    rng = random.Random(seed)
+    fks = schema.foreign_keys
+    queries = []
+    for _ in range(n):
+        src, src_col, dst, dst_col = rng.choice(fks)
+        cols_src = schema.tables[src]
+        cols_dst = schema.tables[dst]
+        group_col = rng.choice(cols_dst)
+        filter_col = rng.choice(cols_src)
+        queries.append(
+            f"SELECT d.{group_col}, COUNT(s.{src_col}) AS n\n"
+            f"FROM {src} s\n"
+            f"JOIN {dst} d ON s.{src_col} = d.{dst_col}\n"
+            f"WHERE s.{filter_col} IS NOT NULL AND EXTRACT(YEAR FROM SYSDATE) = 2025\n"
+            f"GROUP BY d.{group_col}\n"
+            f"ORDER BY n DESC\n"
+            f"FETCH FIRST {rng.choice((5, 10, 20))} ROWS ONLY"
+        )
+    return queries
+
+
+def load_corpus(path, schema, synthetic):
+    if path:
+        items = json.loads(Path(path).read_text())
+        return [i["sql"] if isinstance(i, dict) else i for i in items]
+    reference = [i["sql"] for i in json.loads((CONFIG_DIR / "nb03_test_results.json").read_text())]
+    return reference + synthetic_queries(schema, synthetic) + TRICKY
+
+
+def time_per_query(fn, corpus, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for sql in corpus:
+            fn(sql)
+    return (time.perf_counter() - t0) / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="JSON list of SQL strings or {sql} objects")
+    parser.add_argument("--synthetic", type=int, default=200, help="Synthetic queries in the default corpus")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    schema = load_schema(CONFIG_DIR)
+    validator = SQLValidator(schema.tables)
+    corpus = load_corpus(args.corpus, schema, args.synthetic)
+
+    print("=" * 60)
+    print(f"SQL validator benchmark — {len(corpus)} queries x {args.repeat}")
+    print("=" * 60)
+
+    old_t = time_per_query(legacy_validate_sql, corpus, args.repeat)
+    new_t = time_per_query(validator.analyze, corpus, args.repeat)
+    print(f"  regex validate_sql:    {old_t * 1e6:8.1f} µs/query")
+    print(f"  tokenizer (uncached):  {new_t * 1e6:8.1f} µs/query  (also extracts tables/columns)")
+
+    differ = []
+    for sql in corpus:
+        old_ok, old_reason = legacy_validate_sql(sql)
+        new = validator.analyze(sql)
+        if old_ok != new.ok:
+            differ.append((sql, old_reason, new.reason))
+    print(f"\n  Verdicts differ on {len(differ)} of {len(corpus)} queries:")
+    for sql, old_reason, new_reason in differ:
+        print(f"    {' '.join(sql.split())[:70]}")
+        print(f"      regex: {old_reason:32s} tokenizer: {new_reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+benchmark_stream_filter.py
+==========================
+Micro-benchmark of the streaming loop: CPU time and placeholder redraws
+per streamed response, for the old per-token clean_qwen3_output()
+re-scan vs ThinkStreamFilter + RenderThrottle.
+
+No Ollama or Streamlit needed — tokens come from a synthetic qwen3-style
+response (think block, "A:" prefix, ~2048 tokens of briefing text).
+
+Usage:
+    python scripts/benchmark_stream_filter.py
+    python scripts/benchmark_stream_filter.py --tokens 2048 --token-delay 0.002 --runs 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from stream_filter import ThinkStreamFilter, RenderThrottle, clean_qwen3_output  # noqa: E402
+
+WORDS = ("off-loaded passengers travelers watchlist alerts Islamabad Karachi Lahore airport "
+         "2025 increase decrease percent officers recommend review flagged records").split()
+
+
+class FakePlaceholder:
+    """Stands in for st.empty(); counts redraws and the characters sent."""
+
+    def __init__(self):
+        self.renders = 0
+        self.chars_sent = 0
+
+    def markdown(self, text):
+        self.renders += 1
+        self.chars_sent += len(text)
+
+
+def synthetic_tokens(n_tokens, seed=7):
+    rng = random.Random(seed)
+    tokens = ["<", "think", ">", "\n"] + [rng.choice(WORDS) + " " for _ in range(n_tokens // 8)]
+    tokens += ["</", "think", ">", "\n\n", "A", ":", " "]
+    while len(tokens) < n_tokens:
+        tokens.append(rng.choice(WORDS) + (" " if rng.random() > 0.1 else ".\n\n"))
+    return tokens
+
+
+def run_old(tokens, placeholder, delay):
+    accumulated = ""
+    for token in tokens:
+        if delay:
+            time.sleep(delay)
+        accumulated += token
+        cleaned = clean_qwen3_output(accumulated)
+        if cleaned:
+            placeholder.markdown(cleaned)
+    final = clean_qwen3_output(accumulated)
+    placeholder.markdown(final)
+    return final
+
+
+def run_new(tokens, placeholder, delay):
+    stream_filter = ThinkStreamFilter()
+    throttle = RenderThrottle(placeholder)
+    for token in tokens:
+        if delay:
+            time.sleep(delay)
+        if stream_filter.feed(token):
+            throttle.update(stream_filter.visible)
+    final = stream_filter.finish()
+    throttle.flush(final)
+    return final
+
+
+def measure(fn, tokens, delay, runs):
+    cpu_times, placeholder, final = [], None, None
+    for _ in range(runs):
+        placeholder = FakePlaceholder()
+        c0 = time.process_time()
+        final = fn(tokens, placeholder, delay)
+        cpu_times.append(time.process_time() - c0)
+    return min(cpu_times), placeholder, final
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2048)
+    parser.add_argument("--token-delay", type=float, default=0.002,
+                        help="Seconds between tokens (sleep is excluded from CPU time)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    tokens = synthetic_tokens(args.tokens)
+
+    print("=" * 60)
+    print(f"Streaming loop benchmark — {len(tokens)} tokens, best of {args.runs}")
+    print("=" * 60)
+
+    old_cpu, old_ph, old_final = measure(run_old, tokens, args.token_delay, args.runs)
+    new_cpu, new_ph, new_final = measure(run_new, tokens, args.token_delay, args.runs)
+
+    print(f"  {'':24s} {'CPU (ms)':>10} {'redraws':>10} {'chars sent':>14}")
+    print(f"  {'per-token re-scan':24s} {old_cpu * 1000:>10.1f} {old_ph.renders:>10,} {old_ph.chars_sent:>14,}")
+    print(f"  {'incremental + throttle':24s} {new_cpu * 1000:>10.1f} {new_ph.renders:>10,} {new_ph.chars_sent:>14,}")
+    print(f"\n  Speedup: {old_cpu / max(new_cpu, 1e-9):.1f}x CPU, "
+          f"{old_ph.renders / max(new_ph.renders, 1):.0f}x fewer redraws")
+    print(f"  Final text identical: {old_final == new_final}")
+
+
+if __name__ == "__main__":
+    main()
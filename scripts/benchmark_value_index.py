@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+benchmark_value_index.py
+========================
+Compares the value index (notebooks/value_index.py) over the full
+distinct values with the same index over Config/sample_values.json
+(what the prompt listed before):
+
+  resolution   phrasings that name a value the way officers write it
+               ("Torkham", "Islamabd airport", "Qatar Airways"); how many
+               resolve to the exact stored value with each index
+  latency      index build time and resolve() per question
+  prompt       VALID COLUMN VALUES characters for the linked tables:
+               static lists vs. short columns + matched values
+  templates    intent-template coverage of the phrasings with each
+               index's values
+
+Full values come from the data/raw CSVs (the DuckDB stand-in; columns
+of tables without a CSV keep their sample lists), or with --snapshot
+from Config/.value_index.json as written by
+scripts/refresh_value_index.py.
+
+Usage:
+    python scripts/benchmark_value_index.py
+    python scripts/benchmark_value_index.py --snapshot --verbose
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "raw"
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from benchmark_pipeline import DEFAULT_QUESTIONS, percentile  # noqa: E402
+from intent_templates import IntentRouter  # noqa: E402
+from schema_linker import link_tables, linked_schema_block  # noqa: E402
+from value_index import MAX_DISTINCT, ValueIndex, load_value_index, value_columns  # noqa: E402
+
+# (question, "table.column", exact stored value)
+PHRASINGS = [
+    ("How many off-loadings at Islamabad airport in 2025?", "ports_of_entry.port_name",
+     "Islamabad International Airport"),
+    ("How many off-loadings at Islamabd airport in 2025?", "ports_of_entry.port_name",
+     "Islamabad International Airport"),
+    ("Illegal crossings detected near Torkham", "ports_of_entry.port_name", "Torkham Border Crossing"),
+    ("Arrivals through Wagah border by month", "ports_of_entry.port_name", "Wagah Border Crossing"),
+    ("How many travelers from Pakistan are on the watchlist?", "countries.country_name", "Pakistan"),
+    ("Asylum claims by nationals of Saudi Arabia", "countries.country_name", "Saudi Arabia"),
+    ("How many asylum claims from Syria in 2025?", "countries.country_name", "Syria"),
+    ("Travelers from the United States with active alerts", "countries.country_name", "United States"),
+    ("How many off-loadings by Qatar Airways?", "offloading_records.airline", "Qatar Airways"),
+    ("How many off-loadings by Emirates in 2025?", "offloading_records.airline", "Emirates"),
+    ("Off-loadings of flydubai passengers by reason", "offloading_records.airline", "flydubai"),
+    ("Watchlist alerts issued by the FIA Immigration Wing", "watchlist.issued_by", "FIA Immigration Wing"),
+    ("Alerts from Interpol Islamabad by severity", "watchlist.issued_by", "Interpol NCB Islamabad"),
+    ("ECL entries ordered by the Lahore High Court", "ecl_entries.issuing_authority", "Lahore High Court"),
+    ("ECL entries from NAB", "ecl_entries.issuing_authority", "National Accountability Bureau (NAB)"),
+    ("Illegal crossings on the Makran coast at Pasni", "illegal_crossings.location_name", "Makran coast - Pasni"),
+    ("Crossings at Spin Boldak by outcome", "illegal_crossings.location_name", "Spin Boldak corridor"),
+    ("Visa sponsors in the textile industry", "sponsors.industry", "Textile"),
+    ("Departures from Quetta airport this year", "ports_of_entry.port_name", "Quetta International Airport"),
+    ("Which ports in Peshawar had the most arrivals?", "ports_of_entry.city", "Peshawar"),
+]
+# Count questions the intent templates should answer once the value is known
+TEMPLATE_QUESTIONS = [
+    "How many off-loadings at Torkham in 2025?",
+    "How many off-loadings at Sialkot airport in 2025?",
+    "How many asylum claims from Syria?",
+    "How many travelers from Pakistan?",
+    "Off-loadings at Multan airport by reason",
+    "How many off-loadings by Qatar Airways?",
+]
+
+
+def csv_values(sample_values: dict, tables: dict) -> dict:
+    """sample_values with every indexed column of a data/raw CSV replaced by its distinct values."""
+    values = {table: dict(cols) for table, cols in sample_values.items()}
+    for table, cols in value_columns(sample_values, tables).items():
+        path = DATA_DIR / f"{table}.csv"
+        if not path.exists():
+            continue
+        df = pd.read_csv(path, usecols=lambda c: c in cols)
+        for col in df.columns:
+            distinct = sorted(str(v) for v in df[col].dropna().unique())
+            if len(distinct) <= MAX_DISTINCT:
+                values.setdefault(table, {})[col] = distinct
+    return values
+
+
+def resolution(index, verbose, label):
+    hits = 0
+    for question, column, expected in PHRASINGS:
+        found = [m.value for m in index.resolve(question) if f"{m.table}.{m.column}" == column]
+        hits += expected in found
+        if verbose and expected not in found:
+            print(f"    {label}: ✗ {question!r} -> {column} {found or '-'}")
+    return hits
+
+
+def value_chars(schema, index, questions):
+    """(static, matched) VALID COLUMN VALUES characters summed over the questions' linked tables."""
+    static = matched = 0
+    for question in questions:
+        tables = link_tables(question, schema)
+        if not tables:
+            continue
+        static += len(linked_schema_block(schema, tables))
+        matched += len(linked_schema_block(schema, tables, index.prompt_values(tables, index.resolve(question))))
+    return static, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", action="store_true", help="Full values from Config/.value_index.json")
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--verbose", action="store_true", help="Print the phrasings an index misses")
+    args = parser.parse_args()
+
+    import pipeline
+    schema = pipeline.get_schema_info()
+    t0 = time.perf_counter()
+    if args.snapshot:
+        full = load_value_index(pipeline.VALUE_INDEX_FILE, schema.sample_values)
+        source = "Config/.value_index.json" if full.refreshed_at else "no snapshot: sample values"
+    else:
+        full = ValueIndex(csv_values(schema.sample_values, schema.tables))
+        source = "data/raw CSVs"
+    build_ms = 1000 * (time.perf_counter() - t0)
+    sample = ValueIndex(schema.sample_values)
+    n_values = sum(len(v) for cols in full.values.values() for v in cols.values())
+
+    print("=" * 60)
+    print(f"Value index — {len(PHRASINGS)} phrasings, full values from {source}")
+    print("=" * 60)
+    print(f"  Index: {n_values:,} values in {sum(len(c) for c in full.values.values())} columns, "
+          f"{len(full)} entries, built in {build_ms:.0f} ms (incl. loading)")
+
+    print(f"  Resolved exactly: full {resolution(full, args.verbose, 'full')}/{len(PHRASINGS)}, "
+          f"sample lists {resolution(sample, args.verbose, 'sample')}/{len(PHRASINGS)}")
+
+    questions = [q for q, _, _ in PHRASINGS] + [i["question"] for i in json.loads(args.questions.read_text())]
+    times = []
+    for question in questions:
+        full.resolve(question)      # warm
+        t0 = time.perf_counter()
+        full.resolve(question)
+        times.append(1e6 * (time.perf_counter() - t0))
+    print(f"  resolve(): p50 {percentile(times, 50):.0f} µs, p95 {percentile(times, 95):.0f} µs")
+
+    static, matched = value_chars(schema, full, questions)
+    print(f"  Linked schema block: {static:,} chars with the static lists, {matched:,} with matched values "
+          f"({100 * (1 - matched / max(static, 1)):.0f}% smaller)")
+
+    covered = {}
+    for label, index in (("sample lists", sample), ("full", full)):
+        router = IntentRouter(index.values, validate=pipeline.validate_sql, current_year=pipeline.DATA_YEAR)
+        covered[label] = [q for q in TEMPLATE_QUESTIONS if router.match(q)]
+    print(f"  Intent templates: {len(covered['full'])}/{len(TEMPLATE_QUESTIONS)} answered with the full values, "
+          f"{len(covered['sample lists'])}/{len(TEMPLATE_QUESTIONS)} with the sample lists")
+    if args.verbose:
+        for question in TEMPLATE_QUESTIONS:
+            marks = " ".join("✓" if question in covered[k] else "✗" for k in ("sample lists", "full"))
+            print(f"    {marks}  {question}")
+
+
+if __name__ == "__main__":
+    main()
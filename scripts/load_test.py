@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+============
+Simulates N officers asking questions at the same time and reports
+end-to-end latency, queue waits and model swaps, with the LLM scheduler
+(notebooks/llm_scheduler.py) in front of Ollama or bypassed.
+
+Each session replays the question set through the full pipeline
+(classify -> SQL -> validate -> execute -> narrate) on its own thread.
+
+Backends are those of benchmark_pipeline.py. With --llm stub the stub
+models a single GPU: --gpu-parallel requests per model run at once and
+only --gpu-models models stay loaded; loading another one costs
+--swap-penalty seconds.
+
+Usage:
+    python scripts/load_test.py --sessions 8 --llm stub --db duckdb
+    python scripts/load_test.py --sessions 8 --llm stub --db duckdb --no-scheduler
+    python scripts/load_test.py --sessions 4 --questions 5            # real Ollama + Oracle
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_pipeline import (  # noqa: E402
+    DEFAULT_QUESTIONS, StubOllamaServer, DuckDBBackend, OracleBackend,
+    run_question, summarize,
+)
+
+
+class GpuStubOllamaServer(StubOllamaServer):
+    """Stub whose compute time behaves like one GPU shared by the models."""
+
+    def __init__(self, reference_sql, delay, parallel, max_loaded, swap_penalty):
+        super().__init__(reference_sql, delay)
+        self.parallel = parallel
+        self.max_loaded = max_loaded
+        self.swap_penalty = swap_penalty
+        self.swaps = 0
+        self._loaded = OrderedDict()   # model -> calls running (LRU order)
+        self._cond = threading.Condition()
+
+    def compute(self, model):
+        with self._cond:
+            # Wait for a slot; a model that isn't loaded needs an idle model to evict
+            while True:
+                running = self._loaded.get(model)
+                if running is not None and running < self.parallel:
+                    break
+                if running is None:
+                    if len(self._loaded) < self.max_loaded:
+                        break
+                    idle = [m for m, n in self._loaded.items() if n == 0]
+                    if idle:
+                        del self._loaded[idle[0]]
+                        break
+                self._cond.wait()
+            swapped = model not in self._loaded
+            self._loaded[model] = self._loaded.get(model, 0) + 1
+            self._loaded.move_to_end(model)
+            if swapped:
+                self.swaps += 1
+        time.sleep(self.delay + (self.swap_penalty if swapped else 0.0))
+        with self._cond:
+            self._loaded[model] -= 1
+            self._cond.notify_all()
+
+
+def run_session(pipeline, backend, session_id, items, llm_session):
+    rows = []
+    with llm_session(session_id):
+        for item in items:
+            t0 = time.time()
+            row = run_question(pipeline, backend, item)
+            row["session"] = session_id
+            row["wall"] = time.time() - t0
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent officer sessions")
+    parser.add_argument("--questions", type=int, default=3, help="Questions per session")
+    parser.add_argument("--questions-file", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--llm", choices=("ollama", "stub"), default="ollama")
+    parser.add_argument("--db", choices=("oracle", "duckdb"), default="oracle")
+    parser.add_argument("--no-scheduler", action="store_true",
+                        help="Bypass admission control (every call goes straight to Ollama)")
+    parser.add_argument("--stub-delay", type=float, default=0.2, help="Stub compute time per call (s)")
+    parser.add_argument("--gpu-parallel", type=int, default=2, help="Stub: parallel requests per model")
+    parser.add_argument("--gpu-models", type=int, default=1, help="Stub: models that fit in VRAM")
+    parser.add_argument("--swap-penalty", type=float, default=1.0, help="Stub: seconds to load a model")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    all_items = json.loads(args.questions_file.read_text())
+    stub = None
+    if args.llm == "stub":
+        stub = GpuStubOllamaServer({i["question"]: i.get("sql", "") for i in all_items}, args.stub_delay,
+                                   args.gpu_parallel, args.gpu_models, args.swap_penalty).start()
+        os.environ["OLLAMA_HOST"] = stub.host   # read by the ollama client at import
+
+    import pipeline
+    from llm_scheduler import llm_session
+
+    if args.no_scheduler:
+        pipeline.LLM_PARALLEL = {m: 10_000 for m in (pipeline.SQL_MODEL, pipeline.CHAT_MODEL)}
+        pipeline.LLM_MAX_LOADED_MODELS = 2
+    elif stub:
+        # Tell the scheduler what the simulated GPU can do
+        pipeline.LLM_PARALLEL = {m: args.gpu_parallel for m in (pipeline.SQL_MODEL, pipeline.CHAT_MODEL)}
+        pipeline.LLM_MAX_LOADED_MODELS = args.gpu_models
+    backend = DuckDBBackend(pipeline) if args.db == "duckdb" else OracleBackend(pipeline)
+
+    mode = "direct" if args.no_scheduler else "scheduled"
+    print("=" * 60)
+    print(f"Load test — {args.sessions} sessions x {args.questions} questions, "
+          f"{mode}, llm={args.llm}, db={backend.name}")
+    print("=" * 60)
+
+    pipeline.warm_models()
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        futures = [
+            pool.submit(run_session, pipeline, backend, f"officer-{n}",
+                        [all_items[(n + k) % len(all_items)] for k in range(args.questions)], llm_session)
+            for n in range(args.sessions)
+        ]
+        rows = [row for f in futures for row in f.result()]
+    elapsed = time.time() - t0
+    if stub:
+        stub.stop()
+
+    per_session = {}
+    for row in rows:
+        per_session.setdefault(row["session"], []).append(row["wall"])
+    session_means = [sum(v) / len(v) for v in per_session.values()]
+    report = {
+        "meta": {"mode": mode, "sessions": args.sessions, "questions": args.questions,
+                 "llm_backend": args.llm, "db_backend": backend.name},
+        "elapsed": elapsed,
+        "throughput_qpm": len(rows) / elapsed * 60,
+        "latency": summarize([r["wall"] for r in rows]),
+        # Fairness: spread between the best- and worst-served officer
+        "session_mean_latency": {"min": min(session_means), "max": max(session_means)},
+        "errors": sum(1 for r in rows if r.get("error")),
+        "scheduler": pipeline.get_scheduler().snapshot(),
+        "model_swaps": stub.swaps if stub else None,
+    }
+
+    lat, fair = report["latency"], report["session_mean_latency"]
+    print(f"  Wall time:         {elapsed:.1f}s ({report['throughput_qpm']:.1f} questions/min)")
+    print(f"  Question latency:  p50 {lat['p50']:.2f}s  p95 {lat['p95']:.2f}s  p99 {lat['p99']:.2f}s")
+    print(f"  Per-session mean:  min {fair['min']:.2f}s  max {fair['max']:.2f}s")
+    print(f"  Errors:            {report['errors']}")
+    if stub:
+        print(f"  Model swaps:       {stub.swaps}")
+    for model, q in report["scheduler"].items():
+        print(f"  {model:28s} served {q['served']:4d}  mean queue wait {q['mean_wait']:.2f}s")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+        print(f"\n  Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -451,13 +451,19 @@ CREATE INDEX idx_visa_apps_date ON visa_applications(application_date);
 CREATE INDEX idx_asylum_status ON asylum_claims(status);
 CREATE INDEX idx_watchlist_active ON watchlist(is_active);
 CREATE INDEX idx_watchlist_type ON watchlist(alert_type);
+CREATE INDEX idx_watchlist_traveler ON watchlist(traveler_id);
+CREATE INDEX idx_watchlist_passport ON watchlist(passport_number);
 CREATE INDEX idx_ecl_status ON ecl_entries(status);
+CREATE INDEX idx_ecl_traveler ON ecl_entries(traveler_id);
 CREATE INDEX idx_risk_tier ON risk_profiles(risk_tier);
 CREATE INDEX idx_risk_score ON risk_profiles(risk_score);
 CREATE INDEX idx_trafficking_status ON trafficking_cases(status);
 CREATE INDEX idx_illegal_crossings_date ON illegal_crossings(detected_date);
 CREATE INDEX idx_offloading_date ON offloading_records(offload_date);
+CREATE INDEX idx_offloading_port ON offloading_records(port_id);
+CREATE INDEX idx_offloading_traveler ON offloading_records(traveler_id);
 CREATE INDEX idx_document_traveler ON document_registry(traveler_id);
+CREATE INDEX idx_document_number ON document_registry(document_number);
 CREATE INDEX idx_document_status ON document_registry(status);
 CREATE INDEX idx_audit_timestamp ON audit_log(action_timestamp);
 CREATE INDEX idx_audit_officer ON audit_log(officer_id);
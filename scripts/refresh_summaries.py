@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+refresh_summaries.py
+====================
+Rebuilds the precomputed summary tables (notebooks/summaries.py) from the
+base IBMS tables and records the refresh time in
+Config/.summary_refresh.json, which the app uses for its staleness check.
+
+The first run creates each sum_* table with CREATE TABLE AS plus its
+indexes. Later runs DELETE + INSERT in one transaction, so readers keep
+the previous contents until the commit.
+
+setup_oracle_ibms.py runs this after every load. For a schedule, run it
+in a loop or from cron:
+
+Usage:
+    python scripts/refresh_summaries.py                       # refresh all once
+    python scripts/refresh_summaries.py --only sum_watchlist_counts
+    python scripts/refresh_summaries.py --every 60            # every hour, forever
+    # crontab: 0 * * * *  cd /path/to/IBMS_LLM && python scripts/refresh_summaries.py
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import oracledb
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from summaries import SUMMARIES, STATE_FILE_NAME, load_refresh_state  # noqa: E402
+
+ORACLE_USER = "ibms_user"
+ORACLE_PASS = "ibms_pass"
+ORACLE_DSN = "localhost:1521/FREEPDB1"
+
+STATE_FILE = PROJECT_ROOT / "Config" / STATE_FILE_NAME
+
+
+def get_connection():
+    return oracledb.connect(user=ORACLE_USER, password=ORACLE_PASS, dsn=ORACLE_DSN)
+
+
+def write_state(state):
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(STATE_FILE)
+
+
+def refresh_summary(conn, summary) -> int:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE TABLE {summary.name} AS {summary.sql}")
+        for i, cols in enumerate(summary.indexes, 1):
+            cursor.execute(f"CREATE INDEX idx_{summary.name}_{i} ON {summary.name}({', '.join(cols)})")
+    except oracledb.DatabaseError as e:
+        if "ORA-00955" not in str(e):   # anything but "name already used"
+            raise
+        cursor.execute(f"DELETE FROM {summary.name}")
+        cursor.execute(f"INSERT INTO {summary.name} ({', '.join(summary.columns)}) {summary.sql}")
+    conn.commit()
+    cursor.execute(f"SELECT COUNT(*) FROM {summary.name}")
+    return cursor.fetchone()[0]
+
+
+def refresh_all(conn, names=None) -> dict:
+    """Refresh the named summaries (all by default); returns the updated refresh state."""
+    print("=" * 60)
+    print("Refreshing summary tables")
+    print("=" * 60)
+    state = load_refresh_state(STATE_FILE)
+    for summary in SUMMARIES:
+        if names and summary.name not in names:
+            continue
+        t0 = time.time()
+        try:
+            rows = refresh_summary(conn, summary)
+        except oracledb.DatabaseError as e:
+            conn.rollback()
+            print(f"  ✗ {summary.name:28s} {str(e)[:100]}")
+            continue
+        elapsed = time.time() - t0
+        state[summary.name] = {"refreshed_at": time.time(), "rows": rows, "seconds": round(elapsed, 2)}
+        write_state(state)
+        print(f"  ✓ {summary.name:28s} {rows:>8,} rows  {elapsed:6.2f}s")
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", help="Summary table names to refresh")
+    parser.add_argument("--every", type=float, help="Repeat every N minutes")
+    args = parser.parse_args()
+
+    while True:
+        conn = get_connection()
+        try:
+            refresh_all(conn, args.only)
+        finally:
+            conn.close()
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
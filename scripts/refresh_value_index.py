@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+refresh_value_index.py
+======================
+Extracts the full distinct values of the categorical columns
+(notebooks/value_index.py: Config/sample_values.json's columns plus
+EXTRA_COLUMNS) into Config/.value_index.json. The app rebuilds its
+in-process value index whenever the file changes.
+
+Incremental: a table is re-read only when its change signature differs
+from the last run (USER_TABLES row count / last analyzed, plus
+USER_TAB_MODIFICATIONS inserts / updates / deletes), or when the data was
+reloaded since (Config/.data_version). Oracle flushes DML monitoring
+periodically and on every stats gather, so a changed table shows up
+within minutes. --full re-reads every table. A column with more than
+MAX_DISTINCT distinct values is recorded as skipped and keeps its
+sample_values.json list.
+
+setup_oracle_ibms.py runs this after every load. For a schedule, run it
+in a loop or from cron:
+
+Usage:
+    python scripts/refresh_value_index.py                 # changed tables only
+    python scripts/refresh_value_index.py --full
+    python scripts/refresh_value_index.py --every 15      # every 15 minutes, forever
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import oracledb
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "notebooks"))
+
+from schema_linker import load_schema  # noqa: E402
+from value_index import MAX_DISTINCT, SNAPSHOT_NAME, load_snapshot, value_columns  # noqa: E402
+
+ORACLE_USER = "ibms_user"
+ORACLE_PASS = "ibms_pass"
+ORACLE_DSN = "localhost:1521/FREEPDB1"
+
+CONFIG_DIR = PROJECT_ROOT / "Config"
+SNAPSHOT_FILE = CONFIG_DIR / SNAPSHOT_NAME
+DATA_VERSION_FILE = CONFIG_DIR / ".data_version"
+
+SIGNATURE_SQL = """SELECT LOWER(t.table_name), t.num_rows, TO_CHAR(t.last_analyzed, 'YYYY-MM-DD HH24:MI:SS'),
+       m.inserts, m.updates, m.deletes, m.truncated
+FROM user_tables t
+LEFT JOIN user_tab_modifications m ON m.table_name = t.table_name AND m.partition_name IS NULL"""
+
+
+def get_connection():
+    return oracledb.connect(user=ORACLE_USER, password=ORACLE_PASS, dsn=ORACLE_DSN)
+
+
+def write_snapshot(snapshot):
+    tmp = SNAPSHOT_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot, indent=1, default=str))
+    tmp.replace(SNAPSHOT_FILE)
+
+
+def table_signatures(conn) -> dict:
+    cursor = conn.cursor()
+    try:
+        # Needs ANALYZE ANY; without it the monitoring data is flushed on Oracle's own schedule
+        cursor.execute("BEGIN DBMS_STATS.FLUSH_DATABASE_MONITORING_INFO; END;")
+    except oracledb.DatabaseError:
+        pass
+    cursor.execute(SIGNATURE_SQL)
+    return {row[0]: list(row[1:]) for row in cursor.fetchall()}
+
+
+def distinct_values(conn, table, column):
+    """Sorted distinct values, or None when the column has more than MAX_DISTINCT."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL GROUP BY {column} "
+                   f"FETCH FIRST {MAX_DISTINCT + 1} ROWS ONLY")
+    values = [str(row[0]) for row in cursor.fetchall()]
+    return None if len(values) > MAX_DISTINCT else sorted(values)
+
+
+def refresh_index(conn, full=False) -> dict:
+    """Re-read the changed tables (all with full=True); returns the written snapshot."""
+    print("=" * 60)
+    print("Refreshing value index")
+    print("=" * 60)
+    schema = load_schema(CONFIG_DIR)
+    columns = value_columns(schema.sample_values, schema.tables)
+    snapshot = load_snapshot(SNAPSHOT_FILE)
+    tables = snapshot.get("tables", {})
+    try:
+        reloaded = DATA_VERSION_FILE.stat().st_mtime > snapshot.get("refreshed_at", 0)
+    except OSError:
+        reloaded = False
+    signatures = table_signatures(conn)
+
+    changed = 0
+    for table, cols in columns.items():
+        signature = signatures.get(table)
+        previous = tables.get(table, {})
+        if not full and not reloaded and previous.get("signature") == signature:
+            continue
+        t0 = time.time()
+        entry = {"signature": signature, "refreshed_at": time.time(), "columns": {}, "skipped": []}
+        try:
+            for col in cols:
+                values = distinct_values(conn, table, col)
+                if values is None:
+                    entry["skipped"].append(col)
+                else:
+                    entry["columns"][col] = values
+        except oracledb.DatabaseError as e:
+            print(f"  ✗ {table:22s} {str(e)[:100]}")
+            continue
+        tables[table] = entry
+        changed += 1
+        counts = ", ".join(f"{col} {len(v)}" for col, v in entry["columns"].items())
+        skipped = f"  (skipped: {', '.join(entry['skipped'])})" if entry["skipped"] else ""
+        print(f"  ✓ {table:22s} {counts}{skipped}  {time.time() - t0:5.2f}s")
+
+    snapshot = {"refreshed_at": time.time(), "tables": tables}
+    if changed:     # an unchanged file spares the app a rebuild
+        write_snapshot(snapshot)
+    values = sum(len(v) for entry in tables.values() for v in entry["columns"].values())
+    print(f"  {changed} of {len(columns)} tables re-read, {values:,} values indexed")
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Re-read every table, changed or not")
+    parser.add_argument("--every", type=float, help="Repeat every N minutes")
+    args = parser.parse_args()
+
+    while True:
+        conn = get_connection()
+        try:
+            refresh_index(conn, args.full)
+        finally:
+            conn.close()
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,19 @@ Respects FK dependency order from schema_documentation.md
 Usage:
     cd ~/ml-projects/python-projects/IBMS_LLM
     python scripts/setup_oracle_ibms.py
+    python scripts/setup_oracle_ibms.py --workers 4 --direct-path
+    python scripts/setup_oracle_ibms.py --resume      # continue an interrupted load
 """
 
+import argparse
+import json
 import oracledb
 import pandas as pd
 import os
+import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 
 # ============================================================
@@ -27,6 +33,8 @@ ORACLE_DSN = "localhost:1521/FREEPDB1"
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "raw"
 SCHEMA_FILE = PROJECT_ROOT / "scripts" / "oracle_schema.sql"
+# Touched after every load so the app drops cached query results
+DATA_VERSION_FILE = PROJECT_ROOT / "Config" / ".data_version"
 
 # FK-respecting load order (from schema_documentation.md)
 LOAD_ORDER = [
@@ -67,6 +75,13 @@ TIMESTAMP_COLUMNS = {
 }
 
 BATCH_SIZE = 5000
+DEFAULT_WORKERS = 4
+
+# Rows read from a CSV at a time; memory stays bounded by this, not by file size.
+# Each chunk (with --direct-path each batch) is committed and checkpointed right after
+# the commit with the rows committed so far, so --resume restarts mid-table.
+CHUNK_ROWS = 50_000
+CHECKPOINT_DIR = PROJECT_ROOT / "data" / ".load_checkpoints"
 
 
 def get_connection():
@@ -159,89 +174,162 @@ def execute_schema(conn):
     print()
 
 
-def load_csv_to_table(conn, table_name, csv_file):
-    """Load a single CSV file into an Oracle table using batch inserts."""
+def load_dependencies():
+    """Map each table to the tables its FOREIGN KEYs reference (from oracle_schema.sql)."""
+    deps = {table: set() for table, _ in LOAD_ORDER}
+    current = None
+    for line in SCHEMA_FILE.read_text().split("\n"):
+        m = re.match(r"\s*CREATE TABLE (\w+)", line, re.IGNORECASE)
+        if m:
+            current = m.group(1).lower()
+            continue
+        for parent in re.findall(r"REFERENCES (\w+)", line, re.IGNORECASE):
+            if current in deps and parent.lower() != current:
+                deps[current].add(parent.lower())
+    return deps
+
+
+def convert_column(series, col):
+    """Convert one CSV column to Oracle-bindable Python objects (None for NULL), vectorized."""
+    if col in DATE_COLUMNS or col in TIMESTAMP_COLUMNS:
+        series = pd.to_datetime(series, errors="coerce", format="mixed")
+    elif series.dtype.kind == "f":
+        # pandas reads nullable integer columns as float; restore ints where lossless
+        non_null = series.dropna()
+        if (non_null == non_null.round()).all():
+            series = series.astype("Int64")
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def read_checkpoint(table_name):
+    """Return {"rows_done": int, "complete": bool} for a table (zeros if none)."""
+    path = CHECKPOINT_DIR / f"{table_name}.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"rows_done": 0, "complete": False}
+
+
+def write_checkpoint(table_name, rows_done, complete=False):
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    path = CHECKPOINT_DIR / f"{table_name}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"rows_done": rows_done, "complete": complete}))
+    tmp.replace(path)  # atomic, so an interrupted write never corrupts the checkpoint
+
+
+def clear_checkpoints():
+    for path in CHECKPOINT_DIR.glob("*.json"):
+        path.unlink()
+
+
+def load_csv_to_table(conn, table_name, csv_file, direct_path=False, show_progress=True,
+                      chunk_rows=CHUNK_ROWS):
+    """Stream a CSV into an Oracle table chunk by chunk, resuming from its checkpoint."""
     csv_path = DATA_DIR / csv_file
 
     if not csv_path.exists():
         print(f"  ⚠ SKIP: {csv_file} not found")
         return 0
 
-    # Read CSV
-    df = pd.read_csv(csv_path, low_memory=False)
-    total_rows = len(df)
-
-    if total_rows == 0:
-        print(f"  ⚠ SKIP: {csv_file} is empty")
+    checkpoint = read_checkpoint(table_name)
+    if checkpoint["complete"]:
+        print(f"  ✓ {table_name}: already loaded ({checkpoint['rows_done']:,} rows, checkpoint)")
         return 0
+    rows_done = checkpoint["rows_done"]
 
-    # Replace NaN with None (Oracle NULL)
-    df = df.where(pd.notnull(df), None)
-
-    # Parse date columns
-    for col in df.columns:
-        if col in DATE_COLUMNS:
-            df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed")
-            df[col] = df[col].where(pd.notnull(df[col]), None)
-        elif col in TIMESTAMP_COLUMNS:
-            df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed")
-            df[col] = df[col].where(pd.notnull(df[col]), None)
-
-    # Build INSERT statement
-    columns = df.columns.tolist()
-    placeholders = ", ".join([f":{i+1}" for i in range(len(columns))])
-    col_names = ", ".join(columns)
-    insert_sql = f"INSERT INTO {table_name} ({col_names}) VALUES ({placeholders})"
-
+    t0 = time.time()
     cursor = conn.cursor()
+    insert_sql = None
     loaded = 0
     errors = 0
 
-    # Batch insert
-    for start in range(0, total_rows, BATCH_SIZE):
-        batch = df.iloc[start:start + BATCH_SIZE]
-        rows = []
-        for _, row in batch.iterrows():
-            row_data = []
-            for col in columns:
-                val = row[col]
-                if val is None:
-                    row_data.append(None)
-                elif col in DATE_COLUMNS or col in TIMESTAMP_COLUMNS:
-                    # Convert pandas Timestamp to Python datetime
-                    if pd.notnull(val):
-                        row_data.append(val.to_pydatetime())
-                    else:
-                        row_data.append(None)
-                elif isinstance(val, float) and val == int(val):
-                    # Convert float IDs to int (pandas reads nullable int as float)
-                    row_data.append(int(val))
-                else:
-                    row_data.append(val)
-            rows.append(row_data)
-
-        try:
-            cursor.executemany(insert_sql, rows)
-            loaded += len(rows)
-        except oracledb.DatabaseError as e:
-            # Fall back to row-by-row for this batch to skip bad rows
-            for row_data in rows:
-                try:
-                    cursor.execute(insert_sql, row_data)
-                    loaded += 1
-                except oracledb.DatabaseError:
-                    errors += 1
+    # Skip rows committed by a previous run (row 0 is the header)
+    skip = range(1, rows_done + 1) if rows_done else None
+    reader = pd.read_csv(csv_path, chunksize=chunk_rows, skiprows=skip, low_memory=False)
+
+    for chunk in reader:
+        # Convert every column once, then build row tuples in C via zip
+        columns = chunk.columns.tolist()
+        rows = list(zip(*(convert_column(chunk[col], col) for col in columns)))
+        del chunk
+
+        if insert_sql is None:
+            # APPEND_VALUES requests a direct-path array insert
+            # (Oracle silently uses conventional inserts on tables with enabled FKs).
+            placeholders = ", ".join([f":{i+1}" for i in range(len(columns))])
+            col_names = ", ".join(columns)
+            hint = "/*+ APPEND_VALUES */ " if direct_path else ""
+            insert_sql = f"INSERT {hint}INTO {table_name} ({col_names}) VALUES ({placeholders})"
+
+        # Batch insert; bad rows are reported by getbatcherrors() instead of aborting the batch
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.executemany(insert_sql, batch, batcherrors=True)
+            batch_errors = len(cursor.getbatcherrors())
+            errors += batch_errors
+            loaded += len(batch) - batch_errors
+            if direct_path:
+                conn.commit()  # a direct-path insert must be committed before the next one
+                write_checkpoint(table_name, rows_done + start + len(batch))
+
+        rows_done += len(rows)
+        if not direct_path:
+            conn.commit()
+            write_checkpoint(table_name, rows_done)
 
         # Progress
-        pct = min(100, int((start + BATCH_SIZE) / total_rows * 100))
-        print(f"\r  Loading {table_name}: {pct:3d}% ({loaded:,}/{total_rows:,})", end="", flush=True)
+        if show_progress:
+            print(f"\r  Loading {table_name}: {rows_done:,} rows", end="", flush=True)
 
-    conn.commit()
+    write_checkpoint(table_name, rows_done, complete=True)
+    if insert_sql is None and rows_done == 0:
+        print(f"  ⚠ SKIP: {csv_file} is empty")
+        return 0
+
+    elapsed = time.time() - t0
+    rate = loaded / elapsed if elapsed > 0 else 0
     error_msg = f" ({errors} errors)" if errors else ""
-    print(f"\r  ✓ {table_name}: {loaded:,} rows loaded{error_msg}{'':30}")
+    resumed = f", resumed at row {checkpoint['rows_done']:,}" if checkpoint["rows_done"] else ""
+    print(f"\r  ✓ {table_name}: {loaded:,} rows loaded in {elapsed:.1f}s ({rate:,.0f} rows/s){resumed}{error_msg}{'':10}")
     return loaded
 
 
+def _load_table_task(table_name, csv_file, direct_path, chunk_rows):
+    """Worker: load one table on its own connection."""
+    conn = get_connection()
+    try:
+        return load_csv_to_table(conn, table_name, csv_file, direct_path, False, chunk_rows)
+    finally:
+        conn.close()
+
+
+def load_all_tables(conn, workers=DEFAULT_WORKERS, direct_path=False, chunk_rows=CHUNK_ROWS):
+    """Load every table, running independent tables in parallel once their FK parents are loaded."""
+    if workers <= 1:
+        return sum(load_csv_to_table(conn, t, f, direct_path, True, chunk_rows) for t, f in LOAD_ORDER)
+
+    deps = load_dependencies()
+    csv_files = dict(LOAD_ORDER)
+    pending = [t for t, _ in LOAD_ORDER]
+    done = set()
+    running = {}
+    total_loaded = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for table in [t for t in pending if deps[t] <= done]:
+                pending.remove(table)
+                running[pool.submit(_load_table_task, table, csv_files[table], direct_path, chunk_rows)] = table
+            if not running:
+                raise RuntimeError(f"Unresolvable FK dependencies: {pending}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                total_loaded += future.result()
+                done.add(running.pop(future))
+
+    return total_loaded
+
+
 def verify_tables(conn):
     """Print row counts for all tables."""
     print("=" * 60)
@@ -265,6 +353,17 @@ def verify_tables(conn):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Create the IBMS schema and load data/raw/*.csv")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Parallel table loads (1 = sequential LOAD_ORDER)")
+    parser.add_argument("--direct-path", action="store_true",
+                        help="Use APPEND_VALUES direct-path array inserts")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="CSV rows read, inserted and checkpointed at a time")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the existing schema and continue from data/.load_checkpoints/")
+    args = parser.parse_args()
+
     print("\n🔧 FIA-IBMS Oracle Database Setup")
     print(f"   Target: {ORACLE_USER}@{ORACLE_DSN}")
     print(f"   Data:   {DATA_DIR}\n")
@@ -276,8 +375,12 @@ def main():
     conn = get_connection()
 
     try:
-        # Step 1: Create schema
-        execute_schema(conn)
+        # Step 1: Create schema (a resumed load keeps the tables and rows already committed)
+        if args.resume:
+            print("  Resuming from checkpoints — schema left as is\n")
+        else:
+            execute_schema(conn)
+            clear_checkpoints()
 
         # Step 2: Load data
         print("=" * 60)
@@ -285,18 +388,28 @@ def main():
         print("=" * 60)
 
         start_time = time.time()
-        total_loaded = 0
-
-        for table_name, csv_file in LOAD_ORDER:
-            rows = load_csv_to_table(conn, table_name, csv_file)
-            total_loaded += rows
+        total_loaded = load_all_tables(conn, args.workers, args.direct_path, args.chunk_rows)
 
         elapsed = time.time() - start_time
-        print(f"\n  Total: {total_loaded:,} rows loaded in {elapsed:.1f}s\n")
+        rate = total_loaded / elapsed if elapsed > 0 else 0
+        print(f"\n  Total: {total_loaded:,} rows loaded in {elapsed:.1f}s ({rate:,.0f} rows/s)\n")
 
         # Step 3: Verify
         verify_tables(conn)
 
+        # Invalidate the app's result cache
+        DATA_VERSION_FILE.touch()
+
+        # Step 4: Rebuild the summary tables (after the touch, so they count as fresh)
+        from refresh_summaries import refresh_all
+        print()
+        refresh_all(conn)
+
+        # Step 5: Full distinct values of the categorical columns for the app's value index
+        from refresh_value_index import refresh_index
+        print()
+        refresh_index(conn, full=True)
+
     finally:
         conn.close()
 